@@ -0,0 +1,34 @@
+"""add coordinates to query_history
+
+Revision ID: 4b7e2a91c5d8
+Revises: d3c090cfe0c0
+Create Date: 2025-06-14 10:12:37.581204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2a91c5d8'
+down_revision: Union[str, None] = 'd3c090cfe0c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('query_history', sa.Column('source_lat', sa.Float(), nullable=True))
+    op.add_column('query_history', sa.Column('source_lon', sa.Float(), nullable=True))
+    op.add_column('query_history', sa.Column('destination_lat', sa.Float(), nullable=True))
+    op.add_column('query_history', sa.Column('destination_lon', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('query_history', 'destination_lon')
+    op.drop_column('query_history', 'destination_lat')
+    op.drop_column('query_history', 'source_lon')
+    op.drop_column('query_history', 'source_lat')
@@ -0,0 +1,114 @@
+"""deduplicate addresses and store distance in meters
+
+Revision ID: 5a8c3f1d9e42
+Revises: e61f0b3a7c29
+Create Date: 2025-06-27 16:25:02.913455
+
+Moves the address strings and coordinates of query_history into an
+`addresses` dictionary referenced by integer ids, and replaces the
+kilometers/miles Numeric columns with an integer `meters` column.
+
+Postgres only reclaims the space of dropped columns when rows are
+rewritten; run `VACUUM FULL` on each query_history partition after
+upgrading to shrink existing data.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8c3f1d9e42'
+down_revision: Union[str, None] = 'e61f0b3a7c29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('addresses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('address')
+    )
+
+    # Latest known coordinates win for each distinct address
+    op.execute("""
+        INSERT INTO addresses (address, latitude, longitude)
+        SELECT DISTINCT ON (address) address, lat, lon
+        FROM (
+            SELECT source AS address, source_lat AS lat, source_lon AS lon, created_at
+            FROM query_history
+            UNION ALL
+            SELECT destination, destination_lat, destination_lon, created_at
+            FROM query_history
+        ) seen
+        ORDER BY address, lat IS NULL, created_at DESC
+    """)
+
+    op.add_column('query_history', sa.Column('source_id', sa.Integer(), nullable=True))
+    op.add_column('query_history', sa.Column('destination_id', sa.Integer(), nullable=True))
+    op.add_column('query_history', sa.Column('meters', sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE query_history q
+        SET source_id = s.id,
+            destination_id = d.id,
+            meters = round(q.kilometers * 1000)
+        FROM addresses s, addresses d
+        WHERE s.address = q.source AND d.address = q.destination
+    """)
+
+    op.alter_column('query_history', 'source_id', nullable=False)
+    op.alter_column('query_history', 'destination_id', nullable=False)
+    op.alter_column('query_history', 'meters', nullable=False)
+    op.create_foreign_key(
+        'query_history_source_id_fkey', 'query_history', 'addresses', ['source_id'], ['id']
+    )
+    op.create_foreign_key(
+        'query_history_destination_id_fkey', 'query_history', 'addresses', ['destination_id'], ['id']
+    )
+
+    for column in ('source', 'destination', 'kilometers', 'miles',
+                   'source_lat', 'source_lon', 'destination_lat', 'destination_lon'):
+        op.drop_column('query_history', column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('query_history', sa.Column('source', sa.String(), nullable=True))
+    op.add_column('query_history', sa.Column('destination', sa.String(), nullable=True))
+    op.add_column('query_history', sa.Column('kilometers', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('query_history', sa.Column('miles', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('query_history', sa.Column('source_lat', sa.Float(), nullable=True))
+    op.add_column('query_history', sa.Column('source_lon', sa.Float(), nullable=True))
+    op.add_column('query_history', sa.Column('destination_lat', sa.Float(), nullable=True))
+    op.add_column('query_history', sa.Column('destination_lon', sa.Float(), nullable=True))
+
+    op.execute("""
+        UPDATE query_history q
+        SET source = s.address,
+            destination = d.address,
+            kilometers = round(q.meters / 1000.0, 2),
+            miles = round(round(q.meters / 1000.0, 2) * 0.621371, 2),
+            source_lat = s.latitude,
+            source_lon = s.longitude,
+            destination_lat = d.latitude,
+            destination_lon = d.longitude
+        FROM addresses s, addresses d
+        WHERE s.id = q.source_id AND d.id = q.destination_id
+    """)
+
+    for column in ('source', 'destination', 'kilometers', 'miles'):
+        op.alter_column('query_history', column, nullable=False)
+
+    op.drop_constraint('query_history_destination_id_fkey', 'query_history', type_='foreignkey')
+    op.drop_constraint('query_history_source_id_fkey', 'query_history', type_='foreignkey')
+    op.drop_column('query_history', 'meters')
+    op.drop_column('query_history', 'destination_id')
+    op.drop_column('query_history', 'source_id')
+    op.drop_table('addresses')
@@ -0,0 +1,76 @@
+"""add history rollup tables
+
+Revision ID: 9c2d5e8f1a36
+Revises: 4b7e2a91c5d8
+Create Date: 2025-06-18 14:03:51.229870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2d5e8f1a36'
+down_revision: Union[str, None] = '4b7e2a91c5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match DISTANCE_BUCKETS_KM in app/services/history_stats.py
+DISTANCE_BUCKETS_KM = [0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('history_pair_stats',
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('destination', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total_kilometers', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('source', 'destination')
+    )
+    op.create_table('history_hourly_stats',
+    sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total_kilometers', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('hour')
+    )
+    op.create_table('history_distance_buckets',
+    sa.Column('bucket_km', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total_kilometers', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_km')
+    )
+
+    # Backfill the rollups from existing history
+    op.execute("""
+        INSERT INTO history_pair_stats (source, destination, count, total_kilometers, last_seen_at)
+        SELECT source, destination, count(*), sum(kilometers), max(created_at)
+        FROM query_history
+        GROUP BY source, destination
+    """)
+    op.execute("""
+        INSERT INTO history_hourly_stats (hour, count, total_kilometers)
+        SELECT date_trunc('hour', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+               count(*), sum(kilometers)
+        FROM query_history
+        GROUP BY 1
+    """)
+    bucket = " ".join(
+        f"WHEN kilometers >= {lower} THEN {lower}" for lower in reversed(DISTANCE_BUCKETS_KM[1:])
+    )
+    op.execute(f"""
+        INSERT INTO history_distance_buckets (bucket_km, count, total_kilometers)
+        SELECT CASE {bucket} ELSE 0 END, count(*), sum(kilometers)
+        FROM query_history
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('history_distance_buckets')
+    op.drop_table('history_hourly_stats')
+    op.drop_table('history_pair_stats')
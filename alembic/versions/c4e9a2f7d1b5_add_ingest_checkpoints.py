@@ -0,0 +1,38 @@
+"""add ingest checkpoints
+
+Revision ID: c4e9a2f7d1b5
+Revises: b7d41c06e8f3
+Create Date: 2025-07-10 15:22:07.514302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2f7d1b5'
+down_revision: Union[str, None] = 'b7d41c06e8f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingest_checkpoints',
+    sa.Column('name', sa.String(length=128), nullable=False),
+    sa.Column('position', sa.BigInteger(), nullable=False),
+    sa.Column('loaded', sa.BigInteger(), nullable=False),
+    sa.Column('rejected', sa.BigInteger(), nullable=False),
+    sa.Column('deferred_indexes', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ingest_checkpoints')
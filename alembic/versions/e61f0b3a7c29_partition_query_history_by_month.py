@@ -0,0 +1,100 @@
+"""partition query_history by month
+
+Revision ID: e61f0b3a7c29
+Revises: 9c2d5e8f1a36
+Create Date: 2025-06-22 09:41:18.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61f0b3a7c29'
+down_revision: Union[str, None] = '9c2d5e8f1a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created ahead of the current month; the maintenance job in
+# app/services/partitions.py keeps this window rolling afterwards.
+MONTHS_AHEAD = 3
+
+COLUMNS = """
+    source VARCHAR NOT NULL,
+    destination VARCHAR NOT NULL,
+    kilometers NUMERIC(10, 2) NOT NULL,
+    miles NUMERIC(10, 2) NOT NULL,
+    source_lat FLOAT,
+    source_lon FLOAT,
+    destination_lat FLOAT,
+    destination_lon FLOAT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+"""
+COLUMN_NAMES = (
+    "id, source, destination, kilometers, miles, "
+    "source_lat, source_lon, destination_lat, destination_lon, created_at"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE query_history RENAME TO query_history_old")
+    op.execute("ALTER INDEX query_history_pkey RENAME TO query_history_old_pkey")
+
+    # The partition key has to be part of the primary key
+    op.execute(f"""
+        CREATE TABLE query_history (
+            id INTEGER DEFAULT nextval('query_history_id_seq') NOT NULL,
+            {COLUMNS},
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE query_history_id_seq OWNED BY query_history.id")
+    op.execute("CREATE INDEX ix_query_history_created_at ON query_history (created_at)")
+
+    # One partition per month from the oldest row through MONTHS_AHEAD
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month_start date;
+        BEGIN
+            FOR month_start IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce(
+                        (SELECT min(created_at) FROM query_history_old), now()
+                    ) AT TIME ZONE 'UTC'),
+                    date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF query_history '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'query_history_' || to_char(month_start, '"y"YYYY"m"MM'),
+                    month_start::timestamp AT TIME ZONE 'UTC',
+                    (month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END $$;
+    """)
+
+    op.execute(f"INSERT INTO query_history ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM query_history_old")
+    op.execute("DROP TABLE query_history_old")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE query_history RENAME TO query_history_partitioned")
+    op.execute("ALTER SEQUENCE query_history_id_seq OWNED BY NONE")
+    op.execute(f"""
+        CREATE TABLE query_history (
+            id INTEGER DEFAULT nextval('query_history_id_seq') NOT NULL,
+            {COLUMNS},
+            CONSTRAINT query_history_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"INSERT INTO query_history ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM query_history_partitioned")
+    op.execute("DROP TABLE query_history_partitioned CASCADE")
+    op.execute("ALTER SEQUENCE query_history_id_seq OWNED BY query_history.id")
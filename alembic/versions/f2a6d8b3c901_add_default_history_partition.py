@@ -0,0 +1,52 @@
+"""add a default partition to query_history
+
+Revision ID: f2a6d8b3c901
+Revises: c4e9a2f7d1b5
+Create Date: 2025-07-14 10:05:43.218690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6d8b3c901'
+down_revision: Union[str, None] = 'c4e9a2f7d1b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows for months without a partition land here instead of failing;
+    # app/services/partitions.py moves them out when it creates the month
+    op.execute("CREATE TABLE IF NOT EXISTS query_history_default PARTITION OF query_history DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE query_history DETACH PARTITION query_history_default")
+    # Give any rows left in it a monthly partition of their own
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start date;
+        BEGIN
+            FOR month_start IN
+                SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date
+                FROM query_history_default
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF query_history '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'query_history_' || to_char(month_start, '"y"YYYY"m"MM'),
+                    month_start::timestamp AT TIME ZONE 'UTC',
+                    (month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END $$;
+    """)
+    op.execute("INSERT INTO query_history SELECT * FROM query_history_default")
+    op.execute("DROP TABLE query_history_default")
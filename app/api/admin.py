@@ -0,0 +1,40 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.core.exceptions import InvalidIngestError
+from app.core.tokens import token_dependency
+from app.services.ingest import gunzip, ingest, iter_lines, iter_records
+
+
+require_admin_token = token_dependency("ADMIN_TOKEN", "X-Admin-Token", "admin")
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin_token)])
+
+
+@router.post("/ingest")
+async def ingest_history(
+    request: Request,
+    name: str = Query(..., min_length=1, max_length=128),
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    defer_indexes: bool = False,
+    restart: bool = False,
+    mode: Literal["spherical", "ellipsoidal"] = "spherical",
+):
+    """
+    Bulk-load legacy history records from the request body
+
+    The body is streamed and loaded in chunks as it arrives; see
+    `app.services.ingest` for the record format. Send gzipped bodies with
+    `Content-Encoding: gzip`. If the upload is interrupted, send the same
+    body with the same `name` again to resume after the last loaded chunk.
+    """
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding == "gzip":
+        body = gunzip(request.stream())
+    elif encoding == "identity":
+        body = request.stream()
+    else:
+        raise InvalidIngestError(f"Unsupported Content-Encoding: {encoding}")
+    records = iter_records(iter_lines(body), format)
+    return await ingest(records, name, defer_indexes=defer_indexes, restart=restart, mode=mode)
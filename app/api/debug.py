@@ -0,0 +1,102 @@
+import asyncio
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import APIRouter, Depends, Query
+
+from app.core.loop_monitor import get_loop_monitor
+from app.core.tokens import token_dependency
+from app.db import session
+from app.services import address_cleaner, geo_providers, nominatim, recaptcha
+
+
+require_debug_token = token_dependency("DEBUG_TOKEN", "X-Debug-Token", "debug")
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_debug_token)])
+
+
+def _task_name(task: asyncio.Task) -> str:
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+
+def _httpx_pool(client: Optional[httpx.AsyncClient]) -> Optional[Dict[str, int]]:
+    """Connection counts of a client's pool; None if it was never created"""
+    if client is None:
+        return None
+    pool = getattr(client._transport, "_pool", None)
+    if pool is None:
+        return {}
+    connections = list(pool.connections)
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        # Requests waiting for a connection, e.g. at the max_connections cap
+        "queued": sum(1 for request in getattr(pool, "_requests", ()) if request.connection is None),
+    }
+
+
+def _db_pool() -> Optional[Dict[str, Any]]:
+    engine = session._engine
+    if engine is None:
+        return None
+    pool = engine.pool
+    stats: Dict[str, Any] = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+
+@router.get("/loop")
+async def loop_status():
+    """Event-loop lag percentiles and recent stalls with their stacks"""
+    return get_loop_monitor().snapshot()
+
+
+@router.get("/tasks")
+async def task_status():
+    """Running asyncio tasks, counted by coroutine name"""
+    counts = Counter(_task_name(task) for task in asyncio.all_tasks())
+    return {"total": sum(counts.values()), "by_coroutine": dict(counts.most_common())}
+
+
+@router.get("/pools")
+async def pool_status():
+    """Occupancy of the database and outbound HTTP connection pools"""
+    openai_client = address_cleaner._client
+    http = {
+        "nominatim": _httpx_pool(nominatim._client),
+        "recaptcha": _httpx_pool(recaptcha._client),
+        "openai": _httpx_pool(openai_client._client if openai_client is not None else None),
+    }
+    if geo_providers._router is not None:
+        for provider in geo_providers._router.providers:
+            if isinstance(provider, geo_providers.HttpProvider):
+                http[f"geocoder:{provider.name}"] = _httpx_pool(provider._client)
+    return {"database": _db_pool(), "http": http}
+
+
+@router.get("/memory")
+async def memory_status(limit: int = Query(20, ge=1, le=200)):
+    """Top allocation sites by size, when DEBUG_TRACEMALLOC_FRAMES is set"""
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "top": []}
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "current_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "top": [
+            {"site": str(stat.traceback), "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ],
+    }
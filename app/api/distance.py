@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
 from app.db.session import get_db
 from app.db.models import QueryHistory
-from app.services.geocode import get_coordinates
-from app.services.address_cleaner import clean_addresses
-from app.core.haversine import calculate_distance
+from app.core.admission import get_limiter
+from app.core.config import get_settings
+from app.core.rate_limit import api_key_scope
+from app.services.geocode import get_coordinates, cached_coordinates
+from app.services.address_cleaner import clean_addresses, cached_cleaning
+from app.core.geodesic import calculate_distance
 from app.services.recaptcha import verify_recaptcha
+from app.services.places import record_place
+from app.services.history_stats import record_query
+from app.services.address_book import upsert_addresses
+from app.services.history_cache import bump_history_version
+from app.services.idempotency import fingerprint, run_once, store_key
 
 router = APIRouter()
 
@@ -17,6 +26,9 @@ class DistanceRequest(BaseModel):
     source: str = Field(..., min_length=1, max_length=256)
     destination: str = Field(..., min_length=1, max_length=256)
     captchaToken: str 
+    # "ellipsoidal" measures along the WGS-84 ellipsoid (Vincenty/Karney),
+    # up to ~0.5% more accurate than the spherical haversine on long routes
+    mode: Literal["spherical", "ellipsoidal"] = "spherical"
 
 
 class DistanceResponse(BaseModel):
@@ -26,14 +38,61 @@ class DistanceResponse(BaseModel):
     destination_address: str  # 清理后的目标地址
     source_corrected: bool
     destination_corrected: bool
+    mode: str
+
+
+def is_cache_hit(request: DistanceRequest) -> bool:
+    """Whether cleaning and geocoding can both be answered from caches"""
+    cleaned = cached_cleaning(request.source, request.destination)
+    if cleaned is None:
+        return False
+    return all(
+        cached_coordinates(address) is not None
+        for address in (cleaned["source"], cleaned["destination"])
+    )
 
 
 @router.post("/distance", response_model=DistanceResponse)
 async def calculate_distance_between(
     request: DistanceRequest,
-    db: AsyncSession = Depends(get_db)
+    http_request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255),
 ):
-    """Calculate distance between two addresses"""
+    """
+    Calculate distance between two addresses
+
+    With an Idempotency-Key header, retries of the same request get the
+    first response back (marked `Idempotent-Replayed: true`) without
+    calling any upstream service or recording history again.
+    """
+    if idempotency_key is None:
+        return await _admitted(request, db)
+
+    result, replayed = await run_once(
+        # Not scoped by IP: a mobile client may retry from another network
+        store_key(api_key_scope(http_request) or "anonymous", idempotency_key),
+        # The captcha token is left out: a retry may carry a fresh one
+        fingerprint(request.source, request.destination, request.mode),
+        lambda: _admitted(request, db),
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+async def _admitted(request: DistanceRequest, db: AsyncSession):
+    if not get_settings().ADMISSION_ENABLED:
+        return await _calculate_distance(request, db)
+
+    # Excess requests are rejected up front with a 503 rather than queued
+    # behind OpenAI and Nominatim; cache hits get extra headroom.
+    async with get_limiter().admit(fast=is_cache_hit(request)):
+        return await _calculate_distance(request, db)
+
+
+async def _calculate_distance(request: DistanceRequest, db: AsyncSession):
     logger.info(f"Calculating distance from '{request.source}' to '{request.destination}'")
     recaptcha_token=request.captchaToken
     await verify_recaptcha(recaptcha_token)
@@ -57,18 +116,24 @@ async def calculate_distance_between(
     # Calculate distance
     kilometers, miles = calculate_distance(
         source_coords[0], source_coords[1],
-        dest_coords[0], dest_coords[1]
+        dest_coords[0], dest_coords[1],
+        mode=request.mode
     )
 
     # Store in database
+    address_ids = await upsert_addresses(db, {source: source_coords, destination: dest_coords})
     query_history = QueryHistory(
-        source=source,
-        destination=destination,
-        kilometers=kilometers,
-        miles=miles
+        source_id=address_ids[source],
+        destination_id=address_ids[destination],
+        meters=round(kilometers * 1000)
     )
     db.add(query_history)
+    await record_query(db, source, destination, kilometers)
     await db.commit()
+    bump_history_version()
+
+    record_place(source, source_coords)
+    record_place(destination, dest_coords)
 
     logger.info(
         f"Stored distance calculation: {kilometers:.2f} km / {miles:.2f} miles "
@@ -81,5 +146,6 @@ async def calculate_distance_between(
         "source_address": source,
         "destination_address": destination,
         "source_corrected": cleaned["sourceCorrected"],
-        "destination_corrected": cleaned["destinationCorrected"]
+        "destination_corrected": cleaned["destinationCorrected"],
+        "mode": request.mode
     } 
\ No newline at end of file
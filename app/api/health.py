@@ -1,10 +1,26 @@
 from fastapi import APIRouter
 from loguru import logger
 
+from app.core.admission import get_limiter
+from app.services.geo_providers import get_router
+from app.services.nominatim import get_lookup_stats
+
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/health/admission")
+async def admission_status():
+    """Current /distance admission limit, load and rejection count"""
+    return get_limiter().stats()
+
+
+@router.get("/health/geocoding")
+async def geocoding_status():
+    """Latency and success rate per geocoding provider and Nominatim query type"""
+    return {"providers": get_router().snapshot(), "nominatim": get_lookup_stats()}
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, Query, Body
+from fastapi import APIRouter, Depends, Query, Body, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
-from pydantic import BaseModel
+from sqlalchemy import and_, or_, select
+from typing import List, Optional
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
 from loguru import logger
 
 from app.db.session import get_db
 from app.db.models import QueryHistory
+from app.services.history_stats import get_stats
+from app.services.history_cache import (
+    decode_cursor,
+    encode_cursor,
+    history_version,
+    make_etag,
+    response_cache,
+)
+from app.core.exceptions import APIError
 import os
 
 
@@ -25,28 +34,104 @@ class HistoryResponse(BaseModel):
         from_attributes = True
 
 
+_history_list = TypeAdapter(List[HistoryResponse])
+
+
+class PairStats(BaseModel):
+    source: str
+    destination: str
+    count: int
+    average_kilometers: float
+
+
+class HourlyStats(BaseModel):
+    hour: datetime
+    count: int
+
+
+class DistanceBucketStats(BaseModel):
+    min_kilometers: int
+    count: int
+
+
+class HistoryStatsResponse(BaseModel):
+    total_queries: int
+    average_kilometers: float
+    top_pairs: List[PairStats]
+    hourly: List[HourlyStats]
+    distance_histogram: List[DistanceBucketStats]
+
+
+@router.get("/history/stats", response_model=HistoryStatsResponse)
+async def get_history_stats(
+    top: int = Query(default=10, ge=1, le=100),
+    hours: int = Query(default=24, ge=1, le=24 * 30),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get aggregate query statistics from the incrementally maintained rollups
+    """
+    logger.info(f"Fetching history stats (top={top}, hours={hours})")
+    return await get_stats(db, top=top, hours=hours)
+
+
 @router.get("/history", response_model=List[HistoryResponse])
 async def get_history(
     limit: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor of the previous page"),
+    if_none_match: Optional[str] = Header(default=None),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get query history
+    Get query history, newest first
+
+    Responses carry an ETag tied to the history version, which changes
+    whenever history is written, and are cached per process; pollers
+    sending If-None-Match get a 304 without a database query. When more
+    rows may follow, X-Next-Cursor holds the cursor for the next page.
     """
+    etag = make_etag(history_version(), limit, cursor)
+    if if_none_match is not None and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cached = response_cache.get(etag)
+    if cached is None:
+        cached = await _load_history_page(db, limit, cursor)
+        response_cache.put(etag, *cached)
+
+    body, next_cursor = cached
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _load_history_page(db: AsyncSession, limit: int, cursor: Optional[str]):
     logger.info(f"Fetching query history with limit {limit}")
-    
-    # Verify reCAPTCHA token
 
-    # Query history after successful verification
+    # With the monthly partitions and the created_at index, Postgres walks
+    # the partitions newest-first and stops once `limit` rows are found.
     query = (
         select(QueryHistory)
-        .order_by(QueryHistory.created_at.desc())
+        .order_by(QueryHistory.created_at.desc(), QueryHistory.id.desc())
         .limit(limit)
     )
-    
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        if position is None:
+            raise APIError(status_code=422, code="INVALID_CURSOR", message="Invalid history cursor")
+        created_at, row_id = position
+        query = query.where(or_(
+            QueryHistory.created_at < created_at,
+            and_(QueryHistory.created_at == created_at, QueryHistory.id < row_id),
+        ))
+
     result = await db.execute(query)
     history = result.scalars().all()
-    
+
     logger.info(f"Retrieved {len(history)} history records")
-    
-    return history
+
+    next_cursor = None
+    if history and len(history) == limit:
+        next_cursor = encode_cursor(history[-1].created_at, history[-1].id)
+    return _history_list.dump_json(_history_list.validate_python(history, from_attributes=True)), next_cursor
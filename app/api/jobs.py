@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.db.session import get_db
+from app.core.config import get_settings
+from app.core.exceptions import InvalidJobError, JobNotFoundError, PayloadTooLargeError
+from app.core.tokens import token_dependency
+from app.services.jobs import create_job, get_job, iter_results, parse_pairs_csv
+
+
+require_jobs_token = token_dependency("JOBS_TOKEN", "X-Jobs-Token", "jobs")
+
+router = APIRouter(dependencies=[Depends(require_jobs_token)])
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read the request body, refusing it as soon as it exceeds `max_bytes`
+
+    Raises:
+        PayloadTooLargeError: If Content-Length or the streamed body is too large
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise PayloadTooLargeError(max_bytes)
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise PayloadTooLargeError(max_bytes)
+    return bytes(body)
+
+
+class JobPair(BaseModel):
+    source: str = Field(..., min_length=1, max_length=256)
+    destination: str = Field(..., min_length=1, max_length=256)
+
+
+class JobCreateRequest(BaseModel):
+    pairs: List[JobPair] = Field(..., min_length=1)
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Submit address pairs for background processing
+
+    Send either JSON, `{"pairs": [{"source": ..., "destination": ...}]}`,
+    or a CSV file with `Content-Type: text/csv` and one
+    `source,destination` row per pair (a header row is optional).
+    """
+    body = await read_body(request, get_settings().JOB_MAX_BODY_BYTES)
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        try:
+            pairs = parse_pairs_csv(body.decode("utf-8-sig"))
+        except UnicodeDecodeError:
+            raise InvalidJobError("CSV upload must be UTF-8 encoded")
+    else:
+        try:
+            payload = JobCreateRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        pairs = [(pair.source, pair.destination) for pair in payload.pairs]
+
+    return await create_job(db, pairs)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_status(
+    job_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a job's status and progress"""
+    job = await get_job(db, job_id)
+    if job is None:
+        raise JobNotFoundError(job_id)
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream a job's results in submission order
+
+    Available while the job runs; unfinished pairs have status "pending".
+    """
+    if await get_job(db, job_id) is None:
+        raise JobNotFoundError(job_id)
+
+    logger.info(f"Streaming results of job {job_id} as {format}")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(iter_results(job_id, format), media_type=media_type)
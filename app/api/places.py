@@ -0,0 +1,46 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.db.session import get_db
+from app.services.places import find_nearby, refresh
+
+router = APIRouter()
+
+
+class PlaceResponse(BaseModel):
+    address: str
+    latitude: float
+    longitude: float
+    distance_km: float
+
+
+@router.get("/places/nearby", response_model=List[PlaceResponse])
+async def get_nearby_places(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=10, ge=1, le=100),
+    radius_km: Optional[float] = Query(default=None, gt=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Reverse lookup over previously geocoded places: the k nearest
+    addresses to a coordinate, optionally limited to a radius
+    """
+    await refresh(db)
+
+    matches = find_nearby(lat, lon, k, radius_km)
+    logger.info(f"Found {len(matches)} places near ({lat}, {lon})")
+
+    return [
+        {
+            "address": place.name,
+            "latitude": place.latitude,
+            "longitude": place.longitude,
+            "distance_km": round(distance, 2),
+        }
+        for place, distance in matches
+    ]
@@ -0,0 +1,130 @@
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.exceptions import ServiceOverloadedError
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter driven by observed request latency.
+
+    The limit grows by 1/limit per fast, successful request while the
+    limiter is in use, and shrinks by `backoff` (at most once per
+    `target_latency`) when a request is slow or fails upstream. Requests
+    beyond the limit are rejected at once instead of queueing.
+
+    Fast requests, which are answered from caches without upstream calls,
+    may use `fast_headroom` extra capacity and do not move the limit.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        target_latency: float,
+        backoff: float = 0.9,
+        fast_headroom: float = 0.5,
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.fast_headroom = fast_headroom
+
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.latency_ewma: Optional[float] = None
+        self._last_decrease = 0.0
+
+    def try_acquire(self, fast: bool = False) -> bool:
+        capacity = self.limit * (1 + self.fast_headroom) if fast else self.limit
+        if self.in_flight >= capacity:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self, latency: float, ok: bool, fast: bool = False) -> None:
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if fast:
+            return
+
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+        now = time.monotonic()
+        if not ok or latency > self.target_latency:
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif in_flight >= self.limit / 2:
+            # Only grow while the current limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from recent latency"""
+        return max(1, math.ceil(self.latency_ewma or self.target_latency))
+
+    @asynccontextmanager
+    async def admit(self, fast: bool = False) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the block.
+
+        Raises:
+            ServiceOverloadedError: If the request is over the current limit
+        """
+        if not self.try_acquire(fast):
+            logger.warning(
+                f"Rejecting request: {self.in_flight} in flight, limit {self.limit:.1f}"
+            )
+            raise ServiceOverloadedError(self.retry_after())
+
+        started = time.monotonic()
+        ok = True
+        try:
+            yield
+        except HTTPException as e:
+            # Client errors say nothing about upstream health
+            ok = e.status_code < 500
+            raise
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self.release(time.monotonic() - started, ok, fast)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+        }
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+
+
+def get_limiter() -> AdaptiveLimiter:
+    """The per-process admission limiter for /distance"""
+    global _limiter
+    if _limiter is None:
+        settings = get_settings()
+        _limiter = AdaptiveLimiter(
+            initial=settings.ADMISSION_INITIAL_LIMIT,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            max_limit=settings.ADMISSION_MAX_LIMIT,
+            target_latency=settings.ADMISSION_TARGET_LATENCY_MS / 1000,
+        )
+    return _limiter
@@ -1,6 +1,7 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, field_validator
-from typing import Optional
+from typing import Any, Optional
 
 
 class Settings(BaseSettings):
@@ -10,37 +11,157 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Distance Calculator API"
 
-    # Database
-    POSTGRES_HOST: str
-    POSTGRES_USER: str
-    POSTGRES_PASSWORD: str
-    POSTGRES_DB: str
+    # Database; either DATABASE_URL or all POSTGRES_* values are needed
+    # before the first database access, but not to import the app.
+    # DATABASE_URL may also be a sqlite+aiosqlite URL, e.g. for tests;
+    # partitioning and bulk ingest are then unavailable.
+    POSTGRES_HOST: Optional[str] = None
+    POSTGRES_USER: Optional[str] = None
+    POSTGRES_PASSWORD: Optional[str] = None
+    POSTGRES_DB: Optional[str] = None
     POSTGRES_PORT: str = "5432"
-    DATABASE_URL: Optional[PostgresDsn] = None
+    DATABASE_URL: Optional[str] = None
+
+    # query_history partitioning and retention
+    HISTORY_PARTITION_MONTHS_AHEAD: int = 3
+    HISTORY_RETENTION_MONTHS: Optional[int] = None  # None keeps history forever
+    HISTORY_ARCHIVE_DIR: str = "archive"
+    HISTORY_MAINTENANCE_INTERVAL_SECONDS: int = 6 * 60 * 60
+    HISTORY_MAINTENANCE_RETRY_SECONDS: int = 5 * 60
+
+    # Cross-worker state. When set, caches and upstream limits live in this
+    # SQLite file (ideally under /dev/shm) shared by all worker processes;
+    # otherwise they are per process.
+    SHARED_STORE_PATH: Optional[str] = None
+    GEOCODE_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    GEOCODE_NEGATIVE_CACHE_TTL_SECONDS: int = 60 * 60
+    CLEAN_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+
+    # Admission control on /distance (per worker process)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 32
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 256
+    ADMISSION_TARGET_LATENCY_MS: int = 3000
+
+    # /places/nearby index: new addresses are read in at most this often,
+    # and the whole index is reloaded to catch updated coordinates
+    PLACES_REFRESH_SECONDS: float = 5.0
+    PLACES_RELOAD_SECONDS: int = 60 * 60
+
+    # Background distance jobs. The /jobs endpoints are only served when
+    # JOBS_TOKEN is set, to requests sending it in X-Jobs-Token
+    JOBS_TOKEN: Optional[str] = None
+    JOB_WORKERS: int = 4  # pairs processed concurrently per worker process
+    JOB_MAX_PAIRS: int = 100_000
+    JOB_MAX_BODY_BYTES: int = 32 * 1024 * 1024
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    # A running job whose owner has not checked in for this long is resumed
+    # by another process (e.g. after a crash or redeploy)
+    JOB_STALE_AFTER_SECONDS: int = 60
+
+    # Idempotency-Key on /distance: how long responses are replayable, how
+    # long an in-flight claim survives a crashed worker, and how long a
+    # duplicate waits for the original before getting a 409
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_LOCK_SECONDS: int = 120
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0
+
+    # Event-loop lag sampling; a callback blocking the loop for longer than
+    # LOOP_STALL_THRESHOLD_MS is logged with its stack
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.5
+    LOOP_STALL_THRESHOLD_MS: int = 100
+
+    # /debug/* endpoints are only served when DEBUG_TOKEN is set, to
+    # requests sending it in X-Debug-Token
+    DEBUG_TOKEN: Optional[str] = None
+    # Frames kept per allocation when tracing memory; 0 leaves tracemalloc
+    # off (it slows allocations down noticeably)
+    DEBUG_TRACEMALLOC_FRAMES: int = 0
+
+    # Bulk history imports (python -m app.services.ingest, POST /admin/ingest);
+    # the endpoint is only served when ADMIN_TOKEN is set, to requests
+    # sending it in X-Admin-Token
+    INGEST_CHUNK_SIZE: int = 20_000
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Per-client rate limiting: by X-API-Key if it is one of the
+    # comma-separated RATE_LIMIT_API_KEYS, else by IP
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PER_MINUTE: float = 60
+    RATE_LIMIT_BURST: int = 20
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # enable behind a trusted proxy
+    RATE_LIMIT_API_KEYS: str = ""
 
     # Nominatim
     NOMINATIM_USER_AGENT: str = "DistanceCalculator/1.0"
     NOMINATIM_BASE_URL: str = "https://nominatim.openstreetmap.org"
+    # Public Nominatim allows one request per second; 0 disables the limit
+    NOMINATIM_RATE_LIMIT_PER_SEC: float = 1.0
+    # Concurrent requests across all workers; raise for a self-hosted server
+    NOMINATIM_MAX_CONCURRENCY: int = 2
+    # Try street/city/state/country parameters before free-text q=
+    NOMINATIM_STRUCTURED_QUERIES: bool = True
+
+    # Geocoding providers, comma-separated: "gazetteer" (the addresses
+    # table), "nominatim" and "http" (GEOCODER_HTTP_URL). They are ranked by
+    # recent latency and error rate (EWMA), not by this order.
+    GEOCODER_PROVIDERS: str = "gazetteer,nominatim"
+    GEOCODER_HTTP_URL: Optional[str] = None
+    GEOCODER_HTTP_QUERY_PARAM: str = "q"
+    # Race the next provider when one is this slow; None disables hedging
+    GEOCODER_HEDGE_AFTER_MS: Optional[int] = None
+    GEOCODER_EWMA_ALPHA: float = 0.2
 
     # reCAPTCHA
-    RECAPTCHA_SECRET_KEY: str
+    RECAPTCHA_SECRET_KEY: Optional[str] = None
+    RECAPTCHA_VERIFY_URL: str = "https://www.google.com/recaptcha/api/siteverify"
+    RECAPTCHA_TOKEN_TTL_SECONDS: int = 120  # Google tokens are valid for two minutes
+    RECAPTCHA_TOKEN_MAX_USES: int = 3
+    RECAPTCHA_MAX_CONCURRENCY: int = 16
+    RECAPTCHA_STUB: bool = False  # accept any non-empty token, for local testing
 
     # OpenAI
-    OPENAI_API_KEY: str
+    OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None  # None uses the SDK default
+    OPENAI_MAX_CONCURRENCY: int = 8  # across all workers
+    # Batched cleaning needs a model with JSON-schema structured output
+    OPENAI_BATCH_MODEL: str = "gpt-4o-mini"
+    CLEAN_BATCH_SIZE: int = 20
 
     @field_validator("DATABASE_URL", mode="before")
-    def assemble_db_url(cls, v: Optional[str], values) -> str:
+    def assemble_db_url(cls, v: Optional[str], values) -> Optional[str]:
         if v:
-            return v
-        
-        return PostgresDsn.build(
+            if not str(v).startswith(("postgresql", "sqlite")):
+                raise ValueError("DATABASE_URL must be a postgresql or sqlite URL")
+            return str(v)
+
+        required = ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_DB")
+        if not all(values.data.get(key) for key in required):
+            return None
+
+        return str(PostgresDsn.build(
             scheme="postgresql+asyncpg",
             username=values.data["POSTGRES_USER"],
             password=values.data["POSTGRES_PASSWORD"],
             host=values.data["POSTGRES_HOST"],
             port=int(values.data["POSTGRES_PORT"]),
             path=values.data["POSTGRES_DB"],
-        )
+        ))
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Build settings on first use rather than at import time"""
+    return Settings()
 
 
-settings = Settings() 
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Keeps `from app.core.config import settings` working for scripts
+    # such as alembic/env.py, while deferring construction until then.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+ 
\ No newline at end of file
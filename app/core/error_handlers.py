@@ -11,7 +11,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": format_error_response(exc.status_code, exc)}
+        content={"detail": format_error_response(exc.status_code, exc)},
+        headers=exc.headers
     )
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -16,10 +16,12 @@ class APIError(HTTPException):
         status_code: int,
         code: str,
         message: str,
+        headers: Optional[Dict[str, str]] = None,
     ) -> None:
         super().__init__(
             status_code=status_code,
-            detail={"code": code, "message": message}
+            detail={"code": code, "message": message},
+            headers=headers
         )
 
 
@@ -65,4 +67,78 @@ class AddressNotFoundError(APIError):
          status_code=422,
             code="ADDRESS_NOT_FOUND",
             message=f"Could not find coordinates for {side} address: {address}"   
-        )
\ No newline at end of file
+        )
+
+
+class ServiceOverloadedError(APIError):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=503,
+            code="SERVICE_OVERLOADED",
+            message="The service is currently overloaded. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class JobNotFoundError(APIError):
+    def __init__(self, job_id: str):
+        super().__init__(
+            status_code=404,
+            code="JOB_NOT_FOUND",
+            message=f"Job not found: {job_id}"
+        )
+
+
+class InvalidJobError(APIError):
+    def __init__(self, message: str):
+        super().__init__(
+            status_code=422,
+            code="INVALID_JOB",
+            message=message
+        )
+
+
+class PayloadTooLargeError(APIError):
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=413,
+            code="PAYLOAD_TOO_LARGE",
+            message=f"Request body exceeds {max_bytes} bytes"
+        )
+
+
+class IdempotencyKeyReusedError(APIError):
+    def __init__(self):
+        super().__init__(
+            status_code=422,
+            code="IDEMPOTENCY_KEY_REUSED",
+            message="This Idempotency-Key was already used with a different request."
+        )
+
+
+class IdempotentRequestInProgressError(APIError):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=409,
+            code="IDEMPOTENT_REQUEST_IN_PROGRESS",
+            message="A request with this Idempotency-Key is still being processed.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class InvalidIngestError(APIError):
+    def __init__(self, message: str):
+        super().__init__(
+            status_code=422,
+            code="INVALID_INGEST",
+            message=message
+        )
+
+
+class IngestInProgressError(APIError):
+    def __init__(self, name: str):
+        super().__init__(
+            status_code=409,
+            code="INGEST_IN_PROGRESS",
+            message=f"Ingest '{name}' is already running"
+        )
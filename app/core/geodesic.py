@@ -0,0 +1,196 @@
+from math import atan, atan2, cos, pi, radians, sin, sqrt, tan
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from app.core.haversine import calculate_distance as haversine_distance
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+EARTH_RADIUS_M = 6371000.0  # spherical mode, as in app.core.haversine
+KM_TO_MILES = 0.621371
+
+MODES = ("spherical", "ellipsoidal")
+
+_MAX_ITERATIONS = 200
+_TOLERANCE = 1e-12
+
+
+def vincenty_inverse(lat1: float, lon1: float, lat2: float, lon2: float) -> Optional[float]:
+    """
+    Distance in meters along the WGS-84 ellipsoid by Vincenty's inverse
+    formula, accurate to well under a millimetre.
+
+    Returns:
+        None if the iteration does not converge, which happens only for
+        nearly antipodal points
+    """
+    f = WGS84_F
+    L = (radians(lon2 - lon1) + pi) % (2 * pi) - pi
+    U1 = atan((1 - f) * tan(radians(lat1)))
+    U2 = atan((1 - f) * tan(radians(lat2)))
+    sinU1, cosU1 = sin(U1), cos(U1)
+    sinU2, cosU2 = sin(U2), cos(U2)
+
+    lam = L
+    for _ in range(_MAX_ITERATIONS):
+        sin_lam, cos_lam = sin(lam), cos(lam)
+        sin_sigma = sqrt((cosU2 * sin_lam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+        if sin_sigma == 0:
+            return 0.0  # coincident points
+        cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+        sigma = atan2(sin_sigma, cos_sigma)
+        sin_alpha = cosU1 * cosU2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha ** 2
+        # cos2_alpha is 0 for lines along the equator
+        cos_2sigma_m = cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha if cos2_alpha else 0.0
+        C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        lam_prev = lam
+        lam = L + (1 - C) * f * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        if abs(lam) > pi:
+            return None  # diverging
+        if abs(lam - lam_prev) < _TOLERANCE:
+            break
+    else:
+        return None
+
+    u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    return WGS84_B * A * (sigma - delta_sigma)
+
+
+def karney_inverse(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Distance in meters along the WGS-84 ellipsoid by Karney's algorithm,
+    which converges for all pairs, including antipodal ones.
+    """
+    # Only needed for the rare pairs Vincenty cannot solve
+    from geographiclib.geodesic import Geodesic
+
+    return Geodesic.WGS84.Inverse(lat1, lon1, lat2, lon2, Geodesic.DISTANCE)["s12"]
+
+
+def ellipsoidal_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """WGS-84 geodesic distance in meters: Vincenty, else Karney"""
+    meters = vincenty_inverse(lat1, lon1, lat2, lon2)
+    if meters is None:
+        meters = karney_inverse(lat1, lon1, lat2, lon2)
+    return meters
+
+
+def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float,
+                       mode: str = "spherical") -> Tuple[float, float]:
+    """
+    Distance between two points in the given mode.
+
+    Args:
+        mode: "spherical" (haversine, R=6371 km) or "ellipsoidal" (WGS-84)
+
+    Returns:
+        Tuple of (distance in kilometers, distance in miles), rounded to
+        2 decimals like `app.core.haversine.calculate_distance`
+    """
+    if mode == "spherical":
+        return haversine_distance(lat1, lon1, lat2, lon2)
+    if mode != "ellipsoidal":
+        raise ValueError(f"Unknown distance mode: {mode}")
+
+    distance_km = round(ellipsoidal_meters(lat1, lon1, lat2, lon2) / 1000, 2)
+    return distance_km, round(distance_km * KM_TO_MILES, 2)
+
+
+def haversine_meters_batch(lat1, lon1, lat2, lon2) -> "np.ndarray":
+    """Vectorized spherical distance in meters over arrays of coordinates"""
+    import numpy as np
+
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _sigma_terms(np, lam, sinU1, cosU1, sinU2, cosU2):
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    sin_sigma = np.sqrt((cosU2 * sin_lam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+    cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+    sigma = np.arctan2(sin_sigma, cos_sigma)
+    sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+    cos2_alpha = 1 - sin_alpha ** 2
+    cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+    return sin_sigma, cos_sigma, sigma, sin_alpha, cos2_alpha, cos_2sigma_m
+
+
+def vincenty_meters_batch(lat1, lon1, lat2, lon2) -> "np.ndarray":
+    """
+    Vectorized Vincenty inverse over arrays of coordinates.
+
+    Each iteration only updates the pairs that have not yet converged;
+    pairs that do not converge at all are solved one by one with
+    `karney_inverse`.
+    """
+    import numpy as np
+
+    lat1, lon1, lat2, lon2 = (np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    f = WGS84_F
+    L = (np.radians(lon2 - lon1) + np.pi) % (2 * np.pi) - np.pi
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    failed = np.zeros(L.shape, dtype=bool)
+    active = np.arange(L.size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(_MAX_ITERATIONS):
+            sin_sigma, cos_sigma, sigma, sin_alpha, cos2_alpha, cos_2sigma_m = _sigma_terms(
+                np, lam[active], sinU1[active], cosU1[active], sinU2[active], cosU2[active]
+            )
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_next = L[active] + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            diverged = ~(np.abs(lam_next) <= np.pi)
+            converged = np.abs(lam_next - lam[active]) < _TOLERANCE
+            lam[active] = lam_next
+            failed[active[diverged]] = True
+            active = active[~(converged | diverged)]
+            if active.size == 0:
+                break
+        failed[active] = True
+
+        sin_sigma, cos_sigma, sigma, _, cos2_alpha, cos_2sigma_m = _sigma_terms(
+            np, lam, sinU1, cosU1, sinU2, cosU2
+        )
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        meters = WGS84_B * A * (sigma - delta_sigma)
+
+    meters[sin_sigma == 0] = 0.0
+    for i in np.flatnonzero(failed | ~np.isfinite(meters)):
+        meters[i] = karney_inverse(lat1[i], lon1[i], lat2[i], lon2[i])
+    return meters
+
+
+def distance_meters_batch(lat1, lon1, lat2, lon2, mode: str = "spherical") -> "np.ndarray":
+    """Vectorized distances in meters (unrounded) for arrays of pairs"""
+    if mode == "spherical":
+        return haversine_meters_batch(lat1, lon1, lat2, lon2)
+    if mode == "ellipsoidal":
+        return vincenty_meters_batch(lat1, lon1, lat2, lon2)
+    raise ValueError(f"Unknown distance mode: {mode}")
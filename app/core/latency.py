@@ -0,0 +1,50 @@
+import math
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+def percentile_ms(sorted_seconds: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted latencies in seconds, in milliseconds"""
+    if not sorted_seconds:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_seconds)) - 1, 0)
+    return round(sorted_seconds[rank] * 1000, 1)
+
+
+class LatencyStats:
+    """
+    Outcome counts and a rolling window of latencies for one kind of call.
+
+    Outcomes are free-form labels, e.g. "found", "not_found" or "error";
+    everything except "error" counts as a success. Exponentially weighted
+    moving averages of latency and error rate track recent behaviour.
+    """
+
+    def __init__(self, window: int = 1024, alpha: float = 0.2):
+        self.outcomes: Counter = Counter()
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float, outcome: str) -> None:
+        self.outcomes[outcome] += 1
+        self._latencies.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        self.error_ewma += self.alpha * ((outcome == "error") - self.error_ewma)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(self.outcomes.values())
+        latencies = sorted(self._latencies)
+        return {
+            "count": total,
+            "outcomes": dict(self.outcomes),
+            "success_rate": round(1 - self.outcomes["error"] / total, 4) if total else None,
+            "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "error_rate_ewma": round(self.error_ewma, 4),
+        }
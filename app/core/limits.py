@@ -0,0 +1,56 @@
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.core.shared_store import LocalStore, get_store
+
+
+async def pace(name: str, rate: float) -> None:
+    """
+    Wait for the next slot of a global rate limit shared by all workers.
+
+    Args:
+        name: Limit name, e.g. the upstream service
+        rate: Allowed calls per second; 0 or less disables the limit
+    """
+    if rate <= 0:
+        return
+    wait = get_store().gcra(f"pace:{name}", rate, burst=1, reserve=True)
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+class GlobalConcurrencyLimit:
+    """
+    Limit concurrent operations across all worker processes.
+
+    Within a process an asyncio.Semaphore queues callers; across processes
+    each holder takes a leased slot in the shared store, so a crashed
+    worker's slots free up once their lease expires.
+    """
+
+    def __init__(self, name: str, limit: int, lease: float = 30.0):
+        self.name = name
+        self.limit = limit
+        self.lease = lease
+        self._local = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        async with self._local:
+            store = get_store()
+            if isinstance(store, LocalStore):
+                yield
+                return
+
+            holder = f"{os.getpid()}-{uuid.uuid4().hex}"
+            delay = 0.005
+            while not store.acquire_slot(self.name, holder, self.limit, self.lease):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.1)
+            try:
+                yield
+            finally:
+                store.release_slot(self.name, holder)
@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.latency import percentile_ms
+
+
+class LoopMonitor:
+    """
+    Event-loop lag sampler with a watchdog for blocking callbacks.
+
+    A task sleeps `interval` seconds at a time and records how late it
+    wakes up: the time the loop spent running other callbacks. A daemon
+    thread checks that those wake-ups keep coming; once the loop has been
+    stuck in one callback for `stall_after` seconds it captures the loop
+    thread's stack, which shows the code that is blocking it, and logs it.
+
+    The cost is one loop wake-up per interval and one thread wake-up per
+    half `stall_after`, so it can stay enabled in production.
+    """
+
+    def __init__(self, interval: float = 0.5, stall_after: float = 0.1, window: int = 1024):
+        self.interval = interval
+        self.stall_after = stall_after
+        self.samples = 0
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._lags: Deque[float] = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._last_tick: Optional[float] = None
+        self._loop_thread: Optional[int] = None
+        self._stalled = False
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        """Sample until cancelled; the watchdog runs alongside"""
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._tick(now, max(now - expected, 0.0))
+        finally:
+            self._stop.set()
+
+    def _tick(self, now: float, lag: float) -> None:
+        self.samples += 1
+        self._lags.append(lag)
+        self._max_lag = max(self._max_lag, lag)
+        self._last_tick = now
+        if self._stalled:
+            # The stall is over; record how long it lasted in the end
+            self._stalled = False
+            self.stalls[-1]["lag_ms"] = round(lag * 1000, 1)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.stall_after / 2):
+            if self._stalled or self._last_tick is None:
+                continue
+            overdue = time.monotonic() - self._last_tick - self.interval
+            if overdue < self.stall_after:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.stalls.append({
+                "at": time.time(),
+                "blocked_ms": round(overdue * 1000, 1),
+                "lag_ms": None,
+                "stack": stack,
+            })
+            self._stalled = True
+            logger.warning(f"Event loop blocked for {overdue * 1000:.0f} ms in:\n{stack}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        lags: List[float] = sorted(self._lags)
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "samples": self.samples,
+            "lag_p50_ms": percentile_ms(lags, 50),
+            "lag_p95_ms": percentile_ms(lags, 95),
+            "lag_p99_ms": percentile_ms(lags, 99),
+            "lag_max_ms": round(self._max_lag * 1000, 1),
+            "stall_threshold_ms": round(self.stall_after * 1000, 1),
+            "stalls": list(self.stalls),
+        }
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> LoopMonitor:
+    global _monitor
+    if _monitor is None:
+        settings = get_settings()
+        _monitor = LoopMonitor(
+            interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+            stall_after=settings.LOOP_STALL_THRESHOLD_MS / 1000,
+        )
+    return _monitor
@@ -0,0 +1,152 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, FrozenSet, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.shared_store import get_store
+
+
+class GcraLimiter:
+    """
+    Per-key GCRA rate limiter with bounded memory.
+
+    Each key costs one float (its theoretical arrival time), and every
+    check is O(1). Keys whose arrival time has passed hold no information
+    and are dropped as they reach the least-recently-used end. Past
+    `max_keys`, the least recently seen key is evicted, which only resets
+    that client's allowance.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def check(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Record a request for `key` if it conforms.
+
+        Returns:
+            0 if the request is allowed, else seconds until it would be
+        """
+        now = time.monotonic() if now is None else now
+        tat = max(self._tats.get(key, now), now)
+        wait = tat - self.tolerance - now
+        if wait > 0:
+            return wait
+
+        self._tats[key] = tat + self.interval
+        self._tats.move_to_end(key)
+        self._expire(now)
+        return 0.0
+
+    def _expire(self, now: float) -> None:
+        # Drop a couple of idle keys per call, plus any over the cap
+        for _ in range(2):
+            oldest = next(iter(self._tats.items()), None)
+            if oldest is None or oldest[1] > now:
+                break
+            self._tats.popitem(last=False)
+        while len(self._tats) > self.max_keys:
+            self._tats.popitem(last=False)
+
+
+_limiter: Optional[GcraLimiter] = None
+
+
+def get_rate_limiter() -> GcraLimiter:
+    global _limiter
+    if _limiter is None:
+        settings = get_settings()
+        _limiter = GcraLimiter(
+            rate=settings.RATE_LIMIT_PER_MINUTE / 60,
+            burst=settings.RATE_LIMIT_BURST,
+            max_keys=settings.RATE_LIMIT_MAX_KEYS,
+        )
+    return _limiter
+
+
+def _digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=4)
+def _known_keys(configured: str) -> FrozenSet[str]:
+    return frozenset(_digest(key.strip()) for key in configured.split(",") if key.strip())
+
+
+def api_key_scope(request: Request) -> Optional[str]:
+    """The client's API key as "key:<digest>", if it is a configured one"""
+    api_key = request.headers.get("X-API-Key")
+    if api_key and _digest(api_key) in _known_keys(get_settings().RATE_LIMIT_API_KEYS):
+        return f"key:{_digest(api_key)}"
+    return None
+
+
+def client_key(request: Request) -> str:
+    """
+    Identify the client by API key if it is a configured one, otherwise
+    by IP address.
+
+    Unknown keys are ignored rather than trusted, so rotating made-up
+    keys neither escapes the per-IP limit nor floods the limiter.
+    """
+    settings = get_settings()
+    scope = api_key_scope(request)
+    if scope is not None:
+        return scope
+
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def rate_limit_middleware(request: Request, call_next: Callable) -> Response:
+    """Middleware enforcing a per-client request rate on the API routes"""
+    settings = get_settings()
+    path = request.url.path
+    if (
+        not settings.RATE_LIMIT_ENABLED
+        or request.method == "OPTIONS"
+        or not path.startswith(settings.API_V1_STR)
+        or path.startswith(f"{settings.API_V1_STR}/health")
+    ):
+        return await call_next(request)
+
+    key = client_key(request)
+    if settings.SHARED_STORE_PATH:
+        # Multi-worker mode: one allowance per client across all workers
+        wait = get_store().gcra(
+            f"ratelimit:{key}",
+            rate=settings.RATE_LIMIT_PER_MINUTE / 60,
+            burst=settings.RATE_LIMIT_BURST,
+            reserve=False,
+        )
+    else:
+        wait = get_rate_limiter().check(key)
+
+    if wait > 0:
+        logger.warning(f"Rate limit exceeded for {key} on {request.method} {path}")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": {
+                "code": "RATE_LIMITED",
+                "message": "Too many requests. Please slow down."
+            }},
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+    return await call_next(request)
@@ -0,0 +1,251 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+class LocalStore:
+    """
+    In-process key/value store with TTLs, GCRA rate state and leased slots.
+
+    Used when the API runs as a single process. `SqliteStore` provides the
+    same interface shared between worker processes.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._tats: Dict[str, float] = {}
+        self._slots: Dict[str, Dict[str, float]] = {}
+        self._writes = 0
+
+    def _purge(self, now: float) -> None:
+        # Amortised cleanup so expired keys do not accumulate
+        self._writes += 1
+        if self._writes % 1024:
+            return
+        for key in [k for k, (_, exp) in self._values.items() if exp is not None and exp <= now]:
+            del self._values[key]
+        for key in [k for k, tat in self._tats.items() if tat <= now]:
+            del self._tats[key]
+
+    def get(self, key: str) -> Any:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.time():
+            del self._values[key]
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        self._values[key] = (value, now + ttl if ttl else None)
+        self._purge(now)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent; returns whether it was set"""
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        value = int(self.get(key) or 0) + 1
+        self.set(key, value)
+        return value
+
+    def incr_existing(self, key: str) -> Optional[int]:
+        """Increment a present counter, keeping its TTL; None if it is absent"""
+        value = self.get(key)
+        if value is None:
+            return None
+        self._values[key] = (int(value) + 1, self._values[key][1])
+        return int(value) + 1
+
+    def gcra(self, key: str, rate: float, burst: int = 1, reserve: bool = True) -> float:
+        """
+        Generic cell rate algorithm over one stored timestamp per key.
+
+        Args:
+            key: Limiter key
+            rate: Sustained rate in events per second
+            burst: Events allowed back to back
+            reserve: Always claim a slot, even in the future (pacing);
+                otherwise only claim it when it is available now (limiting)
+
+        Returns:
+            Seconds to wait before the event conforms; 0 if it does now
+        """
+        now = time.time()
+        interval = 1.0 / rate
+        tat = max(self._tats.get(key, now), now)
+        wait = max(tat + interval - burst * interval - now, 0.0)
+        if reserve or wait == 0:
+            self._tats[key] = tat + interval
+            self._purge(now)
+        return wait
+
+    def acquire_slot(self, name: str, holder: str, limit: int, lease: float) -> bool:
+        """Claim one of `limit` leased slots; expired leases are reclaimed"""
+        now = time.time()
+        slots = self._slots.setdefault(name, {})
+        for stale in [h for h, exp in slots.items() if exp <= now]:
+            del slots[stale]
+        if len(slots) >= limit:
+            return False
+        slots[holder] = now + lease
+        return True
+
+    def release_slot(self, name: str, holder: str) -> None:
+        self._slots.get(name, {}).pop(holder, None)
+
+
+class SqliteStore:
+    """
+    `LocalStore` interface over a SQLite file shared by worker processes.
+
+    Put the file on a RAM-backed filesystem such as /dev/shm. Every
+    operation is a single short transaction (tens of microseconds), so the
+    calls are made synchronously from the event loop.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL);
+        CREATE TABLE IF NOT EXISTS gcra (key TEXT PRIMARY KEY, tat REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS slots (
+            name TEXT NOT NULL, holder TEXT NOT NULL, expires REAL NOT NULL,
+            PRIMARY KEY (name, holder)
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(self._SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _write(self, fn):
+        """Run `fn(conn)` in an immediate (write-locked) transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._writes += 1
+                if self._writes % 1024 == 0:
+                    now = time.time()
+                    self._conn.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (now,))
+                    self._conn.execute("DELETE FROM gcra WHERE tat <= ?", (now,))
+                    self._conn.execute("DELETE FROM slots WHERE expires <= ?", (now,))
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.time() + ttl if ttl else None
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires),
+        ))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+
+        def _add(conn) -> bool:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires IS NOT NULL AND expires <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl if ttl else None),
+            )
+            return cursor.rowcount == 1
+        return self._write(_add)
+
+    def delete(self, key: str) -> None:
+        self._write(lambda conn: conn.execute("DELETE FROM kv WHERE key = ?", (key,)))
+
+    def incr(self, key: str) -> int:
+        def _incr(conn) -> int:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = (json.loads(row[0]) if row else 0) + 1
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, NULL)", (key, json.dumps(value)))
+            return value
+        return self._write(_incr)
+
+    def incr_existing(self, key: str) -> Optional[int]:
+        def _incr(conn) -> Optional[int]:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            value = json.loads(row[0]) + 1
+            conn.execute("UPDATE kv SET value = ? WHERE key = ?", (json.dumps(value), key))
+            return value
+        return self._write(_incr)
+
+    def gcra(self, key: str, rate: float, burst: int = 1, reserve: bool = True) -> float:
+        def _gcra(conn) -> float:
+            now = time.time()
+            interval = 1.0 / rate
+            row = conn.execute("SELECT tat FROM gcra WHERE key = ?", (key,)).fetchone()
+            tat = max(row[0] if row else now, now)
+            wait = max(tat + interval - burst * interval - now, 0.0)
+            if reserve or wait == 0:
+                conn.execute("INSERT OR REPLACE INTO gcra (key, tat) VALUES (?, ?)", (key, tat + interval))
+            return wait
+        return self._write(_gcra)
+
+    def acquire_slot(self, name: str, holder: str, limit: int, lease: float) -> bool:
+        def _acquire(conn) -> bool:
+            now = time.time()
+            conn.execute("DELETE FROM slots WHERE name = ? AND expires <= ?", (name, now))
+            (held,) = conn.execute("SELECT count(*) FROM slots WHERE name = ?", (name,)).fetchone()
+            if held >= limit:
+                return False
+            conn.execute("INSERT OR REPLACE INTO slots (name, holder, expires) VALUES (?, ?, ?)", (name, holder, now + lease))
+            return True
+        return self._write(_acquire)
+
+    def release_slot(self, name: str, holder: str) -> None:
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM slots WHERE name = ? AND holder = ?", (name, holder)
+        ))
+
+
+_store = None
+_store_pid: Optional[int] = None
+
+
+def get_store():
+    """
+    Return this process's store: a `SqliteStore` when SHARED_STORE_PATH is
+    set (multi-worker mode), otherwise an in-process `LocalStore`.
+    """
+    global _store, _store_pid
+    # SQLite connections must not be shared across fork()
+    if _store is None or _store_pid != os.getpid():
+        path = get_settings().SHARED_STORE_PATH
+        _store = SqliteStore(path) if path else LocalStore()
+        _store_pid = os.getpid()
+    return _store
@@ -0,0 +1,191 @@
+import heapq
+from dataclasses import dataclass
+from math import radians, sin, cos, asin, floor, sqrt
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Earth's radius in kilometers, same as the haversine module
+EARTH_RADIUS_KM = 6371.0
+
+Cell = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    latitude: float
+    longitude: float
+    x: float
+    y: float
+    z: float
+
+
+def to_unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Convert latitude/longitude in degrees to a point on the unit sphere"""
+    lat, lon = radians(lat), radians(lon)
+    return cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat)
+
+
+def chord_to_km(chord: float) -> float:
+    """Convert a straight-line distance on the unit sphere to great circle km"""
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km: float) -> float:
+    """Convert a great circle distance in km to a unit sphere chord length"""
+    angle = min(km / EARTH_RADIUS_KM, 3.141592653589793)
+    return 2 * sin(angle / 2)
+
+
+class SpatialIndex:
+    """
+    Incremental uniform grid over unit-sphere coordinates.
+
+    Points are bucketed into cubic cells in 3D space, so great circle
+    ordering is preserved (chord length is monotonic in arc length) and
+    there are no seams at the poles or the antimeridian. Inserts are O(1);
+    queries only visit the cells that can contain a match.
+    """
+
+    def __init__(self, cell_km: float = 50.0):
+        self._cell = km_to_chord(cell_km)
+        self._cells: Dict[Cell, Dict[str, Place]] = {}
+        self._places: Dict[str, Place] = {}
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._places
+
+    def _cell_of(self, x: float, y: float, z: float) -> Cell:
+        c = self._cell
+        return floor(x / c), floor(y / c), floor(z / c)
+
+    def add(self, name: str, lat: float, lon: float) -> None:
+        """Insert a place, replacing its coordinates if the name is known"""
+        existing = self._places.get(name)
+        if existing is not None:
+            if existing.latitude == lat and existing.longitude == lon:
+                return
+            self.remove(name)
+
+        place = Place(name, lat, lon, *to_unit_vector(lat, lon))
+        self._places[name] = place
+        self._cells.setdefault(self._cell_of(place.x, place.y, place.z), {})[name] = place
+
+    def remove(self, name: str) -> None:
+        place = self._places.pop(name, None)
+        if place is None:
+            return
+        key = self._cell_of(place.x, place.y, place.z)
+        bucket = self._cells[key]
+        del bucket[name]
+        if not bucket:
+            del self._cells[key]
+
+    def _cells_in_box(self, center: Cell, reach: int) -> Iterator[Dict[str, Place]]:
+        """Yield occupied cells within `reach` cells of `center` on every axis"""
+        # Enumerating the box is only worthwhile while it is smaller than
+        # the set of occupied cells; otherwise filter the occupied ones.
+        if (2 * reach + 1) ** 3 > len(self._cells):
+            cx, cy, cz = center
+            for (x, y, z), bucket in self._cells.items():
+                if abs(x - cx) <= reach and abs(y - cy) <= reach and abs(z - cz) <= reach:
+                    yield bucket
+            return
+
+        cx, cy, cz = center
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                for z in range(cz - reach, cz + reach + 1):
+                    bucket = self._cells.get((x, y, z))
+                    if bucket:
+                        yield bucket
+
+    def _shell(self, center: Cell, ring: int) -> Iterator[Dict[str, Place]]:
+        """Yield occupied cells at exactly Chebyshev distance `ring` from `center`"""
+        cx, cy, cz = center
+        if 24 * ring * ring + 2 > len(self._cells):
+            for (x, y, z), bucket in self._cells.items():
+                if max(abs(x - cx), abs(y - cy), abs(z - cz)) == ring:
+                    yield bucket
+            return
+
+        for x in range(cx - ring, cx + ring + 1):
+            for y in range(cy - ring, cy + ring + 1):
+                on_face = abs(x - cx) == ring or abs(y - cy) == ring
+                zs = range(cz - ring, cz + ring + 1) if on_face else {cz - ring, cz + ring}
+                for z in zs:
+                    bucket = self._cells.get((x, y, z))
+                    if bucket:
+                        yield bucket
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_km: Optional[float] = None) -> List[Tuple[Place, float]]:
+        """
+        Find the k places closest to a coordinate.
+
+        Args:
+            lat: Latitude in degrees
+            lon: Longitude in degrees
+            k: Maximum number of places to return
+            max_km: Optional great circle distance limit in km
+
+        Returns:
+            List of (place, distance in km) sorted by distance
+        """
+        if k <= 0 or not self._places:
+            return []
+
+        qx, qy, qz = to_unit_vector(lat, lon)
+        center = self._cell_of(qx, qy, qz)
+        limit = km_to_chord(max_km) if max_km is not None else 2.0
+        # A cell at ring r+1 is at least r cells away from the query point
+        max_ring = int(limit / self._cell) + 1
+        span = int(2.0 / self._cell) + 2
+
+        # Max-heap of the best k candidates as (-chord, name, place)
+        best: List[Tuple[float, str, Place]] = []
+        seen = 0
+        ring = 0
+        while ring <= min(max_ring, span) and seen < len(self._places):
+            for bucket in self._shell(center, ring):
+                for place in bucket.values():
+                    seen += 1
+                    d = sqrt((place.x - qx) ** 2 + (place.y - qy) ** 2 + (place.z - qz) ** 2)
+                    if d > limit:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, place.name, place))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, place.name, place))
+            if len(best) == k and -best[0][0] <= ring * self._cell:
+                break
+            ring += 1
+
+        ordered = sorted(((-neg, place) for neg, _, place in best), key=lambda item: item[0])
+        return [(place, chord_to_km(d)) for d, place in ordered]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[Place, float]]:
+        """
+        Find every place within a great circle radius of a coordinate.
+
+        Returns:
+            List of (place, distance in km) sorted by distance
+        """
+        if not self._places:
+            return []
+
+        qx, qy, qz = to_unit_vector(lat, lon)
+        limit = km_to_chord(radius_km)
+        reach = int(limit / self._cell) + 1
+
+        matches = []
+        for bucket in self._cells_in_box(self._cell_of(qx, qy, qz), reach):
+            for place in bucket.values():
+                d = sqrt((place.x - qx) ** 2 + (place.y - qy) ** 2 + (place.z - qz) ** 2)
+                if d <= limit:
+                    matches.append((d, place))
+
+        matches.sort(key=lambda item: item[0])
+        return [(place, chord_to_km(d)) for d, place in matches]
@@ -0,0 +1,26 @@
+import secrets
+from typing import Callable, Optional
+
+from fastapi import Header
+
+from app.core.config import get_settings
+from app.core.exceptions import APIError
+
+
+def token_dependency(setting: str, header: str, purpose: str) -> Callable[..., None]:
+    """
+    Build a dependency that hides endpoints unless the token in setting
+    `setting` is configured, and requires it in the `header` header.
+
+    Returns 404 while the token is unset and 403 for a wrong token.
+    Tokens are compared as bytes: headers arrive decoded as latin-1, and
+    `compare_digest` rejects non-ASCII strings with a TypeError.
+    """
+    def require_token(token: Optional[str] = Header(None, alias=header)) -> None:
+        expected = getattr(get_settings(), setting)
+        if not expected:
+            raise APIError(status_code=404, code="NOT_FOUND", message="Not found")
+        if not token or not secrets.compare_digest(token.encode(), expected.encode()):
+            raise APIError(status_code=403, code="FORBIDDEN", message=f"Invalid {purpose} token")
+
+    return require_token
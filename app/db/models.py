@@ -1,16 +1,133 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, func
+from sqlalchemy import Column, BigInteger, Integer, String, Numeric, Float, DateTime, ForeignKey, Index, Text, func
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
 
+class Address(Base):
+    """Dictionary of distinct cleaned addresses and their geocoded coordinates"""
+    __tablename__ = "addresses"
+
+    id = Column(Integer, primary_key=True)
+    address = Column(String, nullable=False, unique=True)
+    # Nullable because rows backfilled from old history may lack coordinates
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+
 class QueryHistory(Base):
+    # In Postgres this table is range-partitioned by month on created_at and
+    # its primary key is (id, created_at); see the e61f0b3a7c29 migration and
+    # app/services/partitions.py. The ORM only needs id for identity.
     __tablename__ = "query_history"
+    __table_args__ = (
+        Index("ix_query_history_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("addresses.id"), nullable=False)
+    destination_id = Column(Integer, ForeignKey("addresses.id"), nullable=False)
+    # Distance in whole metres; kilometers and miles are derived on read
+    meters = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False,  server_default=func.now())
+
+    source_address = relationship(Address, foreign_keys=[source_id], lazy="joined")
+    destination_address = relationship(Address, foreign_keys=[destination_id], lazy="joined")
+
+    @property
+    def source(self) -> str:
+        return self.source_address.address
+
+    @property
+    def destination(self) -> str:
+        return self.destination_address.address
+
+    @property
+    def kilometers(self) -> float:
+        return round(self.meters / 1000, 2)
+
+    @property
+    def miles(self) -> float:
+        # Same conversion as app.core.haversine.calculate_distance
+        return round(self.kilometers * 0.621371, 2)
+
+
+class HistoryPairStats(Base):
+    """Rollup of query_history per (source, destination) pair"""
+    __tablename__ = "history_pair_stats"
+
+    source = Column(String, primary_key=True)
+    destination = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total_kilometers = Column(Numeric(16, 2), nullable=False, default=0)
+    last_seen_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class HistoryHourlyStats(Base):
+    """Rollup of query_history per UTC hour"""
+    __tablename__ = "history_hourly_stats"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total_kilometers = Column(Numeric(16, 2), nullable=False, default=0)
+
+
+class HistoryDistanceBucket(Base):
+    """Histogram of query_history distances, keyed by bucket lower bound in km"""
+    __tablename__ = "history_distance_buckets"
+
+    bucket_km = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total_kilometers = Column(Numeric(16, 2), nullable=False, default=0)
+
+
+class Job(Base):
+    """A batch of distance calculations processed in the background"""
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False, default="pending")  # pending, running, completed
+    total = Column(Integer, nullable=False)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    # Process currently working on the job and its last sign of life; a
+    # running job with a stale heartbeat is picked up by another runner
+    owner = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+
+class JobItem(Base):
+    """One (source, destination) pair of a job and, once processed, its result"""
+    __tablename__ = "job_items"
+
+    job_id = Column(String(32), ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
     source = Column(String, nullable=False)
     destination = Column(String, nullable=False)
-    kilometers = Column(Numeric(10, 2), nullable=False)
-    miles = Column(Numeric(10, 2), nullable=False)
-    created_at = Column(DateTime(timezone=True), nullable=False,  server_default=func.now()) 
\ No newline at end of file
+    status = Column(String(16), nullable=False, default="pending")  # pending, done, error
+    source_address = Column(String, nullable=True)
+    destination_address = Column(String, nullable=True)
+    kilometers = Column(Float, nullable=True)
+    miles = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+
+
+class IngestCheckpoint(Base):
+    """Progress of a bulk history import, committed with each loaded chunk"""
+    __tablename__ = "ingest_checkpoints"
+
+    name = Column(String(128), primary_key=True)
+    # Input records consumed so far, valid or not; a resumed import skips them
+    position = Column(BigInteger, nullable=False, default=0)
+    loaded = Column(BigInteger, nullable=False, default=0)
+    rejected = Column(BigInteger, nullable=False, default=0)
+    # JSON list of CREATE INDEX statements for indexes dropped during the
+    # import, so they are recreated even if the importing process died
+    deferred_indexes = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
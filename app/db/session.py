@@ -1,25 +1,100 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from typing import Any, AsyncGenerator, Optional
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-from app.core.config import settings
+from app.core.config import get_settings
 
-engine = create_async_engine(
-    str(settings.DATABASE_URL),
-    echo=False,
-    future=True,
-)
+# Created on first use (or in the app lifespan) rather than at import time
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[sessionmaker] = None
 
-AsyncSessionLocal = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+def get_engine() -> AsyncEngine:
+    """Return the process-wide async engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        settings = get_settings()
+        if settings.DATABASE_URL is None:
+            raise RuntimeError("Database is not configured: set DATABASE_URL or POSTGRES_*")
+        _engine = build_engine(str(settings.DATABASE_URL))
+    return _engine
+
+
+def build_engine(url: str, **kwargs: Any) -> AsyncEngine:
+    """
+    Create an async engine for a PostgreSQL or SQLite URL
+
+    An in-memory SQLite database lives as long as its connection, so it
+    gets a single shared connection. SQLite connections are also made to
+    leave transaction handling to SQLAlchemy, which SAVEPOINT needs.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_async_engine(url, echo=False, future=True, **kwargs)
+
+    if parsed.database in (None, "", ":memory:"):
+        kwargs.setdefault("poolclass", StaticPool)
+    engine = create_async_engine(
+        url, echo=False, future=True, connect_args={"check_same_thread": False}, **kwargs
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def insert(db: AsyncSession, table: Any):
+    """INSERT for `table` that supports ON CONFLICT on the session's database"""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+
+def get_sessionmaker() -> sessionmaker:
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+    return _sessionmaker
+
+
+async def dispose_engine() -> None:
+    """Close pooled connections; the engine is recreated if used again"""
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
+
+
+def __getattr__(name: str) -> Any:
+    # Lazy aliases for the previous module-level objects
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency for getting async database sessions"""
-    async with AsyncSessionLocal() as session:
+    async with get_sessionmaker()() as session:
         try:
             yield session
             await session.commit()
@@ -27,4 +102,4 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
@@ -1,3 +1,8 @@
+import asyncio
+import contextlib
+import tracemalloc
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -5,10 +10,18 @@ from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from loguru import logger
 
-from app.core.config import settings
+from app.core.config import get_settings
 from app.core.logging import setup_logging
+from app.core.loop_monitor import get_loop_monitor
 from app.core.middleware import access_log_middleware
-from app.api import health, distance, history
+from app.core.rate_limit import rate_limit_middleware
+from app.api import health, distance, history, places, jobs, debug, admin
+from app.db.session import get_engine, dispose_engine
+from app.services.address_cleaner import close_client
+from app.services import recaptcha
+from app.services.geo_providers import close_providers
+from app.services.partitions import partition_maintenance_loop
+from app.services.jobs import get_job_runner
 
 from app.core.error_handlers import (
     http_exception_handler,
@@ -18,17 +31,54 @@ from app.core.error_handlers import (
 )
 
 
-# Setup logging
-setup_logging()
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Set up logging and shared resources, and start background tasks.
+
+    Done here rather than at import so importing the app stays cheap;
+    the OpenAI client is still created on first use.
+    """
+    setup_logging()
+    if settings.DATABASE_URL is not None:
+        get_engine()
+    else:
+        logger.warning("Database is not configured; database endpoints will fail")
+    if settings.DEBUG_TRACEMALLOC_FRAMES and not tracemalloc.is_tracing():
+        tracemalloc.start(settings.DEBUG_TRACEMALLOC_FRAMES)
+    background = [asyncio.create_task(partition_maintenance_loop())]
+    # Also resumes jobs left unfinished by a previous run
+    background.append(asyncio.create_task(get_job_runner().run()))
+    if settings.LOOP_MONITOR_ENABLED:
+        background.append(asyncio.create_task(get_loop_monitor().run()))
+    yield
+    for task in reversed(background):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await close_client()
+    await recaptcha.close_client()
+    await close_providers()
+    await dispose_engine()
+
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
 )
 
+# Per-client rate limiting. The middleware added last runs first, so this
+# sits inside CORS (429s get CORS headers and preflights are not charged)
+# and inside the access log (429s are logged)
+app.middleware("http")(rate_limit_middleware)
+
 # Setup CORS
 app.add_middleware(
     CORSMiddleware,
@@ -52,4 +102,8 @@ app.add_exception_handler(Exception, global_exception_handler)
 # Include routers
 app.include_router(health.router, prefix=settings.API_V1_STR)
 app.include_router(distance.router, prefix=settings.API_V1_STR)
-app.include_router(history.router, prefix=settings.API_V1_STR) 
\ No newline at end of file
+app.include_router(history.router, prefix=settings.API_V1_STR)
+app.include_router(places.router, prefix=settings.API_V1_STR)
+app.include_router(jobs.router, prefix=settings.API_V1_STR)
+app.include_router(debug.router, prefix=settings.API_V1_STR)
+app.include_router(admin.router, prefix=settings.API_V1_STR)
\ No newline at end of file
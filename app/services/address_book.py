@@ -0,0 +1,65 @@
+from typing import Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Address
+from app.db.session import insert
+
+
+async def upsert_addresses(
+    db: AsyncSession,
+    addresses: Mapping[str, Optional[Tuple[float, float]]],
+) -> Dict[str, int]:
+    """
+    Return the dictionary ids for addresses, inserting the missing ones.
+
+    Coordinates given for an address replace stored ones that differ, so
+    the dictionary always holds the latest geocoding result; None leaves
+    them as they are. Existing rows are only locked when their
+    coordinates change, and rows are always written in address order, so
+    concurrent requests for the same pair in opposite directions cannot
+    deadlock.
+    """
+    names = sorted(addresses)
+    if not names:
+        return {}
+
+    statement = insert(db, Address).values([
+        {
+            "address": name,
+            "latitude": addresses[name][0] if addresses[name] else None,
+            "longitude": addresses[name][1] if addresses[name] else None,
+        }
+        for name in names
+    ])
+    statement = statement.on_conflict_do_nothing(index_elements=[Address.address])
+    result = await db.execute(statement.returning(Address.address, Address.id))
+    ids = dict(result.all())
+
+    existing = [name for name in names if name not in ids]
+    if existing:
+        result = await db.execute(
+            select(Address.address, Address.id, Address.latitude, Address.longitude)
+            .where(Address.address.in_(existing))
+            .order_by(Address.address)
+        )
+        for name, address_id, latitude, longitude in result.all():
+            ids[name] = address_id
+            coords = addresses[name]
+            if coords is not None and (latitude, longitude) != tuple(coords):
+                await db.execute(
+                    update(Address)
+                    .where(Address.id == address_id)
+                    .values(latitude=coords[0], longitude=coords[1])
+                )
+    return ids
+
+
+async def upsert_address(
+    db: AsyncSession,
+    address: str,
+    coords: Optional[Tuple[float, float]] = None,
+) -> int:
+    """Return the dictionary id for one address; see `upsert_addresses`"""
+    return (await upsert_addresses(db, {address: coords}))[address]
@@ -1,14 +1,86 @@
+import asyncio
+import hashlib
 import json
-from typing import Dict, Tuple
-import openai
-from openai import AsyncOpenAI
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 from loguru import logger
 from fastapi import HTTPException
 
-from app.core.config import settings
+from app.core.config import get_settings
+from app.core.limits import GlobalConcurrencyLimit
+from app.core.shared_store import get_store
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# The openai SDK is slow to import, so the client is built on first use
+_client: Optional["AsyncOpenAI"] = None
+
+
+def get_client() -> "AsyncOpenAI":
+    """Return the shared OpenAI client, importing the SDK on first use"""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        if not settings.OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY is not configured")
+
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+    _client = None
+
+
+_openai_limit: Optional[GlobalConcurrencyLimit] = None
+
+
+def get_openai_limit() -> GlobalConcurrencyLimit:
+    """Concurrency limit on OpenAI requests, shared by all workers"""
+    global _openai_limit
+    if _openai_limit is None:
+        _openai_limit = GlobalConcurrencyLimit("openai", get_settings().OPENAI_MAX_CONCURRENCY)
+    return _openai_limit
+
+
+# Fields every cleaning result must have
+REQUIRED_FIELDS = ("source", "destination", "sourceCorrected", "destinationCorrected")
+
+# OpenAI requests, pairs cleaned and tokens used, for both cleaning paths
+usage: Counter = Counter()
+
+
+def _record_usage(response: Any, pairs: int) -> None:
+    usage["requests"] += 1
+    usage["pairs"] += pairs
+    if getattr(response, "usage", None) is not None:
+        usage["prompt_tokens"] += response.usage.prompt_tokens
+        usage["completion_tokens"] += response.usage.completion_tokens
+
+
+def _fallback(source: str, destination: str) -> Dict[str, Any]:
+    return {
+        "source": source,
+        "destination": destination,
+        "sourceCorrected": False,
+        "destinationCorrected": False
+    }
+
+
+def _cache_key(source: str, destination: str) -> str:
+    digest = hashlib.sha256(f"{source}\x00{destination}".encode()).hexdigest()
+    return f"clean:{digest}"
+
+
+def cached_cleaning(source: str, destination: str) -> Optional[Dict[str, any]]:
+    """Previously cleaned result for this pair, without calling OpenAI"""
+    return get_store().get(_cache_key(source, destination))
 
 SYSTEM_PROMPT = """You are an address cleaning service. Your task is to:
 1. Remove email addresses, postal codes, and extraneous tokens
@@ -40,17 +112,22 @@ async def clean_addresses(source: str, destination: str) -> Dict[str, any]:
     Raises:
         HTTPException: If the OpenAI response format is invalid
     """
+    cached = cached_cleaning(source, destination)
+    if cached is not None:
+        return cached
+
     try:
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": f"""
+        async with get_openai_limit().hold():
+            response = await get_client().chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": f"""
         Please clean and normalize the following user inputs before geocoding:
 
         Source: {source}
@@ -73,12 +150,13 @@ async def clean_addresses(source: str, destination: str) -> Dict[str, any]:
         "destinationCorrected": true|false
         }}
         """
-                }
-            ],
-            temperature=0,
-            max_tokens=150,
-            timeout=5
-        )
+                    }
+                ],
+                temperature=0,
+                max_tokens=150,
+                timeout=5
+            )
+        _record_usage(response, 1)
 
         
         # Extract the response text
@@ -89,10 +167,14 @@ async def clean_addresses(source: str, destination: str) -> Dict[str, any]:
             result = json.loads(result_text)
             
             # Validate required fields
-            required_fields = ["source", "destination", "sourceCorrected", "destinationCorrected"]
-            if not all(field in result for field in required_fields):
+            if not all(field in result for field in REQUIRED_FIELDS):
                 raise ValueError("Missing required fields in response")
-                
+
+            # Only real cleaning results are cached, never the fallback below
+            get_store().set(
+                _cache_key(source, destination), result,
+                ttl=get_settings().CLEAN_CACHE_TTL_SECONDS,
+            )
             return result
             
         except (json.JSONDecodeError, ValueError) as e:
@@ -108,9 +190,174 @@ async def clean_addresses(source: str, destination: str) -> Dict[str, any]:
     except Exception as e:
         # Log warning and fall back to original addresses
         logger.warning(f"Error cleaning addresses with OpenAI: {str(e)}")
-        return {
-            "source": source,
-            "destination": destination,
-            "sourceCorrected": False,
-            "destinationCorrected": False
-        } 
\ No newline at end of file
+        return _fallback(source, destination)
+
+
+BATCH_INSTRUCTIONS = """Please clean and normalize the source and destination of every item below before geocoding.
+
+Instructions:
+- Strip out any email addresses, postal codes, or other non–place tokens; these removals do **not** count as corrections.
+- Only if you correct an actual typo or replace a wrong place name (e.g. “toooooooronto” → “Toronto”) set the item's corresponding `…Corrected` flag to `true`.
+- Removing extraneous tokens or only adjusting letter casing sets the flags to `false`.
+- Return exactly one result per item, with the item's `id`.
+
+Items:
+"""
+
+BATCH_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "source": {"type": "string"},
+                    "destination": {"type": "string"},
+                    "sourceCorrected": {"type": "boolean"},
+                    "destinationCorrected": {"type": "boolean"},
+                },
+                "required": ["id", *REQUIRED_FIELDS],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+
+def validate_result(item: Any) -> Optional[Dict[str, Any]]:
+    """
+    Check one cleaning result against the REQUIRED_FIELDS contract.
+
+    Returns:
+        The result without extra keys, or None if it is invalid
+    """
+    if not isinstance(item, dict) or not all(field in item for field in REQUIRED_FIELDS):
+        return None
+    result = {field: item[field] for field in REQUIRED_FIELDS}
+    for field in ("source", "destination"):
+        if not isinstance(result[field], str) or not result[field].strip():
+            return None
+    for field in ("sourceCorrected", "destinationCorrected"):
+        if not isinstance(result[field], bool):
+            return None
+    return result
+
+
+async def _request_batch(pairs: Sequence[Tuple[str, str]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Clean a batch of pairs in a single structured-output request.
+
+    Returns:
+        Valid results by index in `pairs`; missing or invalid items are
+        left out
+
+    Raises:
+        ValueError: If the response is not the expected JSON document
+    """
+    items = [
+        {"id": index, "source": source, "destination": destination}
+        for index, (source, destination) in enumerate(pairs)
+    ]
+    async with get_openai_limit().hold():
+        response = await get_client().chat.completions.create(
+            model=get_settings().OPENAI_BATCH_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": BATCH_INSTRUCTIONS + json.dumps(items, ensure_ascii=False)},
+            ],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "cleaned_addresses", "strict": True, "schema": BATCH_RESPONSE_SCHEMA},
+            },
+            temperature=0,
+            max_tokens=60 * len(pairs) + 50,
+            timeout=5 + 0.5 * len(pairs)
+        )
+    _record_usage(response, len(pairs))
+
+    try:
+        results = json.loads(response.choices[0].message.content)["results"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid batch response: {e}")
+    if not isinstance(results, list):
+        raise ValueError("Invalid batch response: results is not a list")
+
+    valid: Dict[int, Dict[str, Any]] = {}
+    for item in results:
+        result = validate_result(item)
+        index = item.get("id") if isinstance(item, dict) else None
+        if result is not None and isinstance(index, int) and 0 <= index < len(pairs):
+            valid.setdefault(index, result)
+    return valid
+
+
+async def _split_batch(pairs: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Clean both halves of `pairs` separately; a single pair falls back"""
+    if len(pairs) == 1:
+        return [_fallback(*pairs[0])]
+    middle = len(pairs) // 2
+    halves = await asyncio.gather(_clean_batch(pairs[:middle]), _clean_batch(pairs[middle:]))
+    return halves[0] + halves[1]
+
+
+async def _clean_batch(pairs: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Clean `pairs`, splitting the batch in half whenever a response cannot
+    be parsed or has no valid results, and retrying items whose results
+    were invalid, until single pairs fall back to their original addresses.
+    """
+    try:
+        valid = await _request_batch(pairs)
+    except Exception as e:
+        logger.warning(f"Error cleaning batch of {len(pairs)} addresses with OpenAI: {str(e)}")
+        return await _split_batch(pairs)
+
+    missing = [index for index in range(len(pairs)) if index not in valid]
+    if len(missing) == len(pairs):
+        logger.warning(f"All {len(pairs)} batch results invalid or missing")
+        return await _split_batch(pairs)
+    if missing:
+        # Strictly fewer pairs than this batch, so retries always end
+        logger.warning(f"{len(missing)} of {len(pairs)} batch results invalid or missing")
+        retried = await _clean_batch([pairs[index] for index in missing])
+        valid.update(zip(missing, retried))
+
+    ttl = get_settings().CLEAN_CACHE_TTL_SECONDS
+    for index in range(len(pairs)):
+        if index not in missing:
+            get_store().set(_cache_key(*pairs[index]), valid[index], ttl=ttl)
+    return [valid[index] for index in range(len(pairs))]
+
+
+async def clean_addresses_batch(pairs: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Clean many (source, destination) pairs with few OpenAI requests.
+
+    Pairs are deduplicated and answered from the cache where possible; the
+    rest are sent CLEAN_BATCH_SIZE at a time using structured (JSON
+    schema) output, so the system prompt is paid once per batch rather
+    than once per pair. Batches run concurrently within the shared OpenAI
+    concurrency limit. Results are cached exactly like `clean_addresses`,
+    and pairs that cannot be cleaned fall back to their original addresses.
+
+    Returns:
+        One result per pair, in order, in the `clean_addresses` format
+    """
+    results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    pending = []
+    for pair in dict.fromkeys(pairs):
+        cached = cached_cleaning(*pair)
+        if cached is not None:
+            results[pair] = cached
+        else:
+            pending.append(pair)
+
+    size = get_settings().CLEAN_BATCH_SIZE
+    batches = [pending[start:start + size] for start in range(0, len(pending), size)]
+    for batch, cleaned in zip(batches, await asyncio.gather(*(_clean_batch(batch) for batch in batches))):
+        results.update(zip(batch, cleaned))
+    return [results[pair] for pair in pairs]
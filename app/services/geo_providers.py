@@ -0,0 +1,235 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.core.latency import LatencyStats
+from app.db.models import Address
+from app.db.session import get_sessionmaker
+from app.services import nominatim
+
+Coordinates = Tuple[float, float]
+
+
+class GeocodingProvider(ABC):
+    """
+    A source of coordinates for cleaned addresses.
+
+    `lookup` returns coordinates, or None when the provider has no result,
+    and raises on failure. A None from an `authoritative` provider means
+    the address does not exist; from any other provider it only means
+    the provider does not know it.
+    """
+
+    name = "provider"
+    authoritative = True
+
+    @abstractmethod
+    async def lookup(self, address: str) -> Optional[Coordinates]:
+        ...
+
+
+class NominatimProvider(GeocodingProvider):
+    name = "nominatim"
+
+    async def lookup(self, address: str) -> Optional[Coordinates]:
+        return await nominatim.lookup(address)
+
+
+class GazetteerProvider(GeocodingProvider):
+    """Addresses already geocoded and stored in the `addresses` table"""
+
+    name = "gazetteer"
+    authoritative = False
+
+    async def lookup(self, address: str) -> Optional[Coordinates]:
+        async with get_sessionmaker()() as db:
+            row = (await db.execute(
+                select(Address.latitude, Address.longitude)
+                .where(Address.address == address, Address.latitude.is_not(None))
+            )).first()
+        return (row[0], row[1]) if row else None
+
+
+class HttpProvider(GeocodingProvider):
+    """
+    Any geocoding service answering `GET url?<query_param>=<address>` with
+    a Nominatim-style JSON list of `{"lat": ..., "lon": ...}` objects, or
+    a single such object.
+    """
+
+    def __init__(self, name: str, url: str, query_param: str = "q", timeout: float = 10.0):
+        self.name = name
+        self.url = url
+        self.query_param = query_param
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def lookup(self, address: str) -> Optional[Coordinates]:
+        response = await self._client.get(self.url, params={self.query_param: address})
+        response.raise_for_status()
+        results = response.json()
+        if isinstance(results, list):
+            results = results[0] if results else None
+        if not results:
+            return None
+        return float(results["lat"]), float(results["lon"])
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class GeocodingRouter:
+    """
+    Query providers in order of their recent performance.
+
+    Each provider is scored by its EWMA latency plus `error_penalty`
+    seconds times its EWMA error rate, so a provider failing fast does not
+    look fast; providers without data yet come first so they get measured.
+    Providers are tried best first until one gives a conclusive answer:
+    coordinates, or None from an authoritative provider. Errors and
+    inconclusive answers move on to the next.
+
+    With `hedge_after` set, a provider that has not answered within that
+    many seconds is raced against the next one, and the first conclusive
+    answer wins. The loser is cancelled, and the time it had taken is
+    recorded as its latency so that it ranks lower next time.
+    """
+
+    def __init__(self, providers: List[GeocodingProvider], hedge_after: Optional[float] = None,
+                 error_penalty: float = 1.0, alpha: float = 0.2):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.error_penalty = error_penalty
+        self.stats: Dict[str, LatencyStats] = {
+            provider.name: LatencyStats(alpha=alpha) for provider in providers
+        }
+
+    def score(self, provider: GeocodingProvider) -> float:
+        stats = self.stats[provider.name]
+        if stats.latency_ewma is None:
+            return 0.0
+        return stats.latency_ewma + self.error_penalty * stats.error_ewma
+
+    def ranked(self) -> List[GeocodingProvider]:
+        # sorted() is stable, so configuration order breaks ties
+        return sorted(self.providers, key=self.score)
+
+    async def _timed(self, provider: GeocodingProvider, address: str) -> Optional[Coordinates]:
+        started = time.monotonic()
+        try:
+            coords = await provider.lookup(address)
+        except asyncio.CancelledError:
+            self.stats[provider.name].record(time.monotonic() - started, "cancelled")
+            raise
+        except Exception:
+            self.stats[provider.name].record(time.monotonic() - started, "error")
+            raise
+        self.stats[provider.name].record(time.monotonic() - started, "found" if coords else "not_found")
+        return coords
+
+    async def lookup(self, address: str) -> Optional[Coordinates]:
+        """
+        Returns:
+            Coordinates, or None if not found
+
+        Raises:
+            The last provider error, if no provider gave a conclusive answer
+            and at least one failed
+        """
+        queue = self.ranked()
+        running: Dict[asyncio.Task, GeocodingProvider] = {}
+        error: Optional[BaseException] = None
+
+        def start_next() -> None:
+            provider = queue.pop(0)
+            running[asyncio.create_task(self._timed(provider, address))] = provider
+
+        start_next()
+        try:
+            while running:
+                hedge = self.hedge_after if queue else None
+                done, _ = await asyncio.wait(running, timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.debug(f"Hedging geocode of '{address}' after {hedge}s")
+                    start_next()
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        logger.warning(f"Geocoding provider {provider.name} failed: {error}")
+                        continue
+                    coords = task.result()
+                    if coords is not None or provider.authoritative:
+                        return coords
+                if not running and queue:
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        if error is not None:
+            raise error
+        return None
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            provider.name: {**self.stats[provider.name].snapshot(), "score": round(self.score(provider), 4)}
+            for provider in self.providers
+        }
+
+
+def build_providers() -> List[GeocodingProvider]:
+    """Providers named in GEOCODER_PROVIDERS, in that order"""
+    settings = get_settings()
+    providers: List[GeocodingProvider] = []
+    for name in (part.strip() for part in settings.GEOCODER_PROVIDERS.split(",")):
+        if name == "nominatim":
+            providers.append(NominatimProvider())
+        elif name == "gazetteer":
+            if settings.DATABASE_URL is None:
+                logger.warning("Gazetteer geocoding provider needs a database; skipping it")
+                continue
+            providers.append(GazetteerProvider())
+        elif name == "http":
+            if not settings.GEOCODER_HTTP_URL:
+                raise ValueError("GEOCODER_HTTP_URL is required for the http geocoding provider")
+            providers.append(HttpProvider("http", settings.GEOCODER_HTTP_URL, settings.GEOCODER_HTTP_QUERY_PARAM))
+        elif name:
+            raise ValueError(f"Unknown geocoding provider: {name}")
+    if not providers:
+        raise ValueError("GEOCODER_PROVIDERS must name at least one usable provider")
+    return providers
+
+
+_router: Optional[GeocodingRouter] = None
+
+
+def get_router() -> GeocodingRouter:
+    global _router
+    if _router is None:
+        settings = get_settings()
+        hedge_ms = settings.GEOCODER_HEDGE_AFTER_MS
+        _router = GeocodingRouter(
+            build_providers(),
+            hedge_after=hedge_ms / 1000 if hedge_ms else None,
+            alpha=settings.GEOCODER_EWMA_ALPHA,
+        )
+    return _router
+
+
+async def close_providers() -> None:
+    global _router
+    await nominatim.close_client()
+    if _router is not None:
+        for provider in _router.providers:
+            if isinstance(provider, HttpProvider):
+                await provider.close()
+    _router = None
@@ -1,50 +1,99 @@
-from typing import Optional, Tuple
-import httpx
+import asyncio
+from typing import Dict, Iterable, Optional, Tuple
 from loguru import logger
 from app.core.exceptions import GeocodingError, AddressNotFoundError
-from app.core.config import settings
+from app.core.config import get_settings
+from app.core.shared_store import get_store
+from app.services.geo_providers import get_router
+
+
+def _cache_key(address: str) -> str:
+    return "geocode:" + " ".join(address.lower().split())
+
+
+def cached_coordinates(address: str) -> Optional[dict]:
+    """
+    Look up an address in the geocode cache without calling any provider.
+
+    Returns:
+        {"lat": ..., "lon": ...}, {"missing": True} for a cached miss,
+        or None if the address is not cached
+    """
+    return get_store().get(_cache_key(address))
+
+
+def _remember(address: str, coords: Optional[Tuple[float, float]]) -> None:
+    settings = get_settings()
+    if coords is None:
+        get_store().set(
+            _cache_key(address), {"missing": True},
+            ttl=settings.GEOCODE_NEGATIVE_CACHE_TTL_SECONDS,
+        )
+    else:
+        get_store().set(
+            _cache_key(address), {"lat": coords[0], "lon": coords[1]},
+            ttl=settings.GEOCODE_CACHE_TTL_SECONDS,
+        )
 
 
 async def get_coordinates(address: str, side: str) -> Optional[Tuple[float, float]]:
     """
-    Get coordinates (latitude, longitude) for an address using Nominatim.
-    
+    Get coordinates (latitude, longitude) for an address.
+
+    Results, including misses, are cached in the shared store; on a cache
+    miss the configured providers are asked (see `geo_providers`).
+
     Args:
         address: The address to geocode
-        
+
     Returns:
         Tuple of (latitude, longitude) if found, None otherwise
     """
-    params = {
-        "q": address,
-        "format": "json",
-        "limit": 1,
-    }
-    
-    headers = {
-        "User-Agent": settings.NOMINATIM_USER_AGENT
-    }
-    
+    cached = cached_coordinates(address)
+    if cached is not None:
+        if cached.get("missing"):
+            raise AddressNotFoundError(address, side)
+        return cached["lat"], cached["lon"]
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.NOMINATIM_BASE_URL}/search",
-                params=params,
-                headers=headers,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            
-            results = response.json()
-            
-            if not results:
-                logger.warning(f"No coordinates found for address: {address}")
-                raise AddressNotFoundError(address, side)  
-            return float(results[0]["lat"]), float(results[0]["lon"])
-        
-    except AddressNotFoundError:
-        raise
-            
+        coords = await get_router().lookup(address)
     except Exception as e:
-        logger.error(f"Error getting coordinates for {address}: {e}", exc_info=True)
-        raise GeocodingError()
\ No newline at end of file
+        logger.exception(f"Error getting coordinates for {address}: {e}")
+        raise GeocodingError()
+
+    _remember(address, coords)
+    if coords is None:
+        logger.warning(f"No coordinates found for address: {address}")
+        raise AddressNotFoundError(address, side)
+    return coords
+
+
+async def get_coordinates_batch(addresses: Iterable[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """
+    Geocode many addresses concurrently.
+
+    Each distinct address is looked up once, with cached addresses
+    answered from the cache; Nominatim lookups share one connection pool,
+    bounded by NOMINATIM_MAX_CONCURRENCY and the rate limit.
+
+    Returns:
+        Coordinates per address; None if not found. Addresses whose lookup
+        failed are left out, and are not cached, so they can be retried.
+    """
+    results: Dict[str, Optional[Tuple[float, float]]] = {}
+    pending = []
+    for address in dict.fromkeys(addresses):
+        cached = cached_coordinates(address)
+        if cached is None:
+            pending.append(address)
+        else:
+            results[address] = None if cached.get("missing") else (cached["lat"], cached["lon"])
+
+    outcomes = await asyncio.gather(*(get_router().lookup(address) for address in pending), return_exceptions=True)
+    for address, outcome in zip(pending, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Error getting coordinates for {address}: {outcome}")
+            continue
+        _remember(address, outcome)
+        results[address] = outcome
+    return results
@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.core.shared_store import get_store
+
+VERSION_KEY = "history:version"
+
+
+def history_version() -> int:
+    """
+    Current version of the query history, shared by all workers.
+
+    The counter starts from the current time in milliseconds, so versions
+    (and the ETags built from them) keep increasing across restarts even
+    with a per-process store.
+    """
+    store = get_store()
+    version = store.get(VERSION_KEY)
+    if version is None:
+        store.add(VERSION_KEY, int(time.time() * 1000))
+        version = store.get(VERSION_KEY)
+    return int(version)
+
+
+def bump_history_version() -> int:
+    """Mark the history as changed; call after committing new rows"""
+    history_version()
+    return get_store().incr(VERSION_KEY)
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """(created_at, id) of the last row of the previous page; None if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        return None
+
+
+def make_etag(version: int, limit: int, cursor: Optional[str]) -> str:
+    digest = hashlib.sha1(f"{limit}|{cursor or ''}".encode()).hexdigest()[:12]
+    return f'"{version}-{digest}"'
+
+
+class ResponseCache:
+    """
+    Small LRU of serialized responses, keyed by ETag.
+
+    ETags include the history version, so entries for an old version are
+    never served again and simply age out.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[str]]]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        entry = self._entries.get(etag)
+        if entry is not None:
+            self._entries.move_to_end(etag)
+        return entry
+
+    def put(self, etag: str, body: bytes, next_cursor: Optional[str]) -> None:
+        self._entries[etag] = (body, next_cursor)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Per process: bodies are cheap to rebuild, only the version is shared
+response_cache = ResponseCache()
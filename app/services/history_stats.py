@@ -0,0 +1,129 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import HistoryPairStats, HistoryHourlyStats, HistoryDistanceBucket
+from app.db.session import insert
+
+# Lower bounds (km) of the distance histogram buckets
+DISTANCE_BUCKETS_KM = [0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def bucket_for(kilometers: float) -> int:
+    """Return the lower bound of the histogram bucket containing `kilometers`"""
+    return DISTANCE_BUCKETS_KM[max(bisect_right(DISTANCE_BUCKETS_KM, kilometers) - 1, 0)]
+
+
+def hour_of(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+async def record_query(
+    db: AsyncSession,
+    source: str,
+    destination: str,
+    kilometers: float,
+    created_at: Optional[datetime] = None,
+) -> None:
+    """
+    Fold one new query_history row into the rollup tables.
+
+    Runs in the caller's transaction so the rollups commit (or roll back)
+    together with the history row.
+    """
+    now = created_at or datetime.now(timezone.utc)
+
+    pair = insert(db, HistoryPairStats).values(
+        source=source,
+        destination=destination,
+        count=1,
+        total_kilometers=kilometers,
+        last_seen_at=now,
+    )
+    await db.execute(pair.on_conflict_do_update(
+        index_elements=[HistoryPairStats.source, HistoryPairStats.destination],
+        set_={
+            "count": HistoryPairStats.count + 1,
+            "total_kilometers": HistoryPairStats.total_kilometers + pair.excluded.total_kilometers,
+            "last_seen_at": pair.excluded.last_seen_at,
+        },
+    ))
+
+    hourly = insert(db, HistoryHourlyStats).values(
+        hour=hour_of(now), count=1, total_kilometers=kilometers
+    )
+    await db.execute(hourly.on_conflict_do_update(
+        index_elements=[HistoryHourlyStats.hour],
+        set_={
+            "count": HistoryHourlyStats.count + 1,
+            "total_kilometers": HistoryHourlyStats.total_kilometers + hourly.excluded.total_kilometers,
+        },
+    ))
+
+    bucket = insert(db, HistoryDistanceBucket).values(
+        bucket_km=bucket_for(kilometers), count=1, total_kilometers=kilometers
+    )
+    await db.execute(bucket.on_conflict_do_update(
+        index_elements=[HistoryDistanceBucket.bucket_km],
+        set_={
+            "count": HistoryDistanceBucket.count + 1,
+            "total_kilometers": HistoryDistanceBucket.total_kilometers + bucket.excluded.total_kilometers,
+        },
+    ))
+
+
+async def get_stats(db: AsyncSession, top: int, hours: int) -> Dict[str, Any]:
+    """
+    Read aggregate history statistics from the rollup tables.
+
+    Cost depends on the size of the rollups, not of query_history.
+    """
+    totals = (await db.execute(
+        select(
+            func.coalesce(func.sum(HistoryDistanceBucket.count), 0),
+            func.coalesce(func.sum(HistoryDistanceBucket.total_kilometers), 0),
+        )
+    )).one()
+    total_count, total_km = int(totals[0]), float(totals[1])
+
+    pairs = (await db.execute(
+        select(HistoryPairStats)
+        .order_by(HistoryPairStats.count.desc(), HistoryPairStats.last_seen_at.desc())
+        .limit(top)
+    )).scalars().all()
+
+    since = hour_of(datetime.now(timezone.utc)) - timedelta(hours=hours - 1)
+    hourly = (await db.execute(
+        select(HistoryHourlyStats)
+        .where(HistoryHourlyStats.hour >= since)
+        .order_by(HistoryHourlyStats.hour)
+    )).scalars().all()
+
+    buckets = {
+        row.bucket_km: row.count
+        for row in (await db.execute(select(HistoryDistanceBucket))).scalars()
+    }
+
+    return {
+        "total_queries": total_count,
+        "average_kilometers": round(total_km / total_count, 2) if total_count else 0.0,
+        "top_pairs": [
+            {
+                "source": row.source,
+                "destination": row.destination,
+                "count": row.count,
+                "average_kilometers": round(float(row.total_kilometers) / row.count, 2),
+            }
+            for row in pairs
+        ],
+        "hourly": [
+            {"hour": row.hour, "count": row.count} for row in hourly
+        ],
+        "distance_histogram": [
+            {"min_kilometers": lower, "count": buckets.get(lower, 0)}
+            for lower in DISTANCE_BUCKETS_KM
+        ],
+    }
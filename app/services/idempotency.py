@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from app.core.config import get_settings
+from app.core.exceptions import IdempotencyKeyReusedError, IdempotentRequestInProgressError
+from app.core.shared_store import get_store
+
+# How often a duplicate in another worker process checks for the result
+POLL_INTERVAL_SECONDS = 0.05
+
+# Futures of requests in flight in this process, so that duplicates here
+# wake up as soon as the original finishes instead of polling
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def store_key(client: str, idempotency_key: str) -> str:
+    """Keys are scoped to `client` and hashed to a fixed, short length"""
+    digest = hashlib.sha256(f"{client}|{idempotency_key}".encode()).hexdigest()[:32]
+    return f"idempotency:{digest}"
+
+
+def fingerprint(*parts: Any) -> str:
+    """Identify the request a key was first used with"""
+    return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:16]
+
+
+async def run_once(
+    key: str,
+    request_fingerprint: str,
+    compute: Callable[[], Awaitable[Dict[str, Any]]],
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Run `compute` at most once per idempotency key.
+
+    The first request claims the key in the shared store and runs
+    `compute`; its response is stored for IDEMPOTENCY_TTL_SECONDS and
+    replayed to later requests with the same key. Duplicates arriving
+    while it runs wait for it, for up to IDEMPOTENCY_WAIT_SECONDS. If
+    `compute` raises, the claim is released so that a retry runs afresh.
+
+    Returns:
+        The response, and whether it was replayed
+
+    Raises:
+        IdempotencyKeyReusedError: The key was used for a different request
+        IdempotentRequestInProgressError: The original is still running
+    """
+    settings = get_settings()
+    store = get_store()
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+    while not store.add(key, {"fingerprint": request_fingerprint}, ttl=settings.IDEMPOTENCY_LOCK_SECONDS):
+        entry = store.get(key)
+        if entry is None:
+            continue  # released or expired since; try to claim it again
+        if entry["fingerprint"] != request_fingerprint:
+            raise IdempotencyKeyReusedError()
+        if "response" in entry:
+            return entry["response"], True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotentRequestInProgressError(retry_after=1)
+        original = _inflight.get(key)
+        if original is None:
+            await asyncio.sleep(min(POLL_INTERVAL_SECONDS, remaining))
+            continue
+        try:
+            await asyncio.wait_for(asyncio.shield(original), remaining)
+        except asyncio.TimeoutError:
+            pass
+
+    done = asyncio.get_running_loop().create_future()
+    _inflight[key] = done
+    try:
+        response = await compute()
+    except BaseException:
+        store.delete(key)
+        raise
+    else:
+        store.set(
+            key,
+            {"fingerprint": request_fingerprint, "response": response},
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+        )
+        return response, False
+    finally:
+        del _inflight[key]
+        done.set_result(None)
@@ -0,0 +1,577 @@
+"""
+Bulk import of legacy distance records into query_history.
+
+Records are read from CSV (with a header row) or NDJSON, one per line:
+
+    source, destination, created_at (ISO 8601; UTC if no offset),
+    meters or kilometers, and/or source_lat, source_lon,
+    destination_lat, destination_lon
+
+Records without a distance get one computed from their coordinates, a
+whole chunk at a time. Valid records are loaded INGEST_CHUNK_SIZE at a
+time with COPY. Each chunk commits in one transaction together with its
+address upserts, its rollup updates and the import's checkpoint, so an
+interrupted import resumes after its last loaded chunk when run again
+with the same name.
+
+    SHARED_STORE_PATH=/dev/shm/distance-api-store.sqlite3 \
+        python -m app.services.ingest legacy.csv.gz --name legacy-2019 --defer-indexes
+
+The API's cached /history pages are invalidated through its shared store,
+so the command needs SHARED_STORE_PATH unless no API is running.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import math
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.exceptions import IngestInProgressError, InvalidIngestError
+from app.core.geodesic import distance_meters_batch
+from app.db.session import get_engine
+from app.services.history_cache import bump_history_version
+from app.services.history_stats import bucket_for, hour_of
+from app.services.partitions import create_missing_partitions, is_partitioned
+
+COPY_COLUMNS = ["source_id", "destination_id", "meters", "created_at"]
+MAX_REPORTED_ERRORS = 20
+# No two points on Earth are further apart than half the equator; this
+# also keeps meters well within query_history's int4 column
+MAX_METERS = 20_040_000
+# Address ids are remembered across chunks up to this many addresses
+ADDRESS_CACHE_SIZE = 1_000_000
+
+
+class IngestRow(NamedTuple):
+    source: str
+    destination: str
+    created_at: datetime
+    meters: Optional[int]
+    source_coords: Optional[Tuple[float, float]]
+    destination_coords: Optional[Tuple[float, float]]
+
+
+def _number(raw: Dict[str, Any], name: str) -> Optional[float]:
+    value = raw.get(name)
+    if value is None or value == "":
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+
+def _coords(raw: Dict[str, Any], side: str) -> Optional[Tuple[float, float]]:
+    lat, lon = _number(raw, f"{side}_lat"), _number(raw, f"{side}_lon")
+    if lat is None and lon is None:
+        return None
+    if lat is None or lon is None:
+        raise ValueError(f"{side}_lat and {side}_lon must be given together")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"{side} coordinates out of range")
+    return lat, lon
+
+
+def validate_record(raw: Dict[str, Any]) -> IngestRow:
+    """
+    Check one input record and convert it to an `IngestRow`.
+
+    Raises:
+        ValueError: With a message saying what is wrong with the record
+    """
+    source = str(raw.get("source") or "").strip()
+    destination = str(raw.get("destination") or "").strip()
+    if not source or not destination:
+        raise ValueError("source and destination are required")
+
+    created_at = raw.get("created_at")
+    if not created_at:
+        raise ValueError("created_at is required")
+    created_at = datetime.fromisoformat(str(created_at))
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    source_coords, destination_coords = _coords(raw, "source"), _coords(raw, "destination")
+    meters, kilometers = _number(raw, "meters"), _number(raw, "kilometers")
+    if meters is None and kilometers is not None:
+        meters = kilometers * 1000
+    if meters is None and (source_coords is None or destination_coords is None):
+        raise ValueError("a distance or both sides' coordinates are required")
+    if meters is not None and meters < 0:
+        raise ValueError("distance must not be negative")
+    if meters is not None and meters > MAX_METERS:
+        raise ValueError(f"distance must not exceed {MAX_METERS // 1000} km")
+
+    return IngestRow(
+        source, destination, created_at,
+        round(meters) if meters is not None else None,
+        source_coords, destination_coords,
+    )
+
+
+def fill_distances(rows: List[IngestRow], mode: str = "spherical") -> List[IngestRow]:
+    """Compute the distances rows lack from their coordinates, in one vectorized pass"""
+    missing = [i for i, row in enumerate(rows) if row.meters is None]
+    if not missing:
+        return rows
+    meters = distance_meters_batch(
+        [rows[i].source_coords[0] for i in missing],
+        [rows[i].source_coords[1] for i in missing],
+        [rows[i].destination_coords[0] for i in missing],
+        [rows[i].destination_coords[1] for i in missing],
+        mode=mode,
+    )
+    rows = list(rows)
+    for i, value in zip(missing, meters):
+        rows[i] = rows[i]._replace(meters=int(round(value)))
+    return rows
+
+
+@dataclass
+class Rollups:
+    """A chunk's contribution to the history rollup tables"""
+    pairs: Dict[Tuple[str, str], List[Any]] = field(default_factory=dict)  # [count, km, last_seen_at]
+    hours: Dict[datetime, List[Any]] = field(default_factory=lambda: defaultdict(lambda: [0, 0.0]))
+    buckets: Dict[int, List[Any]] = field(default_factory=lambda: defaultdict(lambda: [0, 0.0]))
+
+    @classmethod
+    def of(cls, rows: List[IngestRow]) -> "Rollups":
+        rollups = cls()
+        for row in rows:
+            kilometers = row.meters / 1000
+            pair = rollups.pairs.get((row.source, row.destination))
+            if pair is None:
+                rollups.pairs[(row.source, row.destination)] = [1, kilometers, row.created_at]
+            else:
+                pair[0] += 1
+                pair[1] += kilometers
+                pair[2] = max(pair[2], row.created_at)
+            for totals in (rollups.hours[hour_of(row.created_at)], rollups.buckets[bucket_for(kilometers)]):
+                totals[0] += 1
+                totals[1] += kilometers
+        return rollups
+
+
+def address_coordinates(rows: List[IngestRow]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """Distinct addresses of a chunk, with the latest coordinates seen for each"""
+    addresses: Dict[str, Optional[Tuple[float, float]]] = {}
+    seen_at: Dict[str, datetime] = {}
+    for row in rows:
+        for address, coords in ((row.source, row.source_coords), (row.destination, row.destination_coords)):
+            if coords is None:
+                addresses.setdefault(address, None)
+            elif address not in seen_at or row.created_at >= seen_at[address]:
+                addresses[address] = coords
+                seen_at[address] = row.created_at
+    return addresses
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    """
+    Split a byte stream into decoded lines, yielded in batches (one per
+    incoming chunk) to keep per-line overhead low. Fields must not
+    contain newlines.
+    """
+    buffer = b""
+    encoding = "utf-8-sig"  # drop a byte order mark at the start
+    async for chunk in chunks:
+        buffer += chunk
+        head, newline, buffer = buffer.rpartition(b"\n")
+        if newline:
+            yield head.decode(encoding).split("\n")
+            encoding = "utf-8"
+    if buffer:
+        yield [buffer.decode(encoding)]
+
+
+async def read_file(path: str, size: int = 1 << 20) -> AsyncIterator[bytes]:
+    """Chunks of a file, gunzipped if its name ends in .gz"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as file:
+        while True:
+            chunk = file.read(size)
+            if not chunk:
+                return
+            yield chunk
+            await asyncio.sleep(0)
+
+
+async def gunzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Decompress a gzip byte stream as it arrives, including files made of
+    several concatenated gzip members.
+
+    Raises:
+        InvalidIngestError: If the stream is not valid gzip
+    """
+    decompressor = zlib.decompressobj(wbits=31)
+    try:
+        async for chunk in chunks:
+            while chunk:
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+                # Bytes past the end of a member start the next one
+                chunk = decompressor.unused_data
+                if chunk:
+                    decompressor = zlib.decompressobj(wbits=31)
+        if not decompressor.eof:
+            raise InvalidIngestError("Truncated gzip body")
+    except zlib.error as e:
+        raise InvalidIngestError(f"Invalid gzip body: {e}")
+
+
+async def iter_records(lines: AsyncIterator[List[str]], fmt: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Records as dicts. Unparseable lines are yielded as {"_error": message}
+    so that they count as (rejected) records.
+    """
+    header: Optional[List[str]] = None
+    async for batch in lines:
+        if fmt == "ndjson":
+            for line in batch:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield {"_error": f"invalid JSON: {e}"}
+                    continue
+                yield record if isinstance(record, dict) else {"_error": "not a JSON object"}
+            continue
+
+        for values in csv.reader(batch):
+            if not values:
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                missing = {"source", "destination", "created_at"} - set(header)
+                if missing:
+                    raise InvalidIngestError(f"CSV header lacks {', '.join(sorted(missing))}")
+            elif len(values) != len(header):
+                yield {"_error": f"expected {len(header)} fields, got {len(values)}"}
+            else:
+                yield dict(zip(header, values))
+
+
+class Ingest:
+    """One bulk import, run over a single raw asyncpg connection"""
+
+    def __init__(self, name: str, db, partitioned: bool, mode: str):
+        self.name = name
+        self.db = db
+        self.partitioned = partitioned
+        self.mode = mode
+        self.address_ids: Dict[str, int] = {}
+        self.months: set = set()
+        self.report: Dict[str, Any] = {"name": name, "loaded": 0, "rejected": 0, "skipped": 0, "errors": []}
+        self.started = time.monotonic()
+
+    async def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        row = await self.db.fetchrow(
+            "SELECT position, loaded, rejected, deferred_indexes, finished_at "
+            "FROM ingest_checkpoints WHERE name = $1",
+            self.name,
+        )
+        return dict(row) if row else None
+
+    async def defer_indexes(self) -> List[str]:
+        """Drop query_history's secondary indexes, remembering how to rebuild them"""
+        rows = await self.db.fetch("""
+            SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            WHERE t.relname = 'query_history' AND NOT x.indisunique AND NOT x.indisprimary
+        """)
+        statements = [definition for _, definition in rows]
+        async with self.db.transaction():
+            await self.db.execute(
+                "UPDATE ingest_checkpoints SET deferred_indexes = $2 WHERE name = $1",
+                self.name, json.dumps(statements),
+            )
+            for index_name, _ in rows:
+                await self.db.execute(f'DROP INDEX "{index_name}"')
+        return statements
+
+    async def restore_indexes(self, statements: List[str]) -> None:
+        for statement in statements:
+            started = time.monotonic()
+            # pg_get_indexdef gives "ON ONLY" for partitioned tables, which
+            # would not build the partitions' indexes
+            statement = statement.replace(" ON ONLY ", " ON ", 1)
+            statement = statement.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1)
+            await self.db.execute(statement)
+            logger.info(f"Ingest {self.name}: rebuilt index in {time.monotonic() - started:.1f}s: {statement}")
+        await self.db.execute(
+            "UPDATE ingest_checkpoints SET deferred_indexes = NULL WHERE name = $1", self.name
+        )
+
+    async def ensure_partitions(self, rows: List[IngestRow]) -> None:
+        utc = (row.created_at.astimezone(timezone.utc) for row in rows)
+        months = {date(moment.year, moment.month, 1) for moment in utc} - self.months
+        if not self.partitioned or not months:
+            return
+        # Separate short transaction: partition DDL should not wait on the chunk
+        async with get_engine().begin() as conn:
+            created = await create_missing_partitions(conn, months)
+        if created:
+            logger.info(f"Ingest {self.name}: created partitions {', '.join(created)}")
+        self.months |= months
+
+    async def address_id_map(self, rows: List[IngestRow]) -> Dict[str, int]:
+        """
+        Ids of the chunk's addresses, inserting new ones. Imported
+        coordinates only fill in missing ones: live geocoding is newer.
+        """
+        coords = address_coordinates(rows)
+        new = [address for address in coords if address not in self.address_ids]
+        if len(self.address_ids) + len(new) > ADDRESS_CACHE_SIZE:
+            # Start over with just this chunk's addresses
+            self.address_ids.clear()
+            new = list(coords)
+        # Rows are locked in address order, like `upsert_addresses` does for
+        # /distance, so the chunk cannot deadlock against live requests
+        new.sort()
+        if new:
+            await self.db.execute("""
+                INSERT INTO addresses AS a (address, latitude, longitude)
+                SELECT * FROM unnest($1::text[], $2::float8[], $3::float8[])
+                ON CONFLICT (address) DO UPDATE
+                    SET latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude
+                    WHERE a.latitude IS NULL AND EXCLUDED.latitude IS NOT NULL
+            """, new,
+                [coords[address][0] if coords[address] else None for address in new],
+                [coords[address][1] if coords[address] else None for address in new],
+            )
+            for address, address_id in await self.db.fetch(
+                "SELECT address, id FROM addresses WHERE address = ANY($1::text[])", new
+            ):
+                self.address_ids[address] = address_id
+        return self.address_ids
+
+    async def update_rollups(self, rollups: Rollups) -> None:
+        # Sorted keys, so concurrent rollup updates lock rows in one order
+        pairs = sorted(rollups.pairs.items())
+        await self.db.execute("""
+            INSERT INTO history_pair_stats AS s (source, destination, count, total_kilometers, last_seen_at)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::int[], $4::float8[], $5::timestamptz[])
+            ON CONFLICT (source, destination) DO UPDATE SET
+                count = s.count + EXCLUDED.count,
+                total_kilometers = s.total_kilometers + EXCLUDED.total_kilometers,
+                last_seen_at = GREATEST(s.last_seen_at, EXCLUDED.last_seen_at)
+        """, [source for (source, _), _ in pairs], [destination for (_, destination), _ in pairs],
+            [totals[0] for _, totals in pairs], [totals[1] for _, totals in pairs],
+            [totals[2] for _, totals in pairs],
+        )
+        for table, key, totals in (
+            ("history_hourly_stats", "hour", rollups.hours),
+            ("history_distance_buckets", "bucket_km", rollups.buckets),
+        ):
+            key_type = "timestamptz" if key == "hour" else "int"
+            totals = dict(sorted(totals.items()))
+            await self.db.execute(f"""
+                INSERT INTO {table} AS s ({key}, count, total_kilometers)
+                SELECT * FROM unnest($1::{key_type}[], $2::int[], $3::float8[])
+                ON CONFLICT ({key}) DO UPDATE SET
+                    count = s.count + EXCLUDED.count,
+                    total_kilometers = s.total_kilometers + EXCLUDED.total_kilometers
+            """, list(totals), [count for count, _ in totals.values()], [km for _, km in totals.values()])
+
+    async def load_chunk(self, rows: List[IngestRow], position: int, rejected: int) -> None:
+        """Load a chunk and advance the checkpoint to `position`, atomically"""
+        rows = fill_distances(rows, self.mode)
+        rollups = Rollups.of(rows)
+        await self.ensure_partitions(rows)
+        async with self.db.transaction():
+            ids = await self.address_id_map(rows)
+            await self.db.copy_records_to_table(
+                "query_history",
+                records=[(ids[row.source], ids[row.destination], row.meters, row.created_at) for row in rows],
+                columns=COPY_COLUMNS,
+            )
+            await self.update_rollups(rollups)
+            await self.db.execute("""
+                UPDATE ingest_checkpoints
+                SET position = $2, loaded = loaded + $3, rejected = rejected + $4, updated_at = now()
+                WHERE name = $1
+            """, self.name, position, len(rows), rejected)
+        bump_history_version()
+
+    async def write_chunk(self, rows: List[IngestRow], position: int, rejected: int) -> None:
+        await self.load_chunk(rows, position, rejected)
+        self.report["loaded"] += len(rows)
+        self.report["rejected"] += rejected
+        rate = self.report["loaded"] / (time.monotonic() - self.started)
+        logger.info(f"Ingest {self.name}: {self.report['loaded']} rows loaded ({rate:.0f} rows/s)")
+
+    async def load(self, records: AsyncIterator[Dict[str, Any]], skip: int, chunk_size: int) -> None:
+        """
+        Validate records and load them a chunk at a time, skipping the
+        first `skip` (loaded by an earlier run). Each chunk is parsed while
+        the previous one is being written, so the CPU-bound parsing
+        overlaps with waiting for the database.
+        """
+        writing: Optional[asyncio.Task] = None
+        position = rejected = 0
+        rows: List[IngestRow] = []
+
+        async def flush() -> None:
+            nonlocal writing, rows, rejected
+            if writing is not None:
+                await writing
+            writing = asyncio.create_task(self.write_chunk(rows, position, rejected))
+            rows, rejected = [], 0
+
+        try:
+            async for record in records:
+                position += 1
+                if position <= skip:
+                    self.report["skipped"] += 1
+                    continue
+                try:
+                    if "_error" in record:
+                        raise ValueError(record["_error"])
+                    rows.append(validate_record(record))
+                except (TypeError, ValueError) as e:
+                    rejected += 1
+                    if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+                        self.report["errors"].append({"record": position, "error": str(e)})
+                if len(rows) >= chunk_size:
+                    await flush()
+                elif position % 500 == 0:
+                    await asyncio.sleep(0)
+            if rows or rejected:
+                await flush()
+            if writing is not None:
+                await writing
+        finally:
+            # The connection is busy until the chunk in flight is written
+            if writing is not None and not writing.done():
+                await asyncio.gather(writing, return_exceptions=True)
+
+
+async def ingest(
+    records: AsyncIterator[Dict[str, Any]],
+    name: str,
+    defer_indexes: bool = False,
+    restart: bool = False,
+    mode: str = "spherical",
+) -> Dict[str, Any]:
+    """
+    Load records into query_history, resuming the import called `name`.
+
+    Args:
+        records: Input records, e.g. from `iter_records`
+        name: Identifies the import for checkpointing; resubmit the same
+            input under the same name to resume it
+        defer_indexes: Drop query_history's secondary indexes for the
+            duration of the import and rebuild them at the end. Much
+            faster for large imports, but queries relying on them are slow
+            until then.
+        restart: Forget any earlier progress of this import
+        mode: Distance mode for records without a distance
+
+    Returns:
+        Counts of loaded, rejected and skipped (already loaded) records,
+        the first rejections, and throughput in rows per second
+
+    Raises:
+        IngestInProgressError: Another process is running this import
+    """
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        raise InvalidIngestError("Bulk ingestion requires PostgreSQL")
+    chunk_size = get_settings().INGEST_CHUNK_SIZE
+
+    async with engine.begin() as conn:
+        partitioned = await is_partitioned(conn)
+
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        db = raw.driver_connection
+        if not await db.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", f"ingest:{name}"):
+            raise IngestInProgressError(name)
+        try:
+            job = Ingest(name, db, partitioned, mode)
+            if restart:
+                await db.execute("DELETE FROM ingest_checkpoints WHERE name = $1", name)
+            checkpoint = await job.load_checkpoint()
+            if checkpoint is None:
+                await db.execute(
+                    "INSERT INTO ingest_checkpoints (name, position, loaded, rejected) VALUES ($1, 0, 0, 0)", name
+                )
+                checkpoint = {"position": 0, "deferred_indexes": None, "finished_at": None}
+            elif checkpoint["finished_at"] is None:
+                logger.info(f"Ingest {name}: resuming after record {checkpoint['position']}")
+
+            deferred = json.loads(checkpoint["deferred_indexes"]) if checkpoint["deferred_indexes"] else []
+            if defer_indexes and not deferred and checkpoint["finished_at"] is None:
+                deferred = await job.defer_indexes()
+
+            try:
+                await job.load(records, skip=checkpoint["position"], chunk_size=chunk_size)
+            finally:
+                # Also after a failure: the table should not stay unindexed
+                if deferred:
+                    await job.restore_indexes(deferred)
+
+            await db.execute(
+                "UPDATE ingest_checkpoints SET finished_at = now(), updated_at = now() WHERE name = $1", name
+            )
+        finally:
+            await db.execute("SELECT pg_advisory_unlock(hashtext($1))", f"ingest:{name}")
+
+    report = job.report
+    elapsed = time.monotonic() - job.started
+    report["seconds"] = round(elapsed, 2)
+    report["rows_per_second"] = round(report["loaded"] / elapsed) if elapsed else None
+    logger.info(
+        f"Ingest {name}: {report['loaded']} loaded, {report['rejected']} rejected, "
+        f"{report['skipped']} skipped in {elapsed:.1f}s ({report['rows_per_second']} rows/s)"
+    )
+    return report
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.db.session import dispose_engine
+
+    fmt = args.format or ("ndjson" if ".ndjson" in args.path or ".jsonl" in args.path else "csv")
+    try:
+        return await ingest(
+            iter_records(iter_lines(read_file(args.path)), fmt),
+            name=args.name or args.path.rsplit("/", 1)[-1],
+            defer_indexes=args.defer_indexes,
+            restart=args.restart,
+            mode=args.mode,
+        )
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or NDJSON file, optionally gzipped")
+    parser.add_argument("--name", help="Import name for checkpoints (default: the file name)")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="Default: from the file name")
+    parser.add_argument("--mode", choices=("spherical", "ellipsoidal"), default="spherical",
+                        help="Distance mode for records without a distance")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="Drop secondary indexes during the import and rebuild them at the end")
+    parser.add_argument("--restart", action="store_true", help="Ignore earlier progress of this import")
+    parser.add_argument("--without-shared-store", action="store_true",
+                        help="Run without SHARED_STORE_PATH, e.g. while the API is down")
+    args = parser.parse_args()
+    # Cached /history pages are only invalidated through the API's store
+    if not get_settings().SHARED_STORE_PATH and not args.without_shared_store:
+        parser.error("set SHARED_STORE_PATH to the API's shared store, or pass --without-shared-store")
+    print(json.dumps(asyncio.run(main(args)), indent=2))
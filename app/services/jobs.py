@@ -0,0 +1,362 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.exceptions import APIError, InvalidJobError
+from app.core.haversine import calculate_distance
+from app.db.models import Job, JobItem
+from app.db.session import get_sessionmaker
+from app.services.address_cleaner import clean_addresses, clean_addresses_batch
+from app.services.geocode import get_coordinates
+
+MAX_ADDRESS_LENGTH = 256  # same bound as DistanceRequest
+INSERT_CHUNK = 1000
+FETCH_CHUNK = 200
+RETRY_DELAYS = (1.0, 4.0)  # for upstream (5xx) failures of a single pair
+
+RESULT_FIELDS = (
+    "position", "source", "destination", "status", "source_address",
+    "destination_address", "kilometers", "miles", "error",
+)
+
+
+def _owner() -> str:
+    # Computed per call: worker processes are forked after import
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_pairs_csv(text: str) -> List[Tuple[str, str]]:
+    """
+    Parse `source,destination` rows; a header row naming those columns
+    is skipped, as are blank lines.
+
+    Raises:
+        InvalidJobError: If a row does not have two columns
+    """
+    pairs = []
+    for line, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) != 2:
+            raise InvalidJobError(f"Line {line}: expected 2 columns (source, destination), got {len(row)}")
+        source, destination = row[0].strip(), row[1].strip()
+        if not pairs and (source.lower(), destination.lower()) == ("source", "destination"):
+            continue
+        pairs.append((source, destination))
+    return pairs
+
+
+def validate_pairs(pairs: Sequence[Tuple[str, str]]) -> None:
+    """
+    Raises:
+        InvalidJobError: If there are no pairs, too many, or a bad address
+    """
+    max_pairs = get_settings().JOB_MAX_PAIRS
+    if not pairs:
+        raise InvalidJobError("A job needs at least one address pair")
+    if len(pairs) > max_pairs:
+        raise InvalidJobError(f"A job may contain at most {max_pairs} address pairs")
+    for position, pair in enumerate(pairs):
+        for address in pair:
+            if not address or len(address) > MAX_ADDRESS_LENGTH:
+                raise InvalidJobError(
+                    f"Pair {position}: addresses must be 1 to {MAX_ADDRESS_LENGTH} characters"
+                )
+
+
+async def create_job(db: AsyncSession, pairs: Sequence[Tuple[str, str]]) -> Job:
+    """Persist a job and its pairs, and wake the runner to start on it"""
+    validate_pairs(pairs)
+    job = Job(id=uuid.uuid4().hex, status="pending", total=len(pairs), completed=0, failed=0)
+    db.add(job)
+    await db.flush()
+
+    for start in range(0, len(pairs), INSERT_CHUNK):
+        await db.execute(insert(JobItem), [
+            {"job_id": job.id, "position": position, "source": source,
+             "destination": destination, "status": "pending"}
+            for position, (source, destination) in enumerate(pairs[start:start + INSERT_CHUNK], start=start)
+        ])
+    await db.commit()
+    await db.refresh(job)
+
+    logger.info(f"Created job {job.id} with {job.total} pairs")
+    get_job_runner().wake()
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[Job]:
+    return await db.get(Job, job_id)
+
+
+async def iter_results(job_id: str, fmt: str = "ndjson") -> AsyncIterator[str]:
+    """
+    Stream a job's items in submission order, as NDJSON lines or CSV.
+
+    Pages through the table with its own sessions, so memory stays flat
+    however large the job; unfinished items are included as pending.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(RESULT_FIELDS)
+        yield buffer.getvalue()
+
+    after = -1
+    while True:
+        async with get_sessionmaker()() as db:
+            result = await db.execute(
+                select(JobItem)
+                .where(JobItem.job_id == job_id, JobItem.position > after)
+                .order_by(JobItem.position)
+                .limit(FETCH_CHUNK)
+            )
+            items = result.scalars().all()
+        if not items:
+            return
+
+        rows = [[getattr(item, field) for field in RESULT_FIELDS] for item in items]
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield "".join(json.dumps(dict(zip(RESULT_FIELDS, row))) + "\n" for row in rows)
+        after = items[-1].position
+
+
+async def process_pair(source: str, destination: str) -> Dict[str, object]:
+    """
+    Clean, geocode and measure one pair, as for POST /distance.
+
+    Returns:
+        Column values for the JobItem: status "done" with the results, or
+        status "error" with the reason
+    """
+    for attempt in range(len(RETRY_DELAYS) + 1):
+        try:
+            cleaned = await clean_addresses(source, destination)
+            source_coords = await get_coordinates(cleaned["source"], "source")
+            dest_coords = await get_coordinates(cleaned["destination"], "destination")
+            kilometers, miles = calculate_distance(
+                source_coords[0], source_coords[1],
+                dest_coords[0], dest_coords[1]
+            )
+            return {
+                "status": "done",
+                "source_address": cleaned["source"],
+                "destination_address": cleaned["destination"],
+                "kilometers": kilometers,
+                "miles": miles,
+                "error": None,
+            }
+        except APIError as e:
+            # Upstream outages are retried; bad input is not
+            if e.status_code < 500 or attempt == len(RETRY_DELAYS):
+                return {"status": "error", "error": e.detail["message"]}
+        except Exception as e:
+            logger.exception(f"Unexpected error processing pair '{source}' -> '{destination}': {e}")
+            return {"status": "error", "error": "Internal error while processing this pair"}
+        await asyncio.sleep(RETRY_DELAYS[attempt])
+
+
+class JobRunner:
+    """
+    Works through pending jobs with a bounded pool of worker tasks.
+
+    All state lives in the jobs tables. A job is claimed by setting its
+    owner and heartbeat; only items still pending are processed, so a job
+    interrupted by a restart or crash resumes where it stopped, in this or
+    another process, once its heartbeat goes stale. Each process works on
+    one job at a time, `workers` pairs in parallel.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, stale_after: float):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def _claimable(self):
+        stale = _now() - timedelta(seconds=self.stale_after)
+        return or_(
+            Job.status == "pending",
+            and_(Job.status == "running", Job.heartbeat_at < stale),
+        )
+
+    async def claim(self) -> Optional[str]:
+        """Take ownership of the oldest claimable job, if any"""
+        while True:
+            async with get_sessionmaker()() as db:
+                candidate = await db.scalar(
+                    select(Job.id).where(self._claimable()).order_by(Job.created_at).limit(1)
+                )
+                if candidate is None:
+                    return None
+                # Conditional update, so only one process wins a race
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == candidate, self._claimable())
+                    .values(status="running", owner=_owner(), heartbeat_at=_now())
+                )
+                await db.commit()
+            if result.rowcount == 1:
+                return candidate
+
+    async def run(self) -> None:
+        """Background task: claim and process jobs until cancelled"""
+        if get_settings().DATABASE_URL is None:
+            logger.info("Database is not configured; job runner disabled")
+            return
+
+        while True:
+            try:
+                job_id = await self.claim()
+                if job_id is not None:
+                    await self.run_job(job_id)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Job runner failed: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_job(self, job_id: str) -> None:
+        logger.info(f"Processing job {job_id}")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        tasks = [asyncio.create_task(self._worker(job_id, queue)) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(self._heartbeat(job_id)))
+        try:
+            after = -1
+            while True:
+                async with get_sessionmaker()() as db:
+                    result = await db.execute(
+                        select(JobItem.position, JobItem.source, JobItem.destination)
+                        .where(JobItem.job_id == job_id, JobItem.status == "pending", JobItem.position > after)
+                        .order_by(JobItem.position)
+                        .limit(FETCH_CHUNK)
+                    )
+                    rows = result.all()
+                if not rows:
+                    break
+                # Clean the chunk with a few batched requests; the workers'
+                # clean_addresses calls are then answered from the cache
+                await clean_addresses_batch([(row.source, row.destination) for row in rows])
+                for row in rows:
+                    await queue.put(row)
+                after = rows[-1].position
+
+            for _ in range(self.workers):
+                await queue.put(None)
+            await asyncio.gather(*tasks[:-1])
+        except BaseException:
+            # Hand the job back at once instead of waiting for the heartbeat
+            # to go stale; items in flight are still pending and are redone
+            await asyncio.shield(self._release(job_id))
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        async with get_sessionmaker()() as db:
+            result = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.completed + Job.failed >= Job.total)
+                .values(status="completed", owner=None)
+            )
+            await db.commit()
+        if result.rowcount == 1:
+            logger.info(f"Finished job {job_id}")
+        else:
+            # Its heartbeat has stopped, so the job is claimed again once stale
+            logger.warning(f"Job {job_id} still has pending pairs; retrying it once it is stale")
+
+    async def _worker(self, job_id: str, queue: asyncio.Queue) -> None:
+        while True:
+            row = await queue.get()
+            if row is None:
+                return
+            try:
+                await self._process_item(job_id, row)
+            except Exception as e:
+                # The item stays pending, so a later run of the job redoes it
+                logger.exception(f"Job {job_id} pair {row.position} failed: {e}")
+
+    async def _process_item(self, job_id: str, row) -> None:
+        values = await process_pair(row.source, row.destination)
+        async with get_sessionmaker()() as db:
+            # Only count an item once, even if another process redid it
+            result = await db.execute(
+                update(JobItem)
+                .where(JobItem.job_id == job_id, JobItem.position == row.position, JobItem.status == "pending")
+                .values(**values)
+            )
+            if result.rowcount == 1:
+                counter = Job.completed if values["status"] == "done" else Job.failed
+                await db.execute(
+                    update(Job).where(Job.id == job_id).values({counter.key: counter + 1})
+                )
+            await db.commit()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.stale_after / 3)
+            try:
+                async with get_sessionmaker()() as db:
+                    await db.execute(
+                        update(Job).where(Job.id == job_id, Job.owner == _owner()).values(heartbeat_at=_now())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"Job {job_id} heartbeat failed: {e}")
+
+    async def _release(self, job_id: str) -> None:
+        try:
+            async with get_sessionmaker()() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.owner == _owner(), Job.status == "running")
+                    .values(status="pending", owner=None)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not release job {job_id}: {e}")
+
+
+_runner: Optional[JobRunner] = None
+
+
+def get_job_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        settings = get_settings()
+        _runner = JobRunner(
+            workers=settings.JOB_WORKERS,
+            poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+            stale_after=settings.JOB_STALE_AFTER_SECONDS,
+        )
+    return _runner
@@ -0,0 +1,118 @@
+import re
+import time
+from typing import Dict, Optional, Tuple
+import httpx
+from app.core.config import get_settings
+from app.core.latency import LatencyStats
+from app.core.limits import GlobalConcurrencyLimit, pace
+
+# Lookup latency and outcome per query type ("structured" / "freetext")
+lookup_stats: Dict[str, LatencyStats] = {}
+
+# Shared client, so lookups reuse kept-alive connections
+_client: Optional[httpx.AsyncClient] = None
+_nominatim_limit: Optional[GlobalConcurrencyLimit] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = httpx.AsyncClient(
+            base_url=settings.NOMINATIM_BASE_URL,
+            headers={"User-Agent": settings.NOMINATIM_USER_AGENT},
+            timeout=10.0,
+            limits=httpx.Limits(
+                max_connections=settings.NOMINATIM_MAX_CONCURRENCY,
+                max_keepalive_connections=settings.NOMINATIM_MAX_CONCURRENCY,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+def get_nominatim_limit() -> GlobalConcurrencyLimit:
+    """Concurrency limit on Nominatim requests, shared by all workers"""
+    global _nominatim_limit
+    if _nominatim_limit is None:
+        _nominatim_limit = GlobalConcurrencyLimit("nominatim", get_settings().NOMINATIM_MAX_CONCURRENCY)
+    return _nominatim_limit
+
+
+_STRUCTURED_FIELDS = ("street", "city", "state", "country")
+
+# A house number, then the street name, e.g. "123 Main St" or "12B Rue Cler"
+_STREET = re.compile(r"\d+[A-Za-z]?\s+[^\d\s]")
+
+
+def structured_query(address: str) -> Optional[Dict[str, str]]:
+    """
+    Split a cleaned, comma-separated address into Nominatim's structured
+    search parameters.
+
+    Only the full "street, city, state, country" shape is split, with the
+    street starting with a house number, e.g. "123 Main St, Toronto, ON,
+    Canada". Shorter addresses are ambiguous ("Main St, Toronto" and
+    "Paris, France" have the same shape) and are left to free text.
+
+    Returns:
+        None if the address does not have that shape
+    """
+    parts = [part.strip() for part in address.split(",") if part.strip()]
+    if len(parts) != len(_STRUCTURED_FIELDS) or not _STREET.match(parts[0]):
+        return None
+    return dict(zip(_STRUCTURED_FIELDS, parts))
+
+
+async def _search(params: Dict[str, str], query_type: str) -> Optional[Tuple[float, float]]:
+    """One Nominatim /search request; None if there is no result"""
+    settings = get_settings()
+    stats = lookup_stats.setdefault(query_type, LatencyStats())
+
+    # Shared across workers so the whole deployment respects the limit
+    await pace("nominatim", settings.NOMINATIM_RATE_LIMIT_PER_SEC)
+    async with get_nominatim_limit().hold():
+        started = time.monotonic()
+        try:
+            response = await _get_client().get(
+                "/search", params={**params, "format": "json", "limit": 1}
+            )
+            response.raise_for_status()
+            results = response.json()
+        except Exception:
+            stats.record(time.monotonic() - started, "error")
+            raise
+
+    stats.record(time.monotonic() - started, "found" if results else "not_found")
+    if not results:
+        return None
+    return float(results[0]["lat"]), float(results[0]["lon"])
+
+
+async def lookup(address: str) -> Optional[Tuple[float, float]]:
+    """
+    Geocode an address with Nominatim, bypassing the cache.
+
+    Tries a structured query first when the address has a recognisable
+    shape, since those are less often ambiguous; falls back to free text.
+
+    Returns:
+        (latitude, longitude), or None if nothing was found
+    """
+    if get_settings().NOMINATIM_STRUCTURED_QUERIES:
+        params = structured_query(address)
+        if params is not None:
+            coords = await _search(params, "structured")
+            if coords is not None:
+                return coords
+    return await _search({"q": address}, "freetext")
+
+
+def get_lookup_stats() -> Dict[str, dict]:
+    return {query_type: stats.snapshot() for query_type, stats in lookup_stats.items()}
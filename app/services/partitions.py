@@ -0,0 +1,203 @@
+import asyncio
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import get_settings
+from app.db.session import get_engine
+from app.core.shared_store import get_store
+from app.services.history_cache import bump_history_version
+
+PARENT_TABLE = "query_history"
+# Catches rows for months without a partition of their own
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+MAINTENANCE_LOCK = "lock:partition-maintenance"
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Return the first day of the month a partition covers, if it is one of ours"""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name"
+    ), {"name": PARENT_TABLE})
+    return result.first() is not None
+
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :name"
+    ), {"name": PARENT_TABLE})
+    return [row[0] for row in result]
+
+
+async def create_missing_partitions(conn: AsyncConnection, months: Iterable[date]) -> List[str]:
+    """
+    Create the monthly partitions for `months` (first days of months)
+    that do not exist yet.
+
+    Rows of those months that went to the default partition are moved to
+    the new partition, which is then attached; a partition covering rows
+    still in the default partition could not be created.
+
+    Returns:
+        Names of the partitions that were created
+    """
+    existing = set(await list_partitions(conn))
+
+    created = []
+    for month in sorted(set(months)):
+        name = partition_name(month)
+        if name in existing:
+            continue
+        start, end = f"{month.isoformat()} 00:00:00+00", f"{add_months(month, 1).isoformat()} 00:00:00+00"
+        bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        if DEFAULT_PARTITION in existing:
+            await conn.execute(text(f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)'))
+            await conn.execute(text(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                f"WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING *) "
+                f'INSERT INTO "{name}" SELECT * FROM moved'
+            ))
+            await conn.execute(text(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" {bounds}'))
+        else:
+            await conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} {bounds}'))
+        created.append(name)
+    return created
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int) -> List[str]:
+    """
+    Create any missing monthly partitions from the current month through
+    `months_ahead` months in the future.
+
+    Returns:
+        Names of the partitions that were created
+    """
+    today = datetime.now(timezone.utc).date()
+    current = date(today.year, today.month, 1)
+    return await create_missing_partitions(
+        conn, (add_months(current, offset) for offset in range(months_ahead + 1))
+    )
+
+
+async def expired_partitions(conn: AsyncConnection, retention_months: int) -> List[str]:
+    """Partitions whose whole month is older than the retention window"""
+    today = datetime.now(timezone.utc).date()
+    cutoff = add_months(date(today.year, today.month, 1), -retention_months)
+
+    expired = []
+    for name in sorted(await list_partitions(conn)):
+        month = partition_month(name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return expired
+
+
+async def archive_partition(conn: AsyncConnection, name: str, archive_dir: str) -> str:
+    """
+    Detach a partition, copy it to a gzip-compressed CSV file and drop it.
+
+    Returns:
+        Path of the archive file
+    """
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+
+    await conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+
+    # Compression and file writes happen off the event loop
+    await asyncio.to_thread(os.makedirs, archive_dir, exist_ok=True)
+    archive = await asyncio.to_thread(gzip.open, path, "wb")
+    try:
+        async def _write(chunk: bytes) -> None:
+            await asyncio.to_thread(archive.write, chunk)
+
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_from_table(
+            name, output=_write, format="csv", header=True
+        )
+    finally:
+        await asyncio.to_thread(archive.close)
+
+    await conn.execute(text(f'DROP TABLE "{name}"'))
+    return path
+
+
+async def run_partition_maintenance() -> None:
+    """
+    Create upcoming partitions and archive the ones past retention.
+
+    Rollup tables are left untouched, so /history/stats keeps covering
+    archived history.
+    """
+    settings = get_settings()
+    if settings.DATABASE_URL is None:
+        return
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        return
+
+    async with engine.begin() as conn:
+        if not await is_partitioned(conn):
+            logger.debug(f"{PARENT_TABLE} is not partitioned, skipping maintenance")
+            return
+        created = await ensure_partitions(conn, settings.HISTORY_PARTITION_MONTHS_AHEAD)
+        if created:
+            logger.info(f"Created partitions: {', '.join(created)}")
+
+        if settings.HISTORY_RETENTION_MONTHS is None:
+            return
+        expired = await expired_partitions(conn, settings.HISTORY_RETENTION_MONTHS)
+
+    # One transaction per partition, so a failure leaves earlier ones archived
+    for name in expired:
+        async with engine.begin() as conn:
+            path = await archive_partition(conn, name, settings.HISTORY_ARCHIVE_DIR)
+        bump_history_version()
+        logger.info(f"Archived partition {name} to {path}")
+
+
+async def partition_maintenance_loop() -> None:
+    """Background task running partition maintenance periodically"""
+    settings = get_settings()
+    interval = settings.HISTORY_MAINTENANCE_INTERVAL_SECONDS
+    while True:
+        delay = interval
+        try:
+            # Only one worker process runs maintenance per interval; a failed
+            # run releases the lock, so the next attempt is not held off
+            if get_store().add(MAINTENANCE_LOCK, os.getpid(), ttl=interval):
+                try:
+                    await run_partition_maintenance()
+                except Exception:
+                    get_store().delete(MAINTENANCE_LOCK)
+                    raise
+        except Exception as e:
+            logger.exception(f"Partition maintenance failed: {e}")
+            delay = min(interval, settings.HISTORY_MAINTENANCE_RETRY_SECONDS)
+        await asyncio.sleep(delay)
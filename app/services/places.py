@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.spatial import Place, SpatialIndex
+from app.db.models import Address
+
+# Process-wide index of every geocoded place seen in query history
+place_index = SpatialIndex()
+
+# Highest addresses.id read into the index, and when the index was last
+# refreshed and fully reloaded (monotonic seconds)
+_watermark: Optional[int] = None
+_refreshed_at = 0.0
+_reloaded_at = 0.0
+_load_lock = asyncio.Lock()
+
+
+def _due(now: float) -> Tuple[bool, bool]:
+    """Whether a refresh is due, and whether it must be a full reload"""
+    settings = get_settings()
+    full = _watermark is None or now - _reloaded_at >= settings.PLACES_RELOAD_SECONDS
+    return full or now - _refreshed_at >= settings.PLACES_REFRESH_SECONDS, full
+
+
+async def refresh(db: AsyncSession) -> None:
+    """
+    Bring the place index up to date with the address dictionary.
+
+    Other workers, jobs and bulk imports add addresses too, so at most
+    every PLACES_REFRESH_SECONDS the addresses above the id watermark are
+    read in. Coordinates changed on already indexed addresses, and rows
+    committed out of id order, are caught by a full reload every
+    PLACES_RELOAD_SECONDS. Places added through `record_place` are kept;
+    the index deduplicates by address.
+    """
+    global _watermark, _refreshed_at, _reloaded_at
+    if not _due(time.monotonic())[0]:
+        return
+
+    async with _load_lock:
+        now = time.monotonic()
+        due, full = _due(now)
+        if not due:
+            return
+
+        query = select(Address.id, Address.address, Address.latitude, Address.longitude).where(
+            Address.latitude.is_not(None)
+        )
+        if not full:
+            query = query.where(Address.id > _watermark)
+        watermark = 0 if full else _watermark
+        added = 0
+        for address_id, address, lat, lon in await db.execute(query):
+            place_index.add(address, lat, lon)
+            watermark = max(watermark, address_id)
+            added += 1
+
+        _watermark = watermark
+        _refreshed_at = now
+        if full:
+            _reloaded_at = now
+            logger.info(f"Loaded {len(place_index)} places into the spatial index")
+        elif added:
+            logger.debug(f"Added {added} new places to the spatial index")
+
+
+def record_place(address: str, coords: Tuple[float, float]) -> None:
+    """Add a freshly geocoded address to the place index"""
+    place_index.add(address, coords[0], coords[1])
+
+
+def find_nearby(lat: float, lon: float, k: int,
+                radius_km: Optional[float] = None) -> List[Tuple[Place, float]]:
+    """Nearest `k` places, optionally restricted to `radius_km`"""
+    return place_index.nearest(lat, lon, k=k, max_km=radius_km)
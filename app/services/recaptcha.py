@@ -1,9 +1,12 @@
-from typing import Dict
+import asyncio
+import hashlib
+from typing import Dict, Optional
 import httpx
 from loguru import logger
 
-from app.core.config import settings
+from app.core.config import get_settings
 from app.core.exceptions import APIError
+from app.core.shared_store import get_store
 
 
 class RecaptchaVerificationError(APIError):
@@ -15,39 +18,141 @@ class RecaptchaVerificationError(APIError):
         )
 
 
-async def verify_recaptcha(token: str) -> None:
+# Shared client and a bound on concurrent siteverify calls
+_client: Optional[httpx.AsyncClient] = None
+_verify_slots: Optional[asyncio.Semaphore] = None
+
+# Verifications in progress in this process, keyed by token hash
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=5.0)
+    return _client
+
+
+def _get_verify_slots() -> asyncio.Semaphore:
+    global _verify_slots
+    if _verify_slots is None:
+        _verify_slots = asyncio.Semaphore(get_settings().RECAPTCHA_MAX_CONCURRENCY)
+    return _verify_slots
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+def _cache_key(token: str) -> str:
+    return "recaptcha-uses:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def _consume_verified(key: str) -> bool:
+    """
+    Use one of a verified token's allowed uses.
+
+    The use count is incremented in a single store operation, so
+    concurrent requests (in any worker) cannot exceed the limit.
+
+    Returns:
+        False if the token has not been verified (or its entry expired)
+
+    Raises:
+        RecaptchaVerificationError: If the token has no uses left
+    """
+    uses = get_store().incr_existing(key)
+    if uses is None:
+        return False
+    if uses > get_settings().RECAPTCHA_TOKEN_MAX_USES:
+        logger.warning("reCAPTCHA token replayed beyond its allowed uses")
+        raise RecaptchaVerificationError()
+    return True
+
+
+async def _siteverify(token: str) -> None:
     """
     Verify reCAPTCHA token with Google's API
-    
-    Args:
-        token: The reCAPTCHA response token from the client
-        
+
     Raises:
         RecaptchaVerificationError: If verification fails
     """
+    settings = get_settings()
+    if settings.RECAPTCHA_STUB:
+        # Local/test mode: any non-empty token passes, no network round trip
+        logger.debug("reCAPTCHA stub verification successful")
+        return
+
+    if not settings.RECAPTCHA_SECRET_KEY:
+        logger.error("RECAPTCHA_SECRET_KEY is not configured")
+        raise RecaptchaVerificationError()
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://www.google.com/recaptcha/api/siteverify",
+        async with _get_verify_slots():
+            response = await _get_client().post(
+                settings.RECAPTCHA_VERIFY_URL,
                 data={
                     "secret": settings.RECAPTCHA_SECRET_KEY,
                     "response": token
                 },
                 timeout=5.0
             )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if not result.get("success", False):
-                logger.warning(f"reCAPTCHA verification failed: {result}")
-                raise RecaptchaVerificationError()
-                
-            logger.debug("reCAPTCHA verification successful")
-            
+
+        response.raise_for_status()
+        result = response.json()
+
+        if not result.get("success", False):
+            logger.warning(f"reCAPTCHA verification failed: {result}")
+            raise RecaptchaVerificationError()
+
+        logger.debug("reCAPTCHA verification successful")
+
     except httpx.HTTPError as e:
         logger.error(f"Error verifying reCAPTCHA: {str(e)}")
         raise RecaptchaVerificationError()
     except Exception as e:
         logger.error(f"Unexpected error during reCAPTCHA verification: {str(e)}")
-        raise RecaptchaVerificationError() 
\ No newline at end of file
+        raise RecaptchaVerificationError()
+
+
+async def _verify_and_cache(token: str, key: str) -> None:
+    await _siteverify(token)
+    get_store().set(key, 0, ttl=get_settings().RECAPTCHA_TOKEN_TTL_SECONDS)
+
+
+async def verify_recaptcha(token: str) -> None:
+    """
+    Verify reCAPTCHA token, reusing recent successful verifications
+
+    A verified token is cached (by hash) for RECAPTCHA_TOKEN_TTL_SECONDS,
+    matching Google's token validity, and may be used up to
+    RECAPTCHA_TOKEN_MAX_USES times, so a client retrying after a
+    downstream error does not need a new token. Concurrent requests with
+    the same token share a single siteverify call.
+
+    Args:
+        token: The reCAPTCHA response token from the client
+
+    Raises:
+        RecaptchaVerificationError: If verification fails or the token
+            has been used too many times
+    """
+    if not token:
+        raise RecaptchaVerificationError()
+
+    key = _cache_key(token)
+    if _consume_verified(key):
+        return
+
+    pending = _inflight.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_verify_and_cache(token, key))
+        _inflight[key] = pending
+        pending.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    await asyncio.shield(pending)
+    if not _consume_verified(key):
+        raise RecaptchaVerificationError()
@@ -0,0 +1,85 @@
+"""
+Compare per-pair and batched address cleaning against the OpenAI stub.
+
+Cleans the same number of distinct pairs with `clean_addresses` (one
+request per pair) and with `clean_addresses_batch`, and reports pairs per
+second, requests and tokens per pair for each. Token counts are the stub's
+estimate (characters / 4), which is enough to compare prompt overhead.
+
+    python -m benchmarks.cleaning --pairs 500 --openai-ms 300
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.stubs import Latency, StubConfig, StubServer
+
+
+def make_pairs(count: int, tag: str) -> List[Tuple[str, str]]:
+    return [(f"{i} Main St, Town {tag}{i}, Canada", f"{i} King St, City {tag}{i}, Canada") for i in range(count)]
+
+
+async def run_mode(mode: str, pairs: List[Tuple[str, str]], batch_size: int) -> Dict[str, Any]:
+    from app.core.config import get_settings
+    from app.services import address_cleaner
+
+    get_settings().CLEAN_BATCH_SIZE = batch_size
+    address_cleaner.usage.clear()
+    started = time.perf_counter()
+    if mode == "batch":
+        await address_cleaner.clean_addresses_batch(pairs)
+    else:
+        await asyncio.gather(*(address_cleaner.clean_addresses(*pair) for pair in pairs))
+    elapsed = time.perf_counter() - started
+
+    usage = address_cleaner.usage
+    tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+    return {
+        "mode": mode,
+        "pairs": len(pairs),
+        "requests": usage["requests"],
+        "pairs_per_s": round(len(pairs) / elapsed, 1),
+        "prompt_tokens_per_pair": round(usage["prompt_tokens"] / len(pairs), 1),
+        "tokens_per_pair": round(tokens / len(pairs), 1),
+    }
+
+
+async def run_all(pairs: int, batch_size: int) -> List[Dict[str, Any]]:
+    from app.services.address_cleaner import close_client
+
+    try:
+        # Distinct addresses per mode, so neither is served from the cache
+        return [
+            await run_mode("single", make_pairs(pairs, "s"), batch_size),
+            await run_mode("batch", make_pairs(pairs, "b"), batch_size),
+        ]
+    finally:
+        await close_client()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--openai-ms", type=float, default=300)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction")
+    args = parser.parse_args(argv)
+
+    latency = Latency(args.openai_ms, args.openai_ms * args.jitter)
+    with StubServer(StubConfig(openai=latency)) as stub:
+        os.environ.update(stub.env())
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        for result in asyncio.run(run_all(args.pairs, args.batch_size)):
+            print(
+                f"{result['mode']:<7} pairs={result['pairs']} requests={result['requests']} "
+                f"pairs/s={result['pairs_per_s']} prompt_tokens/pair={result['prompt_tokens_per_pair']} "
+                f"tokens/pair={result['tokens_per_pair']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
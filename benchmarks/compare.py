@@ -0,0 +1,67 @@
+"""
+Run the load benchmark against two commits and compare the results.
+
+Each commit is checked out into a temporary git worktree and served from
+there, while the benchmark harness of the current tree drives the load,
+so both runs use identical stubs and profiles.
+
+    python -m benchmarks.compare main HEAD --profiles hot-key
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+METRICS = ["rps", "p50_ms", "p95_ms", "p99_ms", "errors"]
+
+
+def run_at(ref: str, bench_args: List[str], workdir: str) -> Dict[str, Any]:
+    tree = os.path.join(workdir, ref.replace("/", "_"))
+    output = os.path.join(workdir, f"{ref.replace('/', '_')}.json")
+    subprocess.run(["git", "worktree", "add", "--detach", tree, ref], check=True)
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--app-dir", tree, "--output", output, *bench_args],
+            check=True,
+        )
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", tree], check=True)
+    with open(output) as f:
+        return {result["scenario"]: result for result in json.load(f)["results"]}
+
+
+def format_comparison(base_ref: str, head_ref: str, base: Dict[str, Any], head: Dict[str, Any]) -> str:
+    lines = [f"{'scenario':<10} {'metric':<8} {base_ref:>12} {head_ref:>12} {'change':>9}"]
+    for scenario in base:
+        if scenario not in head:
+            continue
+        for metric in METRICS:
+            before, after = base[scenario][metric], head[scenario][metric]
+            change = f"{(after - before) / before:+.1%}" if before else "n/a"
+            lines.append(f"{scenario:<10} {metric:<8} {before:>12} {after:>12} {change:>9}")
+        for upstream in sorted(set(base[scenario]["upstream_calls"]) | set(head[scenario]["upstream_calls"])):
+            before = base[scenario]["upstream_calls"].get(upstream, 0)
+            after = head[scenario]["upstream_calls"].get(upstream, 0)
+            lines.append(f"{scenario:<10} {upstream:<8} {before:>12} {after:>12}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="Baseline commit-ish")
+    parser.add_argument("head", help="Commit-ish to compare against the baseline")
+    args, bench_args = parser.parse_known_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        base = run_at(args.base, bench_args, workdir)
+        head = run_at(args.head, bench_args, workdir)
+
+    print(format_comparison(args.base, args.head, base, head))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Measure the per-pair cost of each distance mode.
+
+Times the scalar functions used by /distance and the vectorized NumPy
+batch functions over the same random pairs, and reports the largest
+ellipsoidal error against geographiclib when it is installed.
+
+    python -m benchmarks.geodesic --pairs 100000
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.geodesic import calculate_distance, distance_meters_batch
+
+Pair = Tuple[float, float, float, float]
+
+
+def random_pairs(count: int, seed: int) -> List[Pair]:
+    rng = random.Random(seed)
+    return [
+        (rng.uniform(-90, 90), rng.uniform(-180, 180), rng.uniform(-90, 90), rng.uniform(-180, 180))
+        for _ in range(count)
+    ]
+
+
+def time_per_pair(fn: Callable[[], object], count: int, repeat: int) -> float:
+    """Best-of-`repeat` nanoseconds per pair"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best / count * 1e9
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    pairs = random_pairs(args.pairs, args.seed)
+    columns = np.array(pairs).T
+
+    for mode in ("spherical", "ellipsoidal"):
+        scalar = time_per_pair(lambda: [calculate_distance(*p, mode=mode) for p in pairs], len(pairs), args.repeat)
+        batch = time_per_pair(lambda: distance_meters_batch(*columns, mode=mode), len(pairs), args.repeat)
+        print(f"{mode:<12} scalar={scalar:,.0f}ns/pair batch={batch:,.0f}ns/pair speedup={scalar / batch:.1f}x")
+
+    try:
+        from geographiclib.geodesic import Geodesic
+    except ImportError:
+        return 0
+    sample = pairs[:10_000]
+    reference = np.array([Geodesic.WGS84.Inverse(*p, Geodesic.DISTANCE)["s12"] for p in sample])
+    ellipsoidal = distance_meters_batch(*np.array(sample).T, mode="ellipsoidal")
+    spherical = distance_meters_batch(*np.array(sample).T, mode="spherical")
+    print(f"max error vs geographiclib: ellipsoidal={np.abs(ellipsoidal - reference).max() * 1000:.3f}mm "
+          f"spherical={np.max(np.abs(spherical - reference) / reference) * 100:.2f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Scripted load profiles for the benchmark runner.
+
+A profile yields batches of (source, destination) pairs; every pair in a
+batch is sent concurrently, and `pause_s` is slept between batches.
+"""
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple
+
+Pair = Tuple[str, str]
+
+CITIES = [
+    "Toronto, ON, Canada", "Vancouver, BC, Canada", "Montreal, QC, Canada",
+    "Calgary, AB, Canada", "Ottawa, ON, Canada", "New York, NY, USA",
+    "Chicago, IL, USA", "Seattle, WA, USA", "Boston, MA, USA", "Miami, FL, USA",
+    "London, UK", "Paris, France", "Berlin, Germany", "Madrid, Spain",
+    "Rome, Italy", "Tokyo, Japan", "Seoul, South Korea", "Sydney, Australia",
+    "Sao Paulo, Brazil", "Mexico City, Mexico",
+]
+
+
+def _address_pool(size: int, rng: random.Random) -> List[str]:
+    """`size` distinct addresses built from the city list"""
+    pool = list(CITIES)
+    while len(pool) < size:
+        pool.append(f"{rng.randint(1, 9999)} Main St, {rng.choice(CITIES)}")
+    return pool[:size]
+
+
+@dataclass
+class Profile:
+    name: str
+    description: str
+    batches: Callable[[random.Random], Iterator[List[Pair]]]
+    pause_s: float = 0.0
+
+
+def hot_key(requests: int = 2000, concurrency: int = 32, hot_pairs: int = 5,
+            hot_ratio: float = 0.9) -> Profile:
+    """Most traffic repeats a handful of pairs, the rest is spread out"""
+    def batches(rng: random.Random) -> Iterator[List[Pair]]:
+        pool = _address_pool(1000, rng)
+        hot = [(pool[i], pool[-(i + 1)]) for i in range(hot_pairs)]
+        for start in range(0, requests, concurrency):
+            yield [
+                rng.choice(hot) if rng.random() < hot_ratio else tuple(rng.sample(pool, 2))
+                for _ in range(min(concurrency, requests - start))
+            ]
+    return Profile("hot-key", f"{hot_ratio:.0%} of {requests} requests on {hot_pairs} pairs", batches)
+
+
+def uniform(requests: int = 2000, concurrency: int = 32, addresses: int = 1000) -> Profile:
+    """Pairs drawn uniformly from a large address pool"""
+    def batches(rng: random.Random) -> Iterator[List[Pair]]:
+        pool = _address_pool(addresses, rng)
+        for start in range(0, requests, concurrency):
+            yield [tuple(rng.sample(pool, 2)) for _ in range(min(concurrency, requests - start))]
+    return Profile("uniform", f"{requests} requests over {addresses} addresses", batches)
+
+
+def burst(bursts: int = 10, burst_size: int = 200, pause_s: float = 1.0) -> Profile:
+    """Idle periods followed by a large simultaneous burst"""
+    def batches(rng: random.Random) -> Iterator[List[Pair]]:
+        pool = _address_pool(200, rng)
+        for _ in range(bursts):
+            yield [tuple(rng.sample(pool, 2)) for _ in range(burst_size)]
+    return Profile("burst", f"{bursts} bursts of {burst_size} requests", batches, pause_s=pause_s)
+
+
+PROFILES: Dict[str, Callable[[], Profile]] = {
+    "hot-key": hot_key,
+    "uniform": uniform,
+    "burst": burst,
+}
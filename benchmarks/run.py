@@ -0,0 +1,193 @@
+"""
+Load-test the API against local upstream stubs.
+
+Starts the stub server, launches the API with uvicorn pointed at it, and
+replays each load profile, reporting RPS, latency percentiles and the
+number of upstream calls per scenario.
+
+The API still needs a database: set DATABASE_URL (or the POSTGRES_*
+variables) in the environment as for a normal run.
+
+    python -m benchmarks.run --profiles hot-key uniform --output results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.profiles import PROFILES, Profile
+from benchmarks.stubs import Latency, StubConfig, StubServer, free_port
+
+DISTANCE_PATH = "/api/v1/distance"
+HEALTH_PATH = "/api/v1/health"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(samples)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+def summarize(name: str, latencies_ms: List[float], statuses: Dict[int, int],
+              elapsed_s: float, upstream_calls: Dict[str, int]) -> Dict[str, Any]:
+    latencies_ms = sorted(latencies_ms)
+    total = len(latencies_ms)
+    return {
+        "scenario": name,
+        "requests": total,
+        "errors": total - statuses.get(200, 0),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "rps": round(total / elapsed_s, 1) if elapsed_s else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "upstream_calls": upstream_calls,
+    }
+
+
+class ApiProcess:
+    """The API under test, running in a uvicorn subprocess"""
+
+    def __init__(self, app_dir: str, env: Dict[str, str], workers: int = 1):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._command = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--app-dir", app_dir, "--host", "127.0.0.1", "--port", str(self.port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ]
+        self._env = {**os.environ, **env}
+        self._cwd = app_dir
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 30.0, poll_interval: float = 0.2) -> None:
+        self._process = subprocess.Popen(self._command, env=self._env, cwd=self._cwd)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError("API process exited during startup")
+            try:
+                if httpx.get(f"{self.url}{HEALTH_PATH}", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(poll_interval)
+        self.stop()
+        raise RuntimeError("API did not become healthy in time")
+
+    def stop(self) -> None:
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            self._process.wait(timeout=10)
+
+
+async def run_profile(client: httpx.AsyncClient, stub: StubServer, profile: Profile,
+                      seed: int) -> Dict[str, Any]:
+    stub.calls.clear()
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    async def _one(source: str, destination: str) -> None:
+        started = time.perf_counter()
+        try:
+            # A fresh token per request, as from real browsers; the stub
+            # accepts any, while a reused one hits RECAPTCHA_TOKEN_MAX_USES
+            response = await client.post(DISTANCE_PATH, json={
+                "source": source, "destination": destination,
+                "captchaToken": f"bench-{uuid.uuid4().hex}",
+            })
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    # Idle pauses are part of the profile, not of the service time
+    elapsed = 0.0
+    for batch in profile.batches(rng):
+        started = time.perf_counter()
+        await asyncio.gather(*(_one(source, destination) for source, destination in batch))
+        elapsed += time.perf_counter() - started
+        if profile.pause_s:
+            await asyncio.sleep(profile.pause_s)
+
+    return summarize(profile.name, latencies, statuses, elapsed, dict(stub.calls))
+
+
+async def run_all(api_url: str, stub: StubServer, profiles: List[Profile],
+                  seed: int) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=512, max_keepalive_connections=512)
+    async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=60) as client:
+        results = []
+        for profile in profiles:
+            result = await run_profile(client, stub, profile, seed)
+            print(format_result(result), flush=True)
+            results.append(result)
+        return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    calls = ", ".join(f"{name}={count}" for name, count in sorted(result["upstream_calls"].items()))
+    return (
+        f"{result['scenario']:<10} requests={result['requests']} errors={result['errors']} "
+        f"rps={result['rps']} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+        f"p99={result['p99_ms']}ms upstream[{calls}]"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--app-dir", default=".", help="Checkout containing the app package")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--nominatim-ms", type=float, default=50)
+    parser.add_argument("--openai-ms", type=float, default=300)
+    parser.add_argument("--recaptcha-ms", type=float, default=80)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    def latency(mean_ms: float) -> Latency:
+        return Latency(mean_ms, mean_ms * args.jitter)
+
+    stub_config = StubConfig(
+        nominatim=latency(args.nominatim_ms),
+        openai=latency(args.openai_ms),
+        recaptcha=latency(args.recaptcha_ms),
+    )
+    with StubServer(stub_config) as stub:
+        env = {
+            **stub.env(),
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+            "RECAPTCHA_SECRET_KEY": os.environ.get("RECAPTCHA_SECRET_KEY", "bench"),
+            # All load comes from one IP; measure the service, not 429s
+            "RATE_LIMIT_ENABLED": "false",
+        }
+        api = ApiProcess(os.path.abspath(args.app_dir), env, workers=args.workers)
+        api.start()
+        try:
+            profiles = [PROFILES[name]() for name in args.profiles]
+            results = asyncio.run(run_all(api.url, stub, profiles, args.seed))
+        finally:
+            api.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"app_dir": args.app_dir, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
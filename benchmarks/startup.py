@@ -0,0 +1,74 @@
+"""
+Measure API cold start.
+
+Reports the cumulative `python -X importtime` cost of `import app.main`
+(median over several runs, with the slowest modules by self time) and the
+wall time from spawning uvicorn to the first successful request.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.run import ApiProcess
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Map module name to (self us, cumulative us) from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def import_app(app_dir: str, env: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=app_dir, env=env, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def time_to_first_request(app_dir: str) -> float:
+    api = ApiProcess(app_dir, {}, workers=1)
+    started = time.perf_counter()
+    api.start(poll_interval=0.01)
+    elapsed = time.perf_counter() - started
+    api.stop()
+    return elapsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=".")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--skip-server", action="store_true", help="Only measure imports")
+    args = parser.parse_args(argv)
+    app_dir = os.path.abspath(args.app_dir)
+
+    runs = [import_app(app_dir) for _ in range(args.runs)]
+    totals = [run["app.main"][1] / 1000 for run in runs]
+    print(f"import app.main: median {statistics.median(totals):.1f}ms "
+          f"(min {min(totals):.1f}ms, max {max(totals):.1f}ms)")
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms cumulative  {name}")
+
+    if not args.skip_server:
+        print(f"time to first request: {time_to_first_request(app_dir) * 1000:.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
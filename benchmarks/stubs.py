@@ -0,0 +1,222 @@
+"""
+Local stand-ins for the upstream services used by the API.
+
+A single stub server exposes:
+    GET  /search                       Nominatim search
+    POST /v1/chat/completions          OpenAI chat completions (single and
+                                       batched structured-output cleaning)
+    POST /recaptcha/api/siteverify     Google reCAPTCHA siteverify
+
+Each upstream has its own configurable latency and call counter, readable
+through GET /_stats and cleared with POST /_reset.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+@dataclass
+class Latency:
+    """Latency in milliseconds, uniformly jittered by +/- `jitter_ms`"""
+    mean_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    async def wait(self) -> None:
+        delay = self.mean_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+
+@dataclass
+class StubConfig:
+    nominatim: Latency = field(default_factory=Latency)
+    openai: Latency = field(default_factory=Latency)
+    recaptcha: Latency = field(default_factory=Latency)
+    # Queries containing this marker return no geocoding result
+    not_found_marker: str = "nowhere"
+    # Batch cleaning requests with an address containing this marker get
+    # an unparseable response
+    garbled_marker: str = "garbled"
+
+
+def fake_coordinates(query: str) -> tuple:
+    """Deterministic, well spread coordinates for any query string"""
+    digest = hashlib.sha256(query.lower().encode()).digest()
+    lat = int.from_bytes(digest[:4], "big") / 2**32 * 170 - 85
+    lon = int.from_bytes(digest[4:8], "big") / 2**32 * 360 - 180
+    return round(lat, 6), round(lon, 6)
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    config = config or StubConfig()
+    app = FastAPI()
+    calls: Counter = Counter()
+    app.state.config = config
+    app.state.calls = calls
+
+    @app.get("/search")
+    async def nominatim_search(request: Request):
+        calls["nominatim"] += 1
+        await config.nominatim.wait()
+        params = request.query_params
+        query = params.get("q") or ", ".join(
+            params[key] for key in ("street", "city", "county", "state", "country", "postalcode")
+            if key in params
+        )
+        if not query or config.not_found_marker in query.lower():
+            return []
+        lat, lon = fake_coordinates(query)
+        return [{"lat": str(lat), "lon": str(lon), "display_name": query}]
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        calls["openai"] += 1
+        await config.openai.wait()
+        body = await request.json()
+        prompt = "\n".join(
+            m["content"] for m in body.get("messages", []) if isinstance(m.get("content"), str)
+        )
+        if body.get("response_format", {}).get("type") == "json_schema":
+            content = _clean_batch_response(prompt, config.garbled_marker)
+        else:
+            content = _clean_response(prompt)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-stub-{calls['openai']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.post("/recaptcha/api/siteverify")
+    async def siteverify(request: Request):
+        calls["recaptcha"] += 1
+        await config.recaptcha.wait()
+        form = parse_qs((await request.body()).decode())
+        return {"success": bool(form.get("response", [""])[0])}
+
+    @app.get("/_stats")
+    async def stats() -> Dict[str, int]:
+        return dict(calls)
+
+    @app.post("/_reset")
+    async def reset() -> Dict[str, int]:
+        calls.clear()
+        return {}
+
+    return app
+
+
+def _clean_response(prompt: str) -> str:
+    """Echo the addresses from the cleaning prompt back as 'cleaned' JSON"""
+    source = re.search(r"^\s*Source:\s*(.+)$", prompt, re.MULTILINE)
+    destination = re.search(r"^\s*Destination:\s*(.+)$", prompt, re.MULTILINE)
+    return json.dumps({
+        "source": source.group(1).strip() if source else "",
+        "destination": destination.group(1).strip() if destination else "",
+        "sourceCorrected": False,
+        "destinationCorrected": False,
+    })
+
+
+def _clean_batch_response(prompt: str, garbled_marker: str) -> str:
+    """Echo every item of a batch cleaning prompt back as structured output"""
+    items = json.loads(prompt[prompt.rindex("Items:") + len("Items:"):])
+    if any(garbled_marker in (item["source"] + item["destination"]).lower() for item in items):
+        return '{"results": [{"id": 0, "source": '
+    return json.dumps({"results": [
+        {"id": item["id"], "source": item["source"].strip(), "destination": item["destination"].strip(),
+         "sourceCorrected": False, "destinationCorrected": False}
+        for item in items
+    ]})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubServer:
+    """Run the stub app with uvicorn in a background thread"""
+
+    def __init__(self, config: Optional[StubConfig] = None, port: Optional[int] = None):
+        self.app = create_stub_app(config)
+        self.port = port or free_port()
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def calls(self) -> Counter:
+        return self.app.state.calls
+
+    def env(self) -> Dict[str, str]:
+        """Settings overrides pointing the API at this stub"""
+        return {
+            "NOMINATIM_BASE_URL": self.url,
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "RECAPTCHA_VERIFY_URL": f"{self.url}/recaptcha/api/siteverify",
+        }
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the upstream stub server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--nominatim-ms", type=float, default=0)
+    parser.add_argument("--openai-ms", type=float, default=0)
+    parser.add_argument("--recaptcha-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    stub_config = StubConfig(
+        nominatim=Latency(args.nominatim_ms),
+        openai=Latency(args.openai_ms),
+        recaptcha=Latency(args.recaptcha_ms),
+    )
+    uvicorn.run(create_stub_app(stub_config), host="127.0.0.1", port=args.port)
@@ -0,0 +1,32 @@
+# Multi-process serving: gunicorn manages uvicorn workers.
+#
+#   gunicorn -c gunicorn.conf.py app.main:app
+#
+# Workers share geocode/cleaning caches and the Nominatim rate limit and
+# OpenAI concurrency limit through a SQLite file on a RAM-backed
+# filesystem (SHARED_STORE_PATH), so adding workers neither multiplies
+# upstream traffic nor splits the caches.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = 30
+timeout = 60
+keepalive = 5
+
+
+def on_starting(server):
+    """Runs in the master before any worker is forked"""
+    if workers > 1 and not os.environ.get("SHARED_STORE_PATH"):
+        shm = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+        os.environ["SHARED_STORE_PATH"] = os.path.join(shm, "distance-api-store.sqlite3")
+
+    path = os.environ.get("SHARED_STORE_PATH")
+    if path:
+        # Create the schema once, before workers race to open the file
+        from app.core.shared_store import SqliteStore
+
+        SqliteStore(path)
+        server.log.info(f"Shared store: {path}")
@@ -0,0 +1,73 @@
+import pytest
+import pytest_asyncio
+
+from app.core.config import get_settings
+from app.services import address_cleaner
+from app.services.address_cleaner import clean_addresses_batch, validate_result
+from benchmarks.stubs import StubServer
+
+
+@pytest.fixture(scope="module")
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+@pytest_asyncio.fixture
+async def openai_stub(stub, monkeypatch):
+    """Send OpenAI requests to the stub server."""
+    monkeypatch.setattr(get_settings(), "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(get_settings(), "OPENAI_BASE_URL", f"{stub.url}/v1")
+    monkeypatch.setattr(get_settings(), "CLEAN_BATCH_SIZE", 4)
+    await address_cleaner.close_client()
+    stub.calls.clear()
+    yield stub
+    await address_cleaner.close_client()
+
+
+def test_validate_result():
+    """Items must carry every required field with the right types."""
+    good = {"id": 1, "source": "A", "destination": "B", "sourceCorrected": False, "destinationCorrected": True}
+    assert validate_result(good) == {k: v for k, v in good.items() if k != "id"}
+    assert validate_result({**good, "sourceCorrected": "no"}) is None
+    assert validate_result({**good, "destination": " "}) is None
+    assert validate_result({"source": "A"}) is None
+
+
+@pytest.mark.asyncio
+async def test_batches_and_caches(openai_stub):
+    """Pairs are cleaned a batch per request, deduplicated and cached."""
+    pairs = [(f"{i} Main St, Batchville", f"{i} Elm St, Batchtown") for i in range(6)]
+    results = await clean_addresses_batch(pairs + pairs[:2])
+
+    assert [r["source"] for r in results] == [p[0] for p in pairs + pairs[:2]]
+    assert openai_stub.calls["openai"] == 2
+
+    await clean_addresses_batch(pairs)
+    assert openai_stub.calls["openai"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unparseable_batches_are_split(openai_stub):
+    """A bad response splits the batch until the offending pair is isolated."""
+    pairs = [(f"{i} Split St, Halfton", "Somewhere") for i in range(3)] + [("garbled input", "Somewhere")]
+    results = await clean_addresses_batch(pairs)
+
+    assert [r["source"] for r in results] == [p[0] for p in pairs]
+    # Whole batch, both halves, then each pair of the bad half
+    assert openai_stub.calls["openai"] == 5
+    assert address_cleaner.cached_cleaning("garbled input", "Somewhere") is None
+    assert address_cleaner.cached_cleaning(*pairs[0]) is not None
+
+
+@pytest.mark.asyncio
+async def test_all_invalid_results_fall_back(openai_stub):
+    """A batch with no valid results is split rather than retried whole."""
+    # The stub echoes the blank sources back, which fails validation
+    pairs = [(" " * (i + 1), "Somewhere") for i in range(4)]
+    results = await clean_addresses_batch(pairs)
+
+    assert [r["source"] for r in results] == [p[0] for p in pairs]
+    # Whole batch, both halves, then each pair
+    assert openai_stub.calls["openai"] == 7
+    assert address_cleaner.cached_cleaning(*pairs[0]) is None
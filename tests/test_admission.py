@@ -0,0 +1,70 @@
+import pytest
+
+from app.core.admission import AdaptiveLimiter
+from app.core.exceptions import ServiceOverloadedError
+
+
+def _limiter(**kwargs) -> AdaptiveLimiter:
+    options = dict(initial=4, min_limit=1, max_limit=10, target_latency=1.0)
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+
+@pytest.mark.asyncio
+async def test_rejects_over_limit_with_retry_after():
+    """Requests beyond the limit fail fast with a 503 carrying Retry-After."""
+    limiter = _limiter(initial=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+
+    with pytest.raises(ServiceOverloadedError) as exc_info:
+        async with limiter.admit():
+            pass
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+    assert limiter.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_use_headroom():
+    """Fast requests are admitted past the limit, up to the headroom."""
+    limiter = _limiter(initial=2, fast_headroom=0.5)
+    limiter.try_acquire()
+    limiter.try_acquire()
+
+    assert not limiter.try_acquire(fast=False)
+    assert limiter.try_acquire(fast=True)
+    assert not limiter.try_acquire(fast=True)
+
+
+def test_aimd_adjustment():
+    """Fast successes grow the limit additively, slow or failed ones shrink it."""
+    limiter = _limiter(initial=4)
+    for _ in range(4):
+        limiter.try_acquire()
+    limiter.release(0.1, ok=True)
+    assert limiter.limit == pytest.approx(4.25)
+
+    limiter.release(5.0, ok=True)
+    assert limiter.limit == pytest.approx(4.25 * 0.9)
+
+    # A second decrease within the same latency window is ignored
+    limiter.release(0.1, ok=False)
+    assert limiter.limit == pytest.approx(4.25 * 0.9)
+
+
+@pytest.mark.asyncio
+async def test_upstream_errors_count_as_failures():
+    """5xx errors inside the block shrink the limit; 4xx errors do not."""
+    from app.core.exceptions import AddressNotFoundError, GeocodingError
+
+    limiter = _limiter(initial=4)
+    with pytest.raises(AddressNotFoundError):
+        async with limiter.admit():
+            raise AddressNotFoundError("Nowhere", "source")
+    assert limiter.limit == 4
+
+    with pytest.raises(GeocodingError):
+        async with limiter.admit():
+            raise GeocodingError()
+    assert limiter.limit == pytest.approx(3.6)
+    assert limiter.in_flight == 0
@@ -0,0 +1,63 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import event, select
+
+from app.core.config import Settings
+from app.db.models import Address, HistoryPairStats
+from app.db.session import get_sessionmaker
+from app.services.address_book import upsert_address, upsert_addresses
+from app.services.history_stats import record_query
+
+
+def test_database_url_schemes():
+    assert Settings(DATABASE_URL="sqlite+aiosqlite://").DATABASE_URL == "sqlite+aiosqlite://"
+    with pytest.raises(ValidationError):
+        Settings(DATABASE_URL="mysql+aiomysql://localhost/db")
+
+
+@pytest.mark.asyncio
+async def test_upserts(db_session):
+    """The ON CONFLICT upserts work on the test database's dialect."""
+    first = await upsert_address(db_session, "Upsert Town", (1.0, 2.0))
+    assert await upsert_address(db_session, "Upsert Town") == first
+    assert await upsert_address(db_session, "Upsert Town", (3.0, 4.0)) == first
+    address = await db_session.scalar(
+        select(Address).where(Address.id == first).execution_options(populate_existing=True)
+    )
+    assert (address.latitude, address.longitude) == (3.0, 4.0)
+
+    for kilometers in (10, 5.5):
+        await record_query(db_session, "Upsert Town", "Elsewhere", kilometers)
+    pair = await db_session.get(HistoryPairStats, ("Upsert Town", "Elsewhere"))
+    assert pair.count == 2 and float(pair.total_kilometers) == 15.5
+
+
+@pytest.mark.asyncio
+async def test_commits_are_shared_within_a_test(db_session):
+    """Sessions join the test's transaction, so commits are visible to each other."""
+    await upsert_address(db_session, "Committed Town")
+    await db_session.commit()
+
+    async with get_sessionmaker()() as other:
+        assert await other.scalar(select(Address.id).where(Address.address == "Committed Town"))
+
+
+@pytest.mark.asyncio
+async def test_upsert_addresses_only_writes_changes(db_session, db_connection):
+    """Unchanged addresses are read back without an UPDATE, so no row lock is taken."""
+    statements = []
+
+    @event.listens_for(db_connection.sync_connection, "before_cursor_execute")
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0].upper())
+
+    ids = await upsert_addresses(db_session, {"Pair West": (1.0, 2.0), "Pair East": (3.0, 4.0)})
+    assert statements[-1] == "INSERT"
+
+    statements.clear()
+    assert await upsert_addresses(db_session, {"Pair East": (3.0, 4.0), "Pair West": None}) == ids
+    assert "UPDATE" not in statements
+
+    statements.clear()
+    await upsert_addresses(db_session, {"Pair East": (5.0, 6.0), "Pair West": (1.0, 2.0)})
+    assert statements.count("UPDATE") == 1
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import get_settings
+from app.core.loop_monitor import LoopMonitor
+from app.main import app
+
+pytestmark = pytest.mark.asyncio
+
+DEBUG_PATH = "/api/v1/debug"
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def test_monitor_captures_blocking_stack():
+    """A blocking call is measured as lag and its stack is captured."""
+    monitor = LoopMonitor(interval=0.01, stall_after=0.05)
+    task = asyncio.create_task(monitor.run())
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.2)
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    snapshot = monitor.snapshot()
+    assert snapshot["lag_max_ms"] >= 150
+    assert len(snapshot["stalls"]) == 1
+    stall = snapshot["stalls"][0]
+    assert "block_the_loop" in stall["stack"]
+    assert stall["lag_ms"] >= 150
+
+
+async def test_debug_endpoints_need_token(monkeypatch):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        monkeypatch.setattr(get_settings(), "DEBUG_TOKEN", None)
+        assert (await client.get(f"{DEBUG_PATH}/tasks")).status_code == 404
+
+        monkeypatch.setattr(get_settings(), "DEBUG_TOKEN", "secret")
+        assert (await client.get(f"{DEBUG_PATH}/tasks", headers={"X-Debug-Token": "wrong"})).status_code == 403
+        # Non-ASCII header bytes are refused like any other wrong token
+        non_ascii = {"X-Debug-Token": "s\u00e9cret".encode("latin-1")}
+        assert (await client.get(f"{DEBUG_PATH}/tasks", headers=non_ascii)).status_code == 403
+
+        headers = {"X-Debug-Token": "secret"}
+        tasks = await client.get(f"{DEBUG_PATH}/tasks", headers=headers)
+        assert tasks.status_code == 200 and tasks.json()["total"] >= 1
+
+        pools = await client.get(f"{DEBUG_PATH}/pools", headers=headers)
+        assert pools.status_code == 200 and set(pools.json()) == {"database", "http"}
+
+        memory = await client.get(f"{DEBUG_PATH}/memory", headers=headers)
+        assert memory.status_code == 200 and "tracing" in memory.json()
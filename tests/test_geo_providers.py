@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.geo_providers import GeocodingProvider, GeocodingRouter, HttpProvider
+from benchmarks.stubs import Latency, StubConfig, StubServer, fake_coordinates
+
+
+class FakeProvider(GeocodingProvider):
+    def __init__(self, name, result=None, delay=0.0, fail=False, authoritative=True):
+        self.name = name
+        self.result = result
+        self.delay = delay
+        self.fail = fail
+        self.authoritative = authoritative
+        self.calls = 0
+
+    async def lookup(self, address):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return self.result
+
+
+def test_provider_must_implement_lookup():
+    class Incomplete(GeocodingProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="lookup"):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_falls_through_errors_and_inconclusive_answers():
+    """Failures and non-authoritative misses move on to the next provider."""
+    local = FakeProvider("gazetteer", authoritative=False)
+    broken = FakeProvider("broken", fail=True)
+    good = FakeProvider("good", result=(1.0, 2.0))
+    router = GeocodingRouter([local, broken, good])
+
+    assert await router.lookup("Somewhere") == (1.0, 2.0)
+    assert (local.calls, broken.calls, good.calls) == (1, 1, 1)
+
+    # An authoritative miss is final
+    router = GeocodingRouter([FakeProvider("empty"), good])
+    assert await router.lookup("Nowhere") is None
+    assert good.calls == 1
+
+    with pytest.raises(RuntimeError):
+        await GeocodingRouter([broken, local]).lookup("Somewhere")
+
+
+@pytest.mark.asyncio
+async def test_ranks_by_latency_and_errors():
+    """Slow or failing providers drop behind ones that answer quickly."""
+    slow = FakeProvider("slow", result=(1.0, 1.0), delay=0.05)
+    fast = FakeProvider("fast", result=(2.0, 2.0))
+    router = GeocodingRouter([slow, fast])
+
+    await router.lookup("a")  # measures slow only
+    await router.lookup("b")  # fast has no data yet, so it is tried
+    assert [p.name for p in router.ranked()] == ["fast", "slow"]
+
+    fast.fail = True
+    for _ in range(5):
+        await router.lookup("c")
+    assert [p.name for p in router.ranked()] == ["slow", "fast"]
+    assert router.snapshot()["fast"]["outcomes"]["error"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_hedging_races_a_slow_provider():
+    """With hedging, a second provider answers when the first is too slow."""
+    stalled = FakeProvider("stalled", result=(1.0, 1.0), delay=5)
+    backup = FakeProvider("backup", result=(2.0, 2.0), delay=0.01)
+    router = GeocodingRouter([stalled, backup], hedge_after=0.05)
+
+    started = asyncio.get_running_loop().time()
+    assert await router.lookup("a") == (2.0, 2.0)
+    assert asyncio.get_running_loop().time() - started < 1
+    assert backup.calls == 1
+    # The cancelled provider's elapsed time counts against it
+    assert [p.name for p in router.ranked()] == ["backup", "stalled"]
+
+
+@pytest.mark.asyncio
+async def test_http_provider_against_stub():
+    """The generic HTTP provider reads Nominatim-style responses."""
+    with StubServer(StubConfig(nominatim=Latency(5))) as stub:
+        provider = HttpProvider("http", f"{stub.url}/search")
+        try:
+            assert await provider.lookup("Oslo, Norway") == fake_coordinates("Oslo, Norway")
+            assert await provider.lookup("Nowhere Special") is None
+        finally:
+            await provider.close()
+        assert stub.calls["nominatim"] == 2
@@ -0,0 +1,92 @@
+import pytest
+import pytest_asyncio
+
+from app.core.config import get_settings
+from app.core.exceptions import AddressNotFoundError
+from app.services import geo_providers, nominatim
+from app.services.geocode import get_coordinates, get_coordinates_batch
+from app.services.nominatim import structured_query
+from benchmarks.stubs import StubServer, fake_coordinates
+
+
+@pytest.fixture(scope="module")
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+@pytest_asyncio.fixture
+async def stub_nominatim(stub, monkeypatch):
+    """Geocode with Nominatim only, served by the stub without rate limiting."""
+    monkeypatch.setattr(get_settings(), "GEOCODER_PROVIDERS", "nominatim")
+    monkeypatch.setattr(get_settings(), "NOMINATIM_BASE_URL", stub.url)
+    monkeypatch.setattr(get_settings(), "NOMINATIM_RATE_LIMIT_PER_SEC", 0)
+    await geo_providers.close_providers()
+    stub.calls.clear()
+    yield stub
+    await geo_providers.close_providers()
+
+
+def _count(query_type: str, outcome: str) -> int:
+    stats = nominatim.lookup_stats.get(query_type)
+    return stats.outcomes[outcome] if stats else 0
+
+
+def test_structured_query_shapes():
+    """Only full street, city, state, country addresses use structured fields."""
+    assert structured_query("123 Main St, Toronto, ON, Canada") == {
+        "street": "123 Main St", "city": "Toronto", "state": "ON", "country": "Canada",
+    }
+    assert structured_query("12B Rue Cler, Paris, Ile-de-France, France")["street"] == "12B Rue Cler"
+    for ambiguous in (
+        "Toronto",
+        "Paris, France",
+        "Main St, Toronto",
+        "123 Main St, Toronto",
+        "123 Main St, Springfield, IL",
+        "Main St, Toronto, ON, Canada",
+        "90210, Beverly Hills, CA, USA",
+        "1 Main St, Springfield, IL, 62701, USA",
+    ):
+        assert structured_query(ambiguous) is None, ambiguous
+
+
+@pytest.mark.asyncio
+async def test_structured_lookup(stub_nominatim):
+    """Structured queries are used first and their outcomes recorded."""
+    found = _count("structured", "found")
+    coords = await get_coordinates("123 Main St, Springfield, IL, USA", "source")
+
+    assert coords == fake_coordinates("123 Main St, Springfield, IL, USA")
+    assert stub_nominatim.calls["nominatim"] == 1
+    assert _count("structured", "found") == found + 1
+
+
+@pytest.mark.asyncio
+async def test_freetext_fallback_and_negative_cache(stub_nominatim):
+    """A structured miss falls back to free text; misses are then cached."""
+    not_found = _count("freetext", "not_found")
+    for _ in range(2):
+        with pytest.raises(AddressNotFoundError):
+            await get_coordinates("1 Nowhere Rd, Atlantis, AT, Ocean", "destination")
+
+    assert stub_nominatim.calls["nominatim"] == 2
+    assert _count("freetext", "not_found") == not_found + 1
+    assert nominatim.get_lookup_stats()["freetext"]["success_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup(stub_nominatim):
+    """Batches look up each distinct uncached address once."""
+    await get_coordinates("Batch City, Canada", "source")
+    stub_nominatim.calls.clear()
+
+    results = await get_coordinates_batch([
+        "Batch City, Canada", "Other Town, Canada", "Other Town, Canada", "Nowhere Land",
+    ])
+    assert results == {
+        "Batch City, Canada": fake_coordinates("Batch City, Canada"),
+        "Other Town, Canada": fake_coordinates("Other Town, Canada"),
+        "Nowhere Land": None,
+    }
+    assert stub_nominatim.calls["nominatim"] == 2
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.core.geodesic import (
+    calculate_distance,
+    distance_meters_batch,
+    ellipsoidal_meters,
+    vincenty_inverse,
+)
+from app.core.haversine import calculate_distance as haversine_distance
+
+
+def _dms(degrees: int, minutes: int, seconds: float) -> float:
+    sign = -1 if degrees < 0 else 1
+    return sign * (abs(degrees) + minutes / 60 + seconds / 3600)
+
+
+# Vincenty's (1975) worked example and geodesics checked against Karney's
+# GeographicLib, in meters
+FLINDERS_PEAK = (_dms(-37, 57, 3.72030), _dms(144, 25, 29.52440))
+BUNINYONG = (_dms(-37, 39, 10.15610), _dms(143, 55, 35.38390))
+REFERENCE = [
+    (FLINDERS_PEAK + BUNINYONG, 54972.271),
+    ((40.64, -73.78, 1.36, 103.99), 15347512.941),   # JFK to Singapore
+    ((0.0, 0.0, 0.0, 90.0), 10018754.171),           # quarter of the equator
+    ((90.0, 0.0, -90.0, 0.0), 20003931.459),         # pole to pole
+    ((0.0, 0.0, 0.0, 180.0), 20003931.459),          # antipodal, via a pole
+    ((0.0, 0.0, 0.5, 179.7), 19944127.421),          # nearly antipodal
+    ((10.0, 170.0, 10.0, -170.0), 2192447.565),      # across the antimeridian
+]
+
+
+@pytest.mark.parametrize("points,meters", REFERENCE)
+def test_ellipsoidal_reference_geodesics(points, meters):
+    """Scalar and batch ellipsoidal distances match reference geodesics to a millimetre."""
+    assert ellipsoidal_meters(*points) == pytest.approx(meters, abs=1e-3)
+    assert distance_meters_batch(*([p] for p in points), mode="ellipsoidal")[0] == pytest.approx(meters, abs=1e-3)
+
+
+def test_vincenty_defers_nearly_antipodal_points():
+    """Vincenty reports non-convergence instead of returning a wrong distance."""
+    assert vincenty_inverse(0.0, 0.0, 0.5, 179.7) is None
+    assert vincenty_inverse(*FLINDERS_PEAK, *FLINDERS_PEAK) == 0.0
+
+
+def test_modes():
+    """Spherical mode is the haversine result; ellipsoidal differs on long routes."""
+    toronto_vancouver = (43.6532, -79.3832, 49.2827, -123.1207)
+    assert calculate_distance(*toronto_vancouver) == haversine_distance(*toronto_vancouver)
+
+    km, miles = calculate_distance(*toronto_vancouver, mode="ellipsoidal")
+    assert km != haversine_distance(*toronto_vancouver)[0]
+    assert miles == round(km * 0.621371, 2)
+    with pytest.raises(ValueError):
+        calculate_distance(*toronto_vancouver, mode="flat")
+
+
+def test_batch_matches_scalar():
+    """The vectorized paths agree with the scalar functions."""
+    rng = np.random.default_rng(7)
+    lat1, lat2 = rng.uniform(-90, 90, (2, 500))
+    lon1, lon2 = rng.uniform(-180, 180, (2, 500))
+
+    spherical = distance_meters_batch(lat1, lon1, lat2, lon2)
+    ellipsoidal = distance_meters_batch(lat1, lon1, lat2, lon2, mode="ellipsoidal")
+    for i in range(0, 500, 25):
+        assert spherical[i] / 1000 == pytest.approx(haversine_distance(lat1[i], lon1[i], lat2[i], lon2[i])[0], abs=0.01)
+        assert ellipsoidal[i] == pytest.approx(ellipsoidal_meters(lat1[i], lon1[i], lat2[i], lon2[i]), abs=1e-4)
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.db.session import get_db
+from app.main import app
+from app.services import history_cache
+from app.services.history_cache import (
+    ResponseCache,
+    bump_history_version,
+    decode_cursor,
+    encode_cursor,
+    history_version,
+)
+
+HISTORY_PATH = "/api/v1/history"
+
+
+class CountingSession:
+    """Stands in for the DB session, counting queries and returning no rows."""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        return self
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+def test_version_is_monotonic():
+    """Bumps always move the version forward."""
+    before = history_version()
+    assert bump_history_version() == before + 1
+    assert history_version() == before + 1
+
+
+def test_cursor_round_trip():
+    """Cursors encode the last row's position; garbage is rejected."""
+    created_at = datetime(2025, 7, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    assert decode_cursor("not-a-cursor") is None
+
+
+def test_response_cache_is_bounded():
+    cache = ResponseCache(max_entries=2)
+    for etag in ("a", "b", "c"):
+        cache.put(etag, b"[]", None)
+    assert cache.get("a") is None
+    assert cache.get("c") == (b"[]", None)
+
+
+@pytest.mark.asyncio
+async def test_etag_and_cache_skip_the_database(monkeypatch):
+    """Repeat polls are served from the cache, and If-None-Match gets a 304."""
+    monkeypatch.setattr(history_cache, "response_cache", ResponseCache())
+    monkeypatch.setattr("app.api.history.response_cache", history_cache.response_cache)
+    session = CountingSession()
+
+    async def _get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = _get_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = await client.get(HISTORY_PATH, params={"limit": 5})
+            assert first.status_code == 200 and first.json() == []
+            etag = first.headers["ETag"]
+
+            assert (await client.get(HISTORY_PATH, params={"limit": 5})).headers["ETag"] == etag
+            not_modified = await client.get(HISTORY_PATH, params={"limit": 5}, headers={"If-None-Match": etag})
+            assert not_modified.status_code == 304
+            assert session.queries == 1
+
+            # A write changes the version, so the poller gets fresh data
+            bump_history_version()
+            refreshed = await client.get(HISTORY_PATH, params={"limit": 5}, headers={"If-None-Match": etag})
+            assert refreshed.status_code == 200 and refreshed.headers["ETag"] != etag
+            assert session.queries == 2
+    finally:
+        app.dependency_overrides.clear()
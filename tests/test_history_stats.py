@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.history_stats import hour_of, record_query
+
+pytestmark = pytest.mark.asyncio
+
+STATS_PATH = "/api/v1/history/stats"
+
+
+async def test_stats_from_rollups(db_session, client):
+    """Recorded queries show up in the totals, top pairs, hourly counts and histogram."""
+    now = datetime.now(timezone.utc)
+    earlier = hour_of(now) - timedelta(hours=1)
+    for source, destination, kilometers, created_at in [
+        ("Toronto", "Vancouver", 3360.0, now),
+        ("Toronto", "Vancouver", 3364.0, earlier),
+        ("Paris", "Lyon", 392.0, now),
+        ("Here", "There", 4.0, hour_of(now) - timedelta(hours=30)),
+    ]:
+        await record_query(db_session, source, destination, kilometers, created_at=created_at)
+    await db_session.commit()
+
+    response = await client.get(STATS_PATH, params={"top": 2, "hours": 2})
+    assert response.status_code == 200
+    stats = response.json()
+
+    assert stats["total_queries"] == 4
+    assert stats["average_kilometers"] == 1780.0
+    assert stats["top_pairs"] == [
+        {"source": "Toronto", "destination": "Vancouver", "count": 2, "average_kilometers": 3362.0},
+        {"source": "Paris", "destination": "Lyon", "count": 1, "average_kilometers": 392.0},
+    ]
+    # The query from 30 hours ago is outside the window
+    assert [hour["count"] for hour in stats["hourly"]] == [1, 2]
+    histogram = {bucket["min_kilometers"]: bucket["count"] for bucket in stats["distance_histogram"]}
+    assert histogram[0] == 1 and histogram[250] == 1 and histogram[2500] == 2
+    assert sum(histogram.values()) == 4
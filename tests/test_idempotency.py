@@ -0,0 +1,110 @@
+import asyncio
+import uuid
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import app.api.distance as dist_mod
+from app.core.exceptions import GeocodingError, IdempotencyKeyReusedError
+from app.db.session import get_db
+from app.main import app
+from app.services.idempotency import run_once
+
+pytestmark = pytest.mark.asyncio
+
+DISTANCE_PATH = "/api/v1/distance"
+PAYLOAD = {"source": "Toronto", "destination": "Vancouver", "captchaToken": "token"}
+
+
+def new_key() -> str:
+    return f"idempotency:test-{uuid.uuid4().hex}"
+
+
+async def test_concurrent_duplicates_run_once():
+    """Duplicates wait for the in-flight original and share its response."""
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"kilometers": 1.0}
+
+    key = new_key()
+    results = await asyncio.gather(*(run_once(key, "fp", compute) for _ in range(5)))
+    assert calls == 1
+    assert all(response == {"kilometers": 1.0} for response, _ in results)
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+
+    # Later retries are replayed from the store
+    assert await run_once(key, "fp", compute) == ({"kilometers": 1.0}, True)
+    assert calls == 1
+
+
+async def test_key_reused_for_another_request():
+    async def compute():
+        return {"kilometers": 1.0}
+
+    key = new_key()
+    await run_once(key, "fp", compute)
+    with pytest.raises(IdempotencyKeyReusedError):
+        await run_once(key, "other", compute)
+
+
+async def test_failure_releases_the_key():
+    """A failed original is not replayed; the retry runs again."""
+    attempts = 0
+
+    async def compute():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise GeocodingError()
+        return {"kilometers": 2.0}
+
+    key = new_key()
+    with pytest.raises(GeocodingError):
+        await run_once(key, "fp", compute)
+    assert await run_once(key, "fp", compute) == ({"kilometers": 2.0}, False)
+
+
+async def test_distance_replays_with_header(monkeypatch):
+    """Retries with the same key are answered without recomputing."""
+    calls = 0
+
+    async def fake_calculate(request, db):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {
+            "kilometers": 3354.0, "miles": 2084.1,
+            "source_address": request.source, "destination_address": request.destination,
+            "source_corrected": False, "destination_corrected": False, "mode": request.mode,
+        }
+
+    async def _get_db():
+        yield None
+
+    monkeypatch.setattr(dist_mod, "_calculate_distance", fake_calculate)
+    app.dependency_overrides[get_db] = _get_db
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first, duplicate = await asyncio.gather(
+                client.post(DISTANCE_PATH, json=PAYLOAD, headers=headers),
+                client.post(DISTANCE_PATH, json=PAYLOAD, headers=headers),
+            )
+            retry = await client.post(DISTANCE_PATH, json={**PAYLOAD, "captchaToken": "fresh"}, headers=headers)
+            changed = await client.post(DISTANCE_PATH, json={**PAYLOAD, "destination": "Calgary"}, headers=headers)
+        # A retry after switching networks comes from another address
+        transport = ASGITransport(app=app, client=("203.0.113.9", 443))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            moved = await client.post(DISTANCE_PATH, json=PAYLOAD, headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert calls == 1
+    assert first.json() == duplicate.json() == retry.json() == moved.json()
+    assert retry.headers["Idempotent-Replayed"] == moved.headers["Idempotent-Replayed"] == "true"
+    assert changed.status_code == 422
+    assert changed.json()["detail"]["code"] == "IDEMPOTENCY_KEY_REUSED"
@@ -0,0 +1,291 @@
+import gzip
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.core.exceptions import InvalidIngestError
+from app.core.haversine import calculate_distance
+from app.db.session import get_engine
+from app.main import app
+from app.services import ingest as ingest_module
+from app.services.history_cache import history_version
+from app.services.ingest import (
+    Ingest,
+    Rollups,
+    address_coordinates,
+    fill_distances,
+    gunzip,
+    ingest,
+    iter_lines,
+    iter_records,
+    validate_record,
+)
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(chunks, fmt):
+    return [record async for record in iter_records(iter_lines(stream(*chunks)), fmt)]
+
+
+def test_validate_record():
+    row = validate_record({"source": " Toronto ", "destination": "Ottawa", "created_at": "2019-03-01T10:00:00",
+                           "kilometers": "351.5"})
+    assert row.source == "Toronto" and row.meters == 351500
+    # Naive timestamps are taken as UTC
+    assert row.created_at == datetime(2019, 3, 1, 10, tzinfo=timezone.utc)
+
+    row = validate_record({"source": "A", "destination": "B", "created_at": "2019-03-01T10:00:00+02:00",
+                           "source_lat": "43.65", "source_lon": "-79.38",
+                           "destination_lat": 45.42, "destination_lon": -75.69})
+    assert row.meters is None and row.destination_coords == (45.42, -75.69)
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({"source": "A", "destination": "", "created_at": "2019-01-01", "meters": 1}, "required"),
+    ({"source": "A", "destination": "B", "meters": 1}, "created_at"),
+    ({"source": "A", "destination": "B", "created_at": "yesterday", "meters": 1}, "isoformat"),
+    ({"source": "A", "destination": "B", "created_at": "2019-01-01"}, "distance or both"),
+    ({"source": "A", "destination": "B", "created_at": "2019-01-01", "meters": "nan"}, "finite"),
+    ({"source": "A", "destination": "B", "created_at": "2019-01-01", "meters": -5}, "negative"),
+    ({"source": "A", "destination": "B", "created_at": "2019-01-01", "meters": 2 ** 31}, "exceed"),
+    ({"source": "A", "destination": "B", "created_at": "2019-01-01", "kilometers": "2147484"}, "exceed"),
+    ({"source": "A", "destination": "B", "created_at": "2019-01-01",
+      "source_lat": 95, "source_lon": 0, "destination_lat": 0, "destination_lon": 0}, "out of range"),
+])
+def test_validate_record_rejects(raw, message):
+    with pytest.raises(ValueError, match=message):
+        validate_record(raw)
+
+
+def test_fill_distances_matches_scalar_haversine():
+    coords = [((43.6532, -79.3832), (49.2827, -123.1207)), ((51.5074, -0.1278), (48.8566, 2.3522))]
+    rows = [
+        validate_record({"source": "A", "destination": "B", "created_at": "2019-01-01",
+                         "source_lat": s[0], "source_lon": s[1], "destination_lat": d[0], "destination_lon": d[1]})
+        for s, d in coords
+    ]
+    rows.append(validate_record({"source": "A", "destination": "C", "created_at": "2019-01-01", "meters": 7}))
+    filled = fill_distances(rows)
+    for row, (s, d) in zip(filled, coords):
+        assert row.meters == pytest.approx(calculate_distance(*s, *d)[0] * 1000, abs=10)
+    assert filled[2].meters == 7
+
+
+def test_rollups_and_addresses():
+    rows = [
+        validate_record({"source": "A", "destination": "B", "created_at": f"2019-01-01T10:{minute:02d}:00",
+                         "kilometers": km, "source_lat": lat, "source_lon": lon})
+        for minute, km, lat, lon in ((30, 40, 11, 1), (5, 20, 10, 1), (59, 600, "", ""))
+    ]
+    rollups = Rollups.of(rows)
+    assert rollups.pairs[("A", "B")] == [3, 660.0, datetime(2019, 1, 1, 10, 59, tzinfo=timezone.utc)]
+    assert rollups.hours == {datetime(2019, 1, 1, 10, tzinfo=timezone.utc): [3, 660.0]}
+    assert rollups.buckets == {10: [2, 60.0], 500: [1, 600.0]}
+    # The latest known coordinates win; a later row without any keeps them
+    assert address_coordinates(rows) == {"A": (11.0, 1.0), "B": None}
+
+
+class RecordingConnection:
+    """Records the arguments of each statement and assigns address ids."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, query, *args):
+        self.calls.append(args)
+
+    async def fetch(self, query, *args):
+        return [(address, index) for index, address in enumerate(args[0])]
+
+
+@pytest.mark.asyncio
+async def test_upserts_lock_rows_in_key_order():
+    """Addresses and rollups are written in sorted order, as /distance writes them."""
+    rows = [
+        validate_record({"source": source, "destination": destination, "created_at": created_at, "kilometers": km})
+        for source, destination, created_at, km in (
+            ("Zurich", "Berlin", "2019-01-02T10:00:00", 700),
+            ("Amsterdam", "Zurich", "2019-01-01T10:00:00", 600),
+        )
+    ]
+    db = RecordingConnection()
+    job = Ingest("sorted", db, partitioned=False, mode="spherical")
+
+    await job.address_id_map(rows)
+    await job.update_rollups(Rollups.of(rows))
+
+    addresses, pairs, hours, buckets = (args[0] for args in db.calls)
+    assert addresses == ["Amsterdam", "Berlin", "Zurich"]
+    assert pairs == ["Amsterdam", "Zurich"]
+    assert hours == sorted(hours) and buckets == [500]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_csv_across_chunks():
+    records = await collect(
+        [b"\xef\xbb\xbfsource,destination,created_at,meters\r\nA,B,2019-", b"01-01,5\r\n\r\n\"C, X\",D\nE,F,2019-01-02,6"],
+        "csv",
+    )
+    assert records == [
+        {"source": "A", "destination": "B", "created_at": "2019-01-01", "meters": "5"},
+        {"_error": "expected 4 fields, got 2"},
+        {"source": "E", "destination": "F", "created_at": "2019-01-02", "meters": "6"},
+    ]
+
+    with pytest.raises(InvalidIngestError):
+        await collect([b"from,to\n"], "csv")
+
+
+@pytest.mark.asyncio
+async def test_iter_records_ndjson():
+    records = await collect([b'{"source": "A"}\n[1]\n{oops\n'], "ndjson")
+    assert records[0] == {"source": "A"}
+    assert records[1] == {"_error": "not a JSON object"}
+    assert records[2]["_error"].startswith("invalid JSON")
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_needs_token(monkeypatch):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", None)
+        assert (await client.post("/api/v1/admin/ingest", params={"name": "x"})).status_code == 404
+        monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "secret")
+        response = await client.post("/api/v1/admin/ingest", params={"name": "x"}, headers={"X-Admin-Token": "no"})
+        assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_gunzip_streams_concatenated_members():
+    body = gzip.compress(b"source,destination\n") + gzip.compress(b"A,B\n")
+    chunks = [body[start:start + 7] for start in range(0, len(body), 7)]
+    assert b"".join([data async for data in gunzip(stream(*chunks))]) == b"source,destination\nA,B\n"
+
+    for broken in (b"not gzip at all", body[:-5]):
+        with pytest.raises(InvalidIngestError):
+            [data async for data in gunzip(stream(broken))]
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_rejects_unknown_encoding(monkeypatch):
+    monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "secret")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/admin/ingest", params={"name": "x"}, content=b"...",
+            headers={"X-Admin-Token": "secret", "Content-Encoding": "br"},
+        )
+    assert response.status_code == 422
+    assert "Content-Encoding" in response.json()["detail"]["message"]
+
+
+@pytest_asyncio.fixture
+async def ingest_database(db_connection):
+    """
+    The PostgreSQL test database, for imports that commit on connections
+    of their own. Nothing may be read through the test's transaction, so
+    the cleanup below is not blocked by its locks.
+    """
+    if db_connection.dialect.name != "postgresql":
+        pytest.skip("Bulk ingestion requires PostgreSQL")
+    yield get_engine()
+    async with get_engine().begin() as conn:
+        await conn.execute(text(
+            "TRUNCATE query_history, addresses, history_pair_stats, history_hourly_stats, "
+            "history_distance_buckets, ingest_checkpoints CASCADE"
+        ))
+
+
+@pytest.mark.asyncio
+async def test_interrupted_ingest_resumes(ingest_database, monkeypatch):
+    """An import resumes after its last committed chunk and loads every valid record once."""
+    monkeypatch.setattr(get_settings(), "INGEST_CHUNK_SIZE", 2)
+    # The last chunk mixes known addresses with a new one and overflows the id cache
+    monkeypatch.setattr(ingest_module, "ADDRESS_CACHE_SIZE", 3)
+    records = [
+        {"source": "Toronto", "destination": "Ottawa", "created_at": "2019-01-01T10:00:00", "kilometers": "351"},
+        {"source": "Toronto", "destination": "Montreal", "created_at": "2019-01-01T11:00:00", "meters": "504000"},
+        {"source": "Toronto", "destination": "Ottawa", "created_at": "2019-02-01T10:00:00"},
+        {"source": "Ottawa", "destination": "Montreal", "created_at": "2019-02-01T11:00:00",
+         "source_lat": "45.42", "source_lon": "-75.69", "destination_lat": "45.50", "destination_lon": "-73.57"},
+        {"source": "Montreal", "destination": "Toronto", "created_at": "2019-03-01T12:00:00", "kilometers": "504"},
+        {"source": "Toronto", "destination": "Kingston", "created_at": "2019-03-02T12:00:00", "kilometers": "263"},
+    ]
+
+    async def interrupted():
+        for record in records[:3]:
+            yield record
+        raise ConnectionResetError("upload interrupted")
+
+    async def complete():
+        for record in records:
+            yield record
+
+    with pytest.raises(ConnectionResetError):
+        await ingest(interrupted(), name="legacy", defer_indexes=True)
+
+    async with ingest_database.connect() as conn:
+        # The first chunk committed with its checkpoint; the third record was lost
+        assert (await conn.execute(text(
+            "SELECT position, loaded, finished_at FROM ingest_checkpoints WHERE name = 'legacy'"
+        ))).one() == (2, 2, None)
+        assert await conn.scalar(text("SELECT count(*) FROM query_history")) == 2
+        # Indexes deferred by the failed run were rebuilt
+        assert await conn.scalar(text(
+            "SELECT count(*) FROM pg_indexes WHERE indexname = 'ix_query_history_created_at'"
+        )) == 1
+
+    version = history_version()
+    report = await ingest(complete(), name="legacy")
+    assert (report["loaded"], report["rejected"], report["skipped"]) == (3, 1, 2)
+    assert report["errors"] == [{"record": 3, "error": "a distance or both sides' coordinates are required"}]
+    assert history_version() > version
+
+    async with ingest_database.connect() as conn:
+        assert (await conn.execute(text(
+            "SELECT position, loaded, rejected, finished_at IS NOT NULL FROM ingest_checkpoints"
+        ))).one() == (6, 5, 1, True)
+        rows = (await conn.execute(text("""
+            SELECT s.address, d.address, h.meters FROM query_history h
+            JOIN addresses s ON s.id = h.source_id JOIN addresses d ON d.id = h.destination_id
+            ORDER BY h.created_at
+        """))).all()
+        assert [(source, destination) for source, destination, _ in rows] == [
+            (record["source"], record["destination"]) for record in records if record is not records[2]
+        ]
+        assert rows[2][2] == pytest.approx(calculate_distance(45.42, -75.69, 45.50, -73.57)[0] * 1000, abs=10)
+        assert (await conn.execute(text(
+            "SELECT count(*), sum(count), sum(total_kilometers)::float8 FROM history_pair_stats"
+        ))).one() == (5, 5, pytest.approx(351 + 504 + rows[2][2] / 1000 + 504 + 263))
+        assert await conn.scalar(text("SELECT sum(count) FROM history_hourly_stats")) == 5
+        assert (await conn.execute(text(
+            "SELECT latitude, longitude FROM addresses WHERE address = 'Ottawa'"
+        ))).one() == (45.42, -75.69)
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_loads_gzipped_body(ingest_database, client, monkeypatch):
+    """A gzipped upload is decompressed as it streams in and loaded."""
+    monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "secret")
+    body = gzip.compress(
+        b"source,destination,created_at,kilometers\n"
+        b"Toronto,Ottawa,2019-01-01T10:00:00,351\n"
+        b"Toronto,Montreal,2019-01-02T10:00:00,504\n"
+        b"Toronto,,2019-01-03T10:00:00,1\n"
+    )
+    response = await client.post(
+        "/api/v1/admin/ingest", params={"name": "upload", "format": "csv"}, content=body,
+        headers={"X-Admin-Token": "secret", "Content-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["loaded"], report["rejected"], report["skipped"]) == (2, 1, 0)
+    async with ingest_database.connect() as conn:
+        assert await conn.scalar(text("SELECT count(*) FROM query_history")) == 2
@@ -0,0 +1,195 @@
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.db.session as db_session_module
+from app.core.config import get_settings
+from app.db.models import Base, Job, JobItem
+from app.db.session import build_engine
+from app.core.exceptions import AddressNotFoundError, GeocodingError, InvalidJobError
+from app.services import jobs
+
+
+def test_parse_pairs_csv_skips_header_and_blank_lines():
+    text = "source,destination\nToronto, Vancouver\n\n\"Paris, France\",Berlin\n"
+    assert jobs.parse_pairs_csv(text) == [("Toronto", "Vancouver"), ("Paris, France", "Berlin")]
+
+
+def test_parse_pairs_csv_rejects_bad_rows():
+    with pytest.raises(InvalidJobError) as exc_info:
+        jobs.parse_pairs_csv("Toronto,Vancouver\nMontreal\n")
+    assert "Line 2" in exc_info.value.detail["message"]
+
+
+def test_validate_pairs_limits(monkeypatch):
+    monkeypatch.setattr(jobs.get_settings(), "JOB_MAX_PAIRS", 2)
+    jobs.validate_pairs([("a", "b"), ("c", "d")])
+    for pairs in ([], [("a", "b")] * 3, [("a", "")], [("a", "x" * 257)]):
+        with pytest.raises(InvalidJobError):
+            jobs.validate_pairs(pairs)
+
+
+@pytest.mark.asyncio
+async def test_process_pair_results_and_errors(monkeypatch):
+    async def _clean(source, destination):
+        return {"source": source, "destination": destination}
+
+    calls = []
+
+    async def _geocode(address, side):
+        calls.append(address)
+        if address == "Nowhere":
+            raise AddressNotFoundError(address, side)
+        if address == "Flaky" and calls.count("Flaky") == 1:
+            raise GeocodingError()
+        return (43.6532, -79.3832) if side == "source" else (49.2827, -123.1207)
+
+    monkeypatch.setattr(jobs, "clean_addresses", _clean)
+    monkeypatch.setattr(jobs, "get_coordinates", _geocode)
+    monkeypatch.setattr(jobs, "RETRY_DELAYS", (0, 0))
+
+    done = await jobs.process_pair("Toronto", "Vancouver")
+    assert done["status"] == "done"
+    assert done["kilometers"] == pytest.approx(3358, rel=0.01)
+
+    # Not found is final; an upstream error is retried
+    missing = await jobs.process_pair("Nowhere", "Vancouver")
+    assert missing["status"] == "error" and "Nowhere" in missing["error"]
+    assert (await jobs.process_pair("Flaky", "Vancouver"))["status"] == "done"
+
+
+@pytest_asyncio.fixture
+async def jobs_database(tmp_path, monkeypatch):
+    """
+    A SQLite file database with a connection per session, as the runner's
+    concurrent sessions need (the shared test transaction cannot host them).
+    """
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.sqlite3'}", poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(db_session_module, "_engine", engine)
+    monkeypatch.setattr(db_session_module, "_sessionmaker", sessions)
+    yield sessions
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_runner_resumes_stale_job_without_redoing_pairs(jobs_database, monkeypatch):
+    """A crashed owner's job is claimed once stale, and only its pending pairs are processed."""
+    processed = []
+
+    async def _process_pair(source, destination):
+        processed.append(source)
+        return {"status": "done", "source_address": source, "destination_address": destination,
+                "kilometers": 1.0, "miles": 0.62, "error": None}
+
+    async def _clean_batch(pairs):
+        return []
+
+    monkeypatch.setattr(jobs, "process_pair", _process_pair)
+    monkeypatch.setattr(jobs, "clean_addresses_batch", _clean_batch)
+
+    async with jobs_database() as db:
+        stale = await jobs.create_job(db, [(f"S{i}", f"D{i}") for i in range(5)])
+        busy = await jobs.create_job(db, [("B", "C")])
+        # S0 and S1 were finished by a process that then died; the other
+        # job's owner is alive
+        await db.execute(update(JobItem).where(JobItem.job_id == stale.id, JobItem.position < 2)
+                         .values(status="done"))
+        await db.execute(update(Job).where(Job.id == stale.id).values(
+            status="running", owner="gone:1", completed=2, heartbeat_at=jobs._now() - timedelta(minutes=5)))
+        await db.execute(update(Job).where(Job.id == busy.id).values(
+            status="running", owner="alive:1", heartbeat_at=jobs._now()))
+        await db.commit()
+
+    runner = jobs.JobRunner(workers=2, poll_interval=0.01, stale_after=60)
+    assert await runner.claim() == stale.id
+    assert await runner.claim() is None
+
+    await runner.run_job(stale.id)
+    assert sorted(processed) == ["S2", "S3", "S4"]
+
+    async with jobs_database() as db:
+        job = await db.get(Job, stale.id)
+        assert (job.status, job.completed, job.failed) == ("completed", 5, 0)
+        statuses = (await db.execute(select(JobItem.status).where(JobItem.job_id == stale.id))).scalars()
+        assert set(statuses) == {"done"}
+
+
+@pytest.mark.asyncio
+async def test_failing_workers_do_not_block_the_runner(jobs_database, monkeypatch):
+    """Pairs whose processing raises stay pending, and the job is left to go stale."""
+    async def _process_pair(source, destination):
+        if source != "S0":
+            raise ConnectionError("database is down")
+        return {"status": "done", "source_address": source, "destination_address": destination,
+                "kilometers": 1.0, "miles": 0.62, "error": None}
+
+    async def _clean_batch(pairs):
+        return []
+
+    monkeypatch.setattr(jobs, "process_pair", _process_pair)
+    monkeypatch.setattr(jobs, "clean_addresses_batch", _clean_batch)
+
+    async with jobs_database() as db:
+        job = await jobs.create_job(db, [(f"S{i}", f"D{i}") for i in range(20)])
+
+    runner = jobs.JobRunner(workers=2, poll_interval=0.01, stale_after=60)
+    assert await runner.claim() == job.id
+    await asyncio.wait_for(runner.run_job(job.id), timeout=5)
+
+    async with jobs_database() as db:
+        job = await db.get(Job, job.id)
+        assert (job.status, job.completed, job.failed) == ("running", 1, 0)
+        pending = await db.scalar(
+            select(func.count()).where(JobItem.job_id == job.id, JobItem.status == "pending")
+        )
+        assert pending == 19
+
+
+@pytest.mark.asyncio
+async def test_jobs_api(client, db_connection, monkeypatch):
+    """Submitting needs the jobs token and a bounded body; results stream in order."""
+    settings = get_settings()
+    body = {"pairs": [{"source": "Toronto", "destination": "Vancouver"}, {"source": "Paris", "destination": "Lyon"}]}
+
+    monkeypatch.setattr(settings, "JOBS_TOKEN", None)
+    assert (await client.post("/api/v1/jobs", json=body)).status_code == 404
+    monkeypatch.setattr(settings, "JOBS_TOKEN", "secret")
+    assert (await client.post("/api/v1/jobs", json=body, headers={"X-Jobs-Token": "no"})).status_code == 403
+
+    headers = {"X-Jobs-Token": "secret"}
+    monkeypatch.setattr(settings, "JOB_MAX_BODY_BYTES", 64)
+    too_large = await client.post("/api/v1/jobs", json=body, headers=headers)
+    assert too_large.status_code == 413
+
+    async def _unsized_body():
+        yield b'{"pairs": ['
+        yield b" " * 100
+
+    streamed = await client.post("/api/v1/jobs", content=_unsized_body(), headers=headers)
+    assert streamed.status_code == 413
+
+    monkeypatch.setattr(settings, "JOB_MAX_BODY_BYTES", 1024)
+    created = await client.post("/api/v1/jobs", json=body, headers=headers)
+    assert created.status_code == 202
+    job = created.json()
+    assert (job["status"], job["total"], job["completed"]) == ("pending", 2, 0)
+
+    status = await client.get(f"/api/v1/jobs/{job['id']}", headers=headers)
+    assert status.status_code == 200 and status.json()["id"] == job["id"]
+
+    result = await client.get(f"/api/v1/jobs/{job['id']}/result", headers=headers)
+    rows = [json.loads(line) for line in result.text.splitlines()]
+    assert [(row["position"], row["source"], row["status"]) for row in rows] == [
+        (0, "Toronto", "pending"), (1, "Paris", "pending"),
+    ]
+    assert (await client.get("/api/v1/jobs/unknown", headers=headers)).status_code == 404
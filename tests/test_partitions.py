@@ -0,0 +1,156 @@
+import asyncio
+import gzip
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.shared_store import LocalStore
+from app.services import partitions
+from app.services.partitions import (
+    DEFAULT_PARTITION,
+    MAINTENANCE_LOCK,
+    add_months,
+    archive_partition,
+    create_missing_partitions,
+    ensure_partitions,
+    expired_partitions,
+    partition_maintenance_loop,
+    partition_month,
+    partition_name,
+)
+
+
+class FakeConnection:
+    """Records executed SQL and serves COPY output in chunks."""
+
+    def __init__(self, chunks=()):
+        self.chunks = chunks
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+    async def get_raw_connection(self):
+        return self
+
+    @property
+    def driver_connection(self):
+        return self
+
+    async def copy_from_table(self, name, output, format, header):
+        for chunk in self.chunks:
+            await output(chunk)
+
+
+@pytest.fixture
+def existing(monkeypatch):
+    """Partitions the fake database already has."""
+    names = []
+
+    async def _list_partitions(conn):
+        return list(names)
+
+    monkeypatch.setattr(partitions, "list_partitions", _list_partitions)
+    return names
+
+
+def this_month() -> date:
+    today = datetime.now(timezone.utc).date()
+    return date(today.year, today.month, 1)
+
+
+def test_partition_naming():
+    """Monthly partition names round-trip and month arithmetic wraps years."""
+    month = date(2025, 12, 1)
+    assert partition_name(month) == "query_history_y2025m12"
+    assert partition_month("query_history_y2025m12") == month
+    assert partition_month("query_history_old") is None
+    assert add_months(month, 1) == date(2026, 1, 1)
+    assert add_months(month, -12) == date(2024, 12, 1)
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_only_missing(existing):
+    current = this_month()
+    existing.append(partition_name(current))
+    conn = FakeConnection()
+
+    created = await ensure_partitions(conn, months_ahead=2)
+
+    assert created == [partition_name(add_months(current, 1)), partition_name(add_months(current, 2))]
+    assert len(conn.statements) == 2
+    assert f"FOR VALUES FROM ('{add_months(current, 2).isoformat()} 00:00:00+00')" in conn.statements[1]
+
+
+@pytest.mark.asyncio
+async def test_new_partition_takes_rows_from_default(existing):
+    """With a default partition, the month's rows move out of it before the partition is attached."""
+    existing.append(DEFAULT_PARTITION)
+    conn = FakeConnection()
+
+    assert await create_missing_partitions(conn, [date(2031, 5, 1)]) == ["query_history_y2031m05"]
+
+    create, move, attach = conn.statements
+    assert create.startswith('CREATE TABLE "query_history_y2031m05" (LIKE query_history')
+    assert f'DELETE FROM "{DEFAULT_PARTITION}"' in move and "'2031-06-01 00:00:00+00'" in move
+    assert attach.startswith('ALTER TABLE query_history ATTACH PARTITION "query_history_y2031m05"')
+
+
+@pytest.mark.asyncio
+async def test_failed_maintenance_releases_lock(monkeypatch):
+    """A failed run frees the lock and is retried after the shorter retry delay."""
+    store = LocalStore()
+    runs, delays = [], []
+
+    async def _run():
+        runs.append(store.get(MAINTENANCE_LOCK))
+        if len(runs) == 1:
+            raise ConnectionRefusedError("database is down")
+
+    async def _sleep(delay):
+        delays.append(delay)
+        if len(delays) == 3:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(get_settings(), "HISTORY_MAINTENANCE_INTERVAL_SECONDS", 3600)
+    monkeypatch.setattr(get_settings(), "HISTORY_MAINTENANCE_RETRY_SECONDS", 60)
+    monkeypatch.setattr(partitions, "get_store", lambda: store)
+    monkeypatch.setattr(partitions, "run_partition_maintenance", _run)
+    monkeypatch.setattr(partitions.asyncio, "sleep", _sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        await partition_maintenance_loop()
+
+    # Retried after the failure; the successful run keeps the lock, so the third check skips
+    assert len(runs) == 2 and all(runs)
+    assert delays == [60, 3600, 3600]
+    assert store.get(MAINTENANCE_LOCK) is not None
+
+
+@pytest.mark.asyncio
+async def test_expired_partitions(existing):
+    current = this_month()
+    existing.extend([
+        partition_name(add_months(current, -3)),
+        partition_name(add_months(current, -2)),
+        partition_name(current),
+        "query_history_old",
+    ])
+
+    assert await expired_partitions(FakeConnection(), retention_months=2) == [
+        partition_name(add_months(current, -3)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_archive_partition(tmp_path):
+    """The partition is detached, copied to a gzip CSV and dropped."""
+    conn = FakeConnection([b"id,meters\n", b"1,500\n", b"2,700\n"])
+    path = await archive_partition(conn, "query_history_y2020m01", str(tmp_path / "archive"))
+
+    assert path == str(tmp_path / "archive" / "query_history_y2020m01.csv.gz")
+    with gzip.open(path, "rb") as archive:
+        assert archive.read() == b"id,meters\n1,500\n2,700\n"
+    assert "DETACH PARTITION" in conn.statements[0]
+    assert conn.statements[-1] == 'DROP TABLE "query_history_y2020m01"'
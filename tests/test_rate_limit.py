@@ -0,0 +1,74 @@
+import pytest
+
+from app.core.config import get_settings
+from app.core.rate_limit import GcraLimiter
+
+# Rejected for its missing query parameters, so cheap to call
+LIMITED_PATH = "/api/v1/places/nearby"
+
+
+def test_burst_then_sustained_rate():
+    """A client gets its burst at once, then one request per interval."""
+    limiter = GcraLimiter(rate=1, burst=3, max_keys=10)
+
+    assert [limiter.check("a", now=100.0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.check("a", now=100.0) == 1.0
+    assert limiter.check("a", now=101.0) == 0
+    assert limiter.check("a", now=101.0) > 0
+
+    # Other clients are unaffected
+    assert limiter.check("b", now=101.0) == 0
+
+
+def test_memory_is_bounded():
+    """Idle keys expire and the key count never exceeds max_keys."""
+    limiter = GcraLimiter(rate=1, burst=1, max_keys=100)
+    for i in range(10_000):
+        limiter.check(f"ip-{i}", now=float(i) / 1000)
+    assert len(limiter) <= 100
+
+    # Long after, every key is idle and they drain as new requests arrive
+    for i in range(100):
+        limiter.check(f"late-{i}", now=1e6 + i)
+    assert all(key.startswith("late-") for key in limiter._tats)
+
+
+@pytest.fixture
+def tight_limit(db_connection, monkeypatch):
+    """Two requests of burst, then one a minute."""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_API_KEYS", "partner-key")
+    monkeypatch.setattr(settings, "SHARED_STORE_PATH", None)
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_retry_after_and_cors(client, tight_limit):
+    """Over the limit, API requests get a 429 that browsers can read; preflights are free."""
+    origin = {"Origin": "https://example.com"}
+    preflight = {**origin, "Access-Control-Request-Method": "GET"}
+    for _ in range(3):
+        assert (await client.options(LIMITED_PATH, headers=preflight)).status_code == 200
+
+    assert [(await client.get(LIMITED_PATH, headers=origin)).status_code for _ in range(2)] == [422, 422]
+    response = await client.get(LIMITED_PATH, headers=origin)
+    assert response.status_code == 429
+    assert response.json()["detail"]["code"] == "RATE_LIMITED"
+    assert 0 < int(response.headers["Retry-After"]) <= 60
+    assert response.headers["Access-Control-Allow-Origin"] == "https://example.com"
+
+    # Health checks are never limited
+    assert (await client.get("/api/v1/health")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_middleware_only_honors_configured_api_keys(client, tight_limit):
+    """Made-up keys share the IP's allowance; a configured key has its own."""
+    for i in range(2):
+        await client.get(LIMITED_PATH, headers={"X-API-Key": f"made-up-{i}"})
+    assert (await client.get(LIMITED_PATH, headers={"X-API-Key": "made-up-2"})).status_code == 429
+    assert (await client.get(LIMITED_PATH)).status_code == 429
+
+    assert (await client.get(LIMITED_PATH, headers={"X-API-Key": "partner-key"})).status_code == 422
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import recaptcha
+from app.services.recaptcha import RecaptchaVerificationError, verify_recaptcha
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def siteverify_calls(monkeypatch):
+    """Replace the Google call with a counter that accepts 'good-*' tokens."""
+    calls = []
+
+    async def _siteverify(token: str):
+        calls.append(token)
+        await asyncio.sleep(0.01)
+        if not token.startswith("good-"):
+            raise RecaptchaVerificationError()
+
+    monkeypatch.setattr(recaptcha, "_siteverify", _siteverify)
+    return calls
+
+
+async def test_verified_token_is_cached_with_limited_uses(siteverify_calls):
+    """Retries with a verified token skip siteverify, up to the use limit."""
+    max_uses = get_settings().RECAPTCHA_TOKEN_MAX_USES
+    for _ in range(max_uses):
+        await verify_recaptcha("good-retry")
+    assert siteverify_calls == ["good-retry"]
+
+    with pytest.raises(RecaptchaVerificationError):
+        await verify_recaptcha("good-retry")
+
+
+async def test_concurrent_verifications_share_one_call(siteverify_calls):
+    """Simultaneous requests with one token make a single siteverify call."""
+    await asyncio.gather(*(verify_recaptcha("good-concurrent") for _ in range(3)))
+    assert siteverify_calls == ["good-concurrent"]
+
+
+async def test_failed_verification_is_not_cached(siteverify_calls):
+    """Rejected tokens are checked again rather than cached."""
+    for _ in range(2):
+        with pytest.raises(RecaptchaVerificationError):
+            await verify_recaptcha("bad-token")
+    assert siteverify_calls == ["bad-token", "bad-token"]
+
+
+async def test_stub_mode_makes_no_network_calls(monkeypatch):
+    """RECAPTCHA_STUB accepts non-empty tokens without calling Google."""
+    monkeypatch.setattr(get_settings(), "RECAPTCHA_STUB", True)
+    monkeypatch.setattr(get_settings(), "RECAPTCHA_VERIFY_URL", "http://invalid.invalid")
+
+    await verify_recaptcha("any-token")
+    with pytest.raises(RecaptchaVerificationError):
+        await verify_recaptcha("")
@@ -1,8 +1,10 @@
 import pytest
+from datetime import date
 from app.core.haversine import calculate_distance
 from app.services.geocode import get_coordinates
 from app.services.address_cleaner import clean_addresses
 from app.core.exceptions import AddressNotFoundError, GeocodingError
+from app.services.history_stats import bucket_for
 
 pytestmark = pytest.mark.asyncio
 
@@ -21,6 +23,23 @@ def test_haversine_calculation():
     assert 3300 <= km_distance <= 3400  # km
     assert 2000 <= mi_distance <= 2200  # miles
     
+def test_history_distance_from_meters():
+    """Kilometers and miles derived from stored meters match the haversine output."""
+    from app.db.models import QueryHistory
+
+    km, miles = calculate_distance(43.6532, -79.3832, 49.2827, -123.1207)
+    row = QueryHistory(meters=round(km * 1000))
+    assert row.kilometers == km
+    assert row.miles == miles
+
+def test_distance_bucket():
+    """Distances map to the lower bound of their histogram bucket."""
+    assert bucket_for(0) == 0
+    assert bucket_for(9.99) == 0
+    assert bucket_for(10) == 10
+    assert bucket_for(3364.5) == 2500
+    assert bucket_for(20015) == 10000
+
 async def test_geocoding_service(mock_nominatim_response):
     """Test the geocoding service with mock responses."""
     coords = await get_coordinates("Toronto, ON", "source")
@@ -28,7 +47,7 @@ async def test_geocoding_service(mock_nominatim_response):
     assert isinstance(coords[0], float)
     assert isinstance(coords[1], float)
 
-async def test_geocoding_service_error():
+async def test_geocoding_service_error(stub_upstreams):
     """Test geocoding service error handling."""
     with pytest.raises(AddressNotFoundError):
         await get_coordinates("NonexistentPlace12345", "source")
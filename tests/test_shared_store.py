@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from app.core.shared_store import LocalStore, SqliteStore
+
+
+@pytest.fixture(params=["local", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return LocalStore()
+    return SqliteStore(str(tmp_path / "store.sqlite3"))
+
+
+def test_values_and_ttl(store):
+    """Values round-trip, expire after their TTL, and add() only sets absent keys."""
+    store.set("a", {"lat": 1.5, "lon": 2.5})
+    assert store.get("a") == {"lat": 1.5, "lon": 2.5}
+
+    store.set("short", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert store.get("short") is None
+
+    assert store.add("once", 1) is True
+    assert store.add("once", 2) is False
+    assert store.get("once") == 1
+
+    assert store.incr("n") == 1
+    assert store.incr("n") == 2
+
+    assert store.incr_existing("absent") is None
+    store.set("uses", 0, ttl=0.05)
+    assert store.incr_existing("uses") == 1
+    time.sleep(0.06)
+    assert store.incr_existing("uses") is None
+
+
+def test_gcra_pacing_and_limiting(store):
+    """Reserving paces calls at the rate; non-reserving rejects beyond the burst."""
+    waits = [store.gcra("pace", rate=10) for _ in range(3)]
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(0.1, abs=0.02)
+    assert waits[2] == pytest.approx(0.2, abs=0.02)
+
+    allowed = [store.gcra("limit", rate=1, burst=3, reserve=False) == 0 for _ in range(5)]
+    assert allowed == [True, True, True, False, False]
+
+
+def test_slots(store):
+    """Slots are limited, released explicitly, and reclaimed after the lease."""
+    assert store.acquire_slot("openai", "a", limit=2, lease=10)
+    assert store.acquire_slot("openai", "b", limit=2, lease=10)
+    assert not store.acquire_slot("openai", "c", limit=2, lease=10)
+
+    store.release_slot("openai", "a")
+    assert store.acquire_slot("openai", "c", limit=2, lease=0.01)
+    time.sleep(0.02)
+    assert store.acquire_slot("openai", "d", limit=2, lease=10)
+
+
+def test_sqlite_store_is_shared(tmp_path):
+    """Two handles on one file, as in two workers, see the same state."""
+    path = str(tmp_path / "store.sqlite3")
+    worker_a, worker_b = SqliteStore(path), SqliteStore(path)
+
+    worker_a.set("geocode:toronto", {"lat": 43.65, "lon": -79.38})
+    assert worker_b.get("geocode:toronto") == {"lat": 43.65, "lon": -79.38}
+
+    assert worker_a.gcra("pace:nominatim", rate=1) == 0
+    assert worker_b.gcra("pace:nominatim", rate=1) > 0.9
+
+
+def test_incr_existing_is_atomic_across_processes(tmp_path):
+    """Concurrent increments through separate connections never repeat a value."""
+    path = str(tmp_path / "store.sqlite3")
+    stores = [SqliteStore(path) for _ in range(4)]
+    stores[0].set("uses", 0, ttl=60)
+    values = []
+
+    def _worker(store):
+        for _ in range(50):
+            values.append(store.incr_existing("uses"))
+
+    threads = [threading.Thread(target=_worker, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(values) == list(range(1, 201))
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import get_settings
+from app.core.haversine import calculate_distance
+from app.core.spatial import SpatialIndex
+from app.services import places
+from app.services.address_book import upsert_address
+
+
+def _random_places(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [(f"place-{i}", rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(n)]
+
+
+def test_nearest_matches_brute_force():
+    """k-nearest results agree with a haversine scan over every place."""
+    places = _random_places(2000)
+    index = SpatialIndex(cell_km=200)
+    for name, lat, lon in places:
+        index.add(name, lat, lon)
+
+    for lat, lon in [(43.6532, -79.3832), (89.9, 10.0), (-33.86, 179.99), (0.0, 0.0)]:
+        expected = sorted(
+            places, key=lambda p: calculate_distance(lat, lon, p[1], p[2])[0]
+        )[:5]
+        result = index.nearest(lat, lon, k=5)
+
+        assert len(result) == 5
+        for (place, km), (name, plat, plon) in zip(result, expected):
+            assert abs(km - calculate_distance(lat, lon, plat, plon)[0]) < 0.1
+
+
+def test_within_radius():
+    """Radius search returns every place inside the radius and nothing outside."""
+    index = SpatialIndex()
+    index.add("Toronto", 43.6532, -79.3832)
+    index.add("Hamilton", 43.2557, -79.8711)
+    index.add("Vancouver", 49.2827, -123.1207)
+
+    names = [place.name for place, _ in index.within(43.6532, -79.3832, 100)]
+    assert names == ["Toronto", "Hamilton"]
+
+
+def test_add_replaces_coordinates():
+    """Re-adding a known address moves it instead of duplicating it."""
+    index = SpatialIndex()
+    index.add("Springfield", 39.7817, -89.6501)
+    index.add("Springfield", 42.1015, -72.5898)
+
+    assert len(index) == 1
+    place, km = index.nearest(42.1, -72.59, k=1)[0]
+    assert place.name == "Springfield" and km < 1
+
+
+@pytest_asyncio.fixture
+async def fresh_places(monkeypatch):
+    """An empty place index that refreshes on every request."""
+    monkeypatch.setattr(places, "place_index", SpatialIndex())
+    monkeypatch.setattr(places, "_watermark", None)
+    monkeypatch.setattr(get_settings(), "PLACES_REFRESH_SECONDS", 0)
+
+
+@pytest.mark.asyncio
+async def test_nearby_endpoint_picks_up_new_addresses(db_session, client, fresh_places):
+    """/places/nearby serves addresses added after the first load, e.g. by another worker."""
+    await upsert_address(db_session, "Toronto", (43.6532, -79.3832))
+    await upsert_address(db_session, "Unknown Coordinates")
+    await db_session.commit()
+
+    response = await client.get("/api/v1/places/nearby", params={"lat": 43.6, "lon": -79.4, "k": 5})
+    assert response.status_code == 200
+    assert [place["address"] for place in response.json()] == ["Toronto"]
+
+    # Written behind this process's back, as another worker would
+    await upsert_address(db_session, "Hamilton", (43.2557, -79.8711))
+    await db_session.commit()
+
+    response = await client.get("/api/v1/places/nearby", params={"lat": 43.6, "lon": -79.4, "radius_km": 100})
+    assert response.status_code == 200, response.text
+    nearby = response.json()
+    assert [place["address"] for place in nearby] == ["Toronto", "Hamilton"]
+    assert nearby[0]["distance_km"] < 10
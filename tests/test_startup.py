@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.startup import parse_importtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use, not when the app loads
+DEFERRED_MODULES = ("openai",)
+
+
+def _import_app(code: str = "import app.main"):
+    # Deliberately no database settings or API keys in the environment
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": ROOT}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+
+
+def test_app_imports_without_secrets():
+    """Importing the app needs no database settings or API keys and creates no engine."""
+    result = _import_app(
+        "import app.main, app.db.session as s; assert s._engine is None"
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+def test_heavy_sdks_are_deferred():
+    """`python -X importtime` shows no heavy SDK imported by `import app.main`."""
+    result = _import_app()
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    modules = parse_importtime(result.stderr)
+    assert "app.main" in modules
+    for name in DEFERRED_MODULES:
+        assert name not in modules